@@ -0,0 +1,111 @@
+"""
+Offline batch transcription (and optional classification) of recorded
+mock interviews, one recording per worker process:
+
+    python batch_transcribe.py recordings/ --workers 4 --speed 4 --classify
+    arecord -f S16_LE -r 16000 -c 1 | python batch_transcribe.py - --speed 1
+
+Writes one JSON line per utterance: {"file", "index", "audio_s", "text",
+"classification"}. Each worker loads its own whisper models, so memory
+grows with --workers; "-" (stdin) always runs in-process.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict
+
+AUDIO_EXTENSIONS = (".wav", ".flac")
+
+def collect_recordings(paths: list[str]) -> list[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(AUDIO_EXTENSIONS)
+            )
+        else:
+            files.append(path)
+    return files
+
+async def _transcribe(path: str, speed: float, classify: bool) -> list[dict]:
+    from stt.realtimeSTT import realtimeSTT
+
+    utterances = []
+    started = time.monotonic()
+
+    async def final_update(text):
+        utterances.append({
+            "file": path,
+            "index": len(utterances),
+            "audio_s": round((time.monotonic() - started) * (speed or 1.0), 2),
+            "text": text,
+        })
+
+    stt = realtimeSTT(
+        partial_update=None,
+        final_update=final_update,
+        name=os.path.basename(path),
+        source=path,
+        speed=speed,
+        enable_realtime_transcription=False,  # no partials needed offline
+    )
+    await stt.start()
+
+    if classify:
+        from nlp.classifier import NLPClassifier
+        from nlp import llm_client
+
+        # one classifier per recording so conversation context follows the interview
+        classifier = NLPClassifier()
+        try:
+            for utterance in utterances:
+                result = await classifier.classify(utterance["text"])
+                utterance["classification"] = asdict(result)
+        finally:
+            await llm_client.close_client()
+    return utterances
+
+def transcribe_file(path: str, speed: float = 4.0, classify: bool = False) -> list[dict]:
+    """Process-pool entry point: transcribe (and classify) one recording."""
+    return asyncio.run(_transcribe(path, speed, classify))
+
+def main(args):
+    files = collect_recordings(args.inputs)
+    workers = max(1, min(args.workers, len(files)))
+    started = time.monotonic()
+    count = 0
+    with open(args.output, "w", encoding="utf-8") as out:
+        def write(path, utterances):
+            nonlocal count
+            for utterance in utterances:
+                out.write(json.dumps(utterance) + "\n")
+            count += len(utterances)
+            print(f"[Batch] {path}: {len(utterances)} utterances")
+
+        in_process = [f for f in files if f == "-"] if workers > 1 else files
+        pooled = [f for f in files if f not in in_process]
+        for path in in_process:
+            write(path, transcribe_file(path, args.speed, args.classify))
+        if pooled:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(transcribe_file, path, args.speed, args.classify): path for path in pooled}
+                for future in as_completed(futures):
+                    try:
+                        write(futures[future], future.result())
+                    except Exception as e:
+                        print(f"[Batch] {futures[future]} failed: {e}")
+    print(f"[Batch] {count} utterances from {len(files)} recordings in {time.monotonic() - started:.1f} s -> {args.output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch-transcribe recorded interviews")
+    parser.add_argument("inputs", nargs="+", help=".wav/.flac files, directories, or - for raw 16 kHz mono PCM on stdin")
+    parser.add_argument("--output", default="transcripts.jsonl")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="recordings transcribed in parallel (each worker also uses several whisper threads)")
+    parser.add_argument("--speed", type=float, default=4.0, help="replay speed; high values merge utterances separated by short pauses")
+    parser.add_argument("--classify", action="store_true", help="classify each utterance (fast path, then the configured LLM backend)")
+    main(parser.parse_args())
@@ -0,0 +1,294 @@
+"""
+End-to-end latency benchmark.
+
+Replays a corpus of timestamped transcripts (.jsonl) or WAV/FLAC recordings
+through realtimeSTT -> NLPClassifier -> AnswerGenerator against the local
+mock LLM backend and reports p50/p95/p99 per stage:
+
+    end of speech -> final text -> classification -> first token -> complete answer
+
+    python benchmark.py benchmarks/corpus --speed 4 --output results.json
+    python benchmark.py interview.wav --speculative --label spec-on
+    python benchmark.py benchmarks/corpus --coalesce --label coalesce-on
+
+Transcript lines look like {"start": 1.2, "end": 3.4, "text": "..."} and may
+carry "partials": [{"t": 2.0, "text": "..."}]; otherwise partials are
+synthesized word by word so speculative mode has something to work with.
+Session logs (core/session_log.py) are replayed from their final and
+partial events; see replay_session.py for comparing against the original.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import time
+
+from core import tracing
+from nlp import llm_client
+from mock_llm_server import MockLLMServer
+
+# stage name -> (start mark, end mark), see core/tracing.py
+STAGES = {
+    "eos_to_final": ("speech_end", "final"),
+    "final_to_coalesced": ("final", "coalesced"),
+    "final_to_classification": ("final", "classify_end"),
+    "classification_to_first_token": ("classify_end", "first_token"),
+    "first_token_to_complete": ("first_token", "answer_end"),
+    "eos_to_first_token": ("speech_end", "first_token"),
+    "eos_to_complete": ("speech_end", "answer_end"),
+}
+
+AUDIO_EXTENSIONS = (".wav", ".flac")
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+def summarize(values: list[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    ms = [v * 1000 for v in values]
+    return {
+        "count": len(ms),
+        "mean_ms": round(sum(ms) / len(ms), 2),
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+        "max_ms": round(max(ms), 2),
+    }
+
+class StageClock:
+    """Collects finished utterance traces and computes exact per-stage percentiles."""
+
+    def __init__(self):
+        self.traces: list[tracing.Trace] = []
+        tracing.tracer.enabled = True
+        tracing.tracer.on_finish.append(self.traces.append)
+
+    @property
+    def answered(self) -> int:
+        return sum(1 for t in self.traces if "answer_end" in t.marks)
+
+    def report(self) -> dict:
+        stages = {}
+        for name, (start, end) in STAGES.items():
+            values = [t.span(start, end) for t in self.traces]
+            stages[name] = summarize([v for v in values if v is not None])
+        return stages
+
+# ----- corpus replay -----
+
+def load_transcript(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return json.load(f)
+        entries = [json.loads(line) for line in f if line.strip()]
+    if entries and "kind" in entries[0]:
+        return session_transcript(entries)
+    return entries
+
+def session_transcript(events: list[dict]) -> list[dict]:
+    """Transcript entries from a session log: each final with the partials that led up to it."""
+    entries, partials, start = [], [], None
+    for event in events:
+        if event["kind"] == "partial":
+            start = event["t"] if start is None else start
+            partials.append({"t": event["t"], "text": event["text"]})
+        elif event["kind"] == "final":
+            entries.append({"start": event["t"] if start is None else start, "end": event["t"], "text": event["text"], "partials": partials})
+            partials, start = [], None
+    return entries
+
+def synthesize_partials(entry: dict) -> list[tuple[float, str]]:
+    words = entry["text"].rstrip("?.!").split()
+    span = max(entry["end"] - entry["start"], 0.01)
+    return [
+        (entry["start"] + span * (i + 1) / len(words), " ".join(words[: i + 1]))
+        for i in range(len(words))
+    ]
+
+async def replay_transcript(path: str, pipeline, speed: float, endpoint_delay: float):
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+
+    async def sleep_until(t: float):
+        await asyncio.sleep(max(0.0, t0 + t / speed - loop.time()))
+
+    for entry in load_transcript(path):
+        partials = [(p["t"], p["text"]) for p in entry.get("partials", [])] or synthesize_partials(entry)
+        for t, partial in partials:
+            await sleep_until(t)
+            pipeline.on_partial(partial)
+        await sleep_until(entry["end"])
+        speech_end = time.monotonic()
+        # the recorder only finalizes after the post-speech silence window
+        await asyncio.sleep(endpoint_delay)
+        trace = tracing.tracer.start(entry["text"])
+        trace.mark("speech_end", speech_end)  # type: ignore
+        trace.mark("final")  # type: ignore
+        with tracing.use(trace):
+            await pipeline.submit(entry["text"])
+
+async def replay_audio(path: str, pipeline, speed: float):
+    from stt.realtimeSTT import realtimeSTT
+
+    # realtimeSTT starts a trace with speech_end/final marks per utterance
+    stt = realtimeSTT(
+        partial_update=pipeline.on_partial,
+        final_update=pipeline.submit,
+        name=os.path.basename(path),
+        source=path,
+        speed=speed,
+    )
+    await stt.start()
+
+def collect_corpus(paths: list[str]) -> list[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.endswith((".jsonl", ".json") + AUDIO_EXTENSIONS)
+            )
+        else:
+            files.append(path)
+    return files
+
+async def run(args, recorder=None) -> dict:
+    server = None
+    if not args.real_backend:
+        server = MockLLMServer(
+            port=0,
+            first_token_latency=args.first_token_ms / 1000,
+            token_latency=args.token_ms / 1000,
+            error_rate=args.error_rate,
+            stall_rate=args.stall_rate,
+            answer_length=args.answer_tokens,
+        )
+        await server.start()
+        llm_client.configure(backend=llm_client.BackendConfig(provider="local", model="mock", base_url=server.base_url))
+
+    # imported here so the shared client is built for the configured backend
+    from nlp.classifier import NLPClassifier
+    from nlp.answer_generation import AnswerGenerator
+    from nlp.answer_cache import AnswerCache
+    from core.pipeline import Pipeline
+    from core.endpointing import UtteranceCoalescer
+    from nlp import resilience
+
+    resilience.configure(hedging=not args.no_hedge)
+    clock = StageClock()
+    cache = AnswerCache(path=None) if args.cache else None
+    classifier = NLPClassifier(fast_path=not args.no_fast_path)
+    generator = AnswerGenerator(cache=cache)
+    pipeline = Pipeline(
+        classifier,
+        generator,
+        speculative=args.speculative,
+        combined=args.combined,
+        coalesce=args.coalesce,
+        cancel_superseded=not args.no_cancel,
+        recorder=recorder,
+        # hold windows are wall-clock; scale them like the replayed pauses
+        coalesce_options={
+            "pause_window": UtteranceCoalescer.PAUSE_WINDOW / args.speed,
+            "fragment_window": UtteranceCoalescer.FRAGMENT_WINDOW / args.speed,
+            "max_hold": UtteranceCoalescer.MAX_HOLD / args.speed,
+        },
+    )
+
+    await llm_client.prewarm()
+    pipeline.start()
+    started = time.monotonic()
+    try:
+        for path in collect_corpus(args.corpus):
+            if path.endswith(AUDIO_EXTENSIONS):
+                await replay_audio(path, pipeline, args.speed)
+            else:
+                await replay_transcript(path, pipeline, args.speed, args.endpoint_delay_ms / 1000)
+        await pipeline.drain()
+    finally:
+        await pipeline.stop()
+        await llm_client.close_client()
+        if server is not None:
+            await server.stop()
+
+    return {
+        "label": args.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "config": {
+            "corpus": args.corpus,
+            "speed": args.speed,
+            "endpoint_delay_ms": args.endpoint_delay_ms,
+            "speculative": args.speculative,
+            "combined": args.combined,
+            "coalesce": args.coalesce,
+            "cancel_superseded": not args.no_cancel,
+            "cache": args.cache,
+            "fast_path": not args.no_fast_path,
+            "hedging": not args.no_hedge,
+            "backend": "real" if args.real_backend else {
+                "first_token_ms": args.first_token_ms,
+                "token_ms": args.token_ms,
+                "error_rate": args.error_rate,
+                "stall_rate": args.stall_rate,
+                "answer_tokens": args.answer_tokens,
+            },
+        },
+        "wall_seconds": round(time.monotonic() - started, 3),
+        "utterances": len(clock.traces),
+        "answered": clock.answered,
+        "stages": clock.report(),
+        "trace_spans": tracing.tracer.snapshot()["stages"],
+        "classifier": classifier.fast_path_stats(),
+        "cache": cache.stats() if cache is not None else None,
+        "speculation": pipeline.speculator.stats() if pipeline.speculator is not None else None,
+        "coalescing": pipeline.coalescer.stats() if pipeline.coalescer is not None else None,
+        "cancellation": pipeline.cancellation_stats(),
+        "resilience": resilience.guard.stats(),
+        "mock_backend": server.stats() if server is not None else None,
+    }
+
+def print_report(result: dict):
+    print(f"\n[Benchmark] {result['label']}: {result['utterances']} utterances, "
+          f"{result['answered']} answered in {result['wall_seconds']} s")
+    print(f"{'stage':<32}{'n':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in result["stages"].items():
+        if stats["count"]:
+            print(f"{name:<32}{stats['count']:>5}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """Pipeline and mock-backend options, shared with replay_session.py."""
+    parser.add_argument("--label", default="default")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed factor (2 = twice real time)")
+    parser.add_argument("--endpoint-delay-ms", type=float, default=600, help="simulated post-speech silence for transcript replay")
+    parser.add_argument("--speculative", action="store_true")
+    parser.add_argument("--combined", action="store_true")
+    parser.add_argument("--coalesce", action="store_true", help="merge finals that look like half a question before classifying")
+    parser.add_argument("--no-cancel", action="store_true", help="let answers finish even when a newer question arrives (compressed replays ask faster than answers stream)")
+    parser.add_argument("--cache", action="store_true", help="enable an in-memory answer cache")
+    parser.add_argument("--no-fast-path", action="store_true")
+    parser.add_argument("--real-backend", action="store_true", help="use the configured LLM backend instead of the mock")
+    parser.add_argument("--first-token-ms", type=float, default=250)
+    parser.add_argument("--token-ms", type=float, default=15)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="fraction of mock requests that hang (to exercise deadlines and hedging)")
+    parser.add_argument("--no-hedge", action="store_true", help="disable hedged LLM requests")
+    parser.add_argument("--answer-tokens", type=int, default=40)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark")
+    parser.add_argument("corpus", nargs="*", default=["benchmarks/corpus"], help="transcript (.jsonl/.json), session log or .wav/.flac files, or directories")
+    parser.add_argument("--output", default="benchmark_results.json")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print_report(result)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"[Benchmark] Results written to {args.output}")
@@ -0,0 +1,189 @@
+"""
+Pick STT settings for this machine.
+
+Transcribes a sample clip with each whisper model size, compute type, beam
+size and thread count, measures the real-time factor (processing time /
+audio duration; lower is faster) and saves a profile that realtimeSTT loads
+at startup (stt/profiles.py):
+
+  - final model: the largest model that stays under --target-rtf, with the
+    largest beam that still fits and the fastest compute type/thread count
+  - real-time (partials) model: the same rule against --realtime-target-rtf,
+    since partial transcription re-runs on the growing buffer many times
+
+    python calibrate_stt.py --record 30          # record a clip from the mic first
+    python calibrate_stt.py --clip my_voice.wav --target-rtf 0.3
+
+A transcript next to the clip (same name, .txt) adds word error rates to
+the report.
+"""
+import argparse
+import os
+import platform
+import time
+import wave
+from typing import Optional
+
+import numpy as np
+
+from stt import profiles, sources
+
+DEFAULT_CLIP = os.path.join("benchmarks", "audio", "calibration.wav")
+
+def record_clip(path: str, seconds: float, device_index: int):
+    import pyaudio
+
+    audio = pyaudio.PyAudio()
+    stream = audio.open(format=pyaudio.paInt16, channels=1, rate=sources.SAMPLE_RATE, input=True,
+                        input_device_index=device_index, frames_per_buffer=sources.CHUNK_FRAMES)
+    print(f"[Calibrate] Recording {seconds:.0f} s, speak normally (e.g. answer an interview question)...")
+    frames = [stream.read(sources.CHUNK_FRAMES) for _ in range(int(seconds * sources.SAMPLE_RATE / sources.CHUNK_FRAMES))]
+    stream.stop_stream()
+    stream.close()
+    audio.terminate()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sources.SAMPLE_RATE)
+        wav.writeframes(b"".join(frames))
+    print(f"[Calibrate] Saved {path}")
+
+def load_clip(path: str) -> np.ndarray:
+    pcm = b"".join(sources.FileSource(path).chunks())
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1] / max(1, len(ref))
+
+class Calibrator:
+    def __init__(self, audio: np.ndarray, reference: str = ""):
+        self.audio = audio
+        self.duration = len(audio) / sources.SAMPLE_RATE
+        self.reference = reference
+        self.results: list[dict] = []
+
+    def measure(self, model, size, compute_type, threads, beam_size) -> dict:
+        model.transcribe(self.audio[: 2 * sources.SAMPLE_RATE], beam_size=beam_size, language="en")  # warm-up
+        started = time.perf_counter()
+        segments, _ = model.transcribe(self.audio, beam_size=beam_size, language="en")
+        text = " ".join(s.text.strip() for s in segments)  # segments are lazy
+        elapsed = time.perf_counter() - started
+        result = {
+            "model": size,
+            "compute_type": compute_type,
+            "cpu_threads": threads,
+            "beam_size": beam_size,
+            "rtf": round(elapsed / self.duration, 3),
+            "wer": round(word_error_rate(self.reference, text), 3) if self.reference else None,
+        }
+        self.results.append(result)
+        print(f"  {size:<10}{compute_type:<14}{threads:>3} threads  beam {beam_size}  "
+              f"RTF {result['rtf']:.3f}" + (f"  WER {result['wer']:.2f}" if self.reference else ""))
+        return result
+
+    def run(self, sizes, compute_types, thread_counts, beam_sizes, max_rtf: float):
+        from faster_whisper import WhisperModel
+
+        for size in sizes:
+            fastest = None
+            for compute_type in compute_types:
+                for threads in thread_counts:
+                    model = WhisperModel(size, device="cpu", compute_type=compute_type, cpu_threads=threads)
+                    for beam_size in beam_sizes:
+                        result = self.measure(model, size, compute_type, threads, beam_size)
+                        fastest = result["rtf"] if fastest is None else min(fastest, result["rtf"])
+                    del model
+            # larger models are only slower
+            if fastest is not None and fastest > max_rtf:
+                print(f"[Calibrate] {size} cannot reach RTF {max_rtf}; skipping larger models")
+                break
+
+    def best(self, target_rtf: float, beam_sizes, compute_type: Optional[str] = None) -> Optional[dict]:
+        fitting = [
+            r for r in self.results
+            if r["rtf"] <= target_rtf and r["beam_size"] in beam_sizes
+            and compute_type in (None, r["compute_type"])
+        ]
+        if not fitting:
+            return None
+        rank = profiles.MODEL_SIZES.index
+        top_model = max(rank(r["model"]) for r in fitting)
+        fitting = [r for r in fitting if rank(r["model"]) == top_model]
+        top_beam = max(r["beam_size"] for r in fitting)
+        return min((r for r in fitting if r["beam_size"] == top_beam), key=lambda r: r["rtf"])
+
+def main(args):
+    if args.record:
+        record_clip(args.clip, args.record, args.device)
+    if not os.path.exists(args.clip):
+        raise SystemExit(
+            f"No calibration clip at {args.clip}. Record one with --record 30 "
+            "or pass --clip with a speech recording (WAV/FLAC, ideally 20-60 s)."
+        )
+    reference = ""
+    transcript = os.path.splitext(args.clip)[0] + ".txt"
+    if os.path.exists(transcript):
+        with open(transcript, encoding="utf-8") as f:
+            reference = f.read()
+
+    cpus = os.cpu_count() or 1
+    thread_counts = sorted({t for t in (args.threads or [2, 4, cpus]) if t <= cpus})
+    calibrator = Calibrator(load_clip(args.clip), reference)
+    print(f"[Calibrate] {args.clip}: {calibrator.duration:.1f} s of audio, {cpus} CPUs")
+    calibrator.run(args.models, args.compute_types, thread_counts, sorted(set(args.beams + args.realtime_beams)),
+                   max(args.target_rtf, args.realtime_target_rtf))
+
+    final = calibrator.best(args.target_rtf, args.beams)
+    # both models share the recorder's compute type
+    realtime = calibrator.best(args.realtime_target_rtf, args.realtime_beams, final["compute_type"] if final else None)
+    if final is None:
+        raise SystemExit(f"[Calibrate] Nothing reached RTF {args.target_rtf}; keeping the current profile")
+    if realtime is None or profiles.MODEL_SIZES.index(realtime["model"]) > profiles.MODEL_SIZES.index(final["model"]):
+        realtime = min(
+            (r for r in calibrator.results if r["beam_size"] in args.realtime_beams and r["compute_type"] == final["compute_type"]),
+            key=lambda r: r["rtf"],
+        )
+
+    profile = profiles.STTProfile(
+        model=final["model"],
+        realtime_model_type=realtime["model"],
+        compute_type=final["compute_type"],
+        beam_size=final["beam_size"],
+        beam_size_realtime=realtime["beam_size"],
+        cpu_threads=final["cpu_threads"],
+        rtf=final["rtf"],
+        realtime_rtf=realtime["rtf"],
+    )
+    profiles.save_profile(
+        profile,
+        args.output,
+        calibrated_at=time.strftime("%Y-%m-%dT%H:%M:%S"),
+        machine={"cpus": cpus, "processor": platform.processor() or platform.machine()},
+        clip=args.clip,
+        target_rtf=args.target_rtf,
+        realtime_target_rtf=args.realtime_target_rtf,
+    )
+    print(f"[Calibrate] Saved {args.output or profiles.PROFILE_PATH}: {profile}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark whisper settings on this machine and save an STT profile")
+    parser.add_argument("--clip", default=DEFAULT_CLIP, help="speech recording to benchmark with (WAV/FLAC)")
+    parser.add_argument("--record", type=float, default=0, help="record this many seconds from the microphone into --clip first")
+    parser.add_argument("--device", type=int, default=1, help="input device index for --record")
+    parser.add_argument("--output", default=None, help=f"profile path (default {profiles.PROFILE_PATH})")
+    parser.add_argument("--target-rtf", type=float, default=0.3, help="max real-time factor for the final model")
+    parser.add_argument("--realtime-target-rtf", type=float, default=0.1, help="max real-time factor for the partials model")
+    parser.add_argument("--models", nargs="+", default=list(profiles.MODEL_SIZES), choices=profiles.MODEL_SIZES)
+    parser.add_argument("--compute-types", nargs="+", default=["int8", "float32"])
+    parser.add_argument("--threads", nargs="+", type=int, default=None)
+    parser.add_argument("--beams", nargs="+", type=int, default=[1, 5], help="beam sizes tried for the final model")
+    parser.add_argument("--realtime-beams", nargs="+", type=int, default=[1, 3], help="beam sizes tried for the partials model")
+    main(parser.parse_args())
@@ -0,0 +1,154 @@
+import asyncio
+import re
+import time
+from typing import Awaitable, Callable, Optional
+
+from nlp.fast_classifier import TRAILING_CONNECTORS
+from core import tracing
+
+_WORD_RE = re.compile(r"[a-z']+")
+
+# set up a question that usually follows in the next final
+PREAMBLE_OPENERS = (
+    "imagine", "suppose", "let's say", "lets say", "say you", "assume", "consider",
+    "picture", "given", "so we have", "we have", "you have", "there is", "there's",
+)
+
+# stripped before looking at how a sentence opens
+DISCOURSE_MARKERS = {"so", "okay", "ok", "and", "now", "well", "alright", "right", "um", "uh", "then", "next"}
+
+def _opening(text: str) -> str:
+    words = _WORD_RE.findall(text.lower())
+    while words and words[0] in DISCOURSE_MARKERS:
+        words.pop(0)
+    return " ".join(words)
+
+class UtteranceCoalescer:
+    """
+    Endpointing stage between realtimeSTT and the classifier.
+
+    The recorder splits long questions at short pauses ("So imagine you have
+    a large system." / "How would you shard it?"). Consecutive finals are
+    held and merged while they look unfinished, and only the merged
+    utterance is passed on, so half-questions never get their own classify
+    call or answer.
+
+    How long a final is held depends on lightweight cues in its text:
+      - ends mid-clause ("and", "because", ","): wait up to fragment_window
+      - sets up a scenario without asking yet ("So imagine you have...",
+        "Suppose we..."): wait up to pause_window
+      - anything else, including questions and small talk: pass on now
+    Speech resuming while a final is held (a partial arrives) means its
+    continuation is on the way, so the hold then lasts until the next final,
+    bounded by max_hold from the first held final.
+
+    All methods must be called from the event loop thread.
+    """
+
+    PAUSE_WINDOW = 1.5
+    FRAGMENT_WINDOW = 2.5
+    MAX_HOLD = 8.0
+
+    def __init__(
+        self,
+        emit: Callable[[str, Optional[tracing.Trace]], Awaitable[None]],
+        pause_window: float = PAUSE_WINDOW,
+        fragment_window: float = FRAGMENT_WINDOW,
+        max_hold: float = MAX_HOLD,
+        console_output=False,
+    ):
+        self.emit = emit
+        self.pause_window = pause_window
+        self.fragment_window = fragment_window
+        self.max_hold = max_hold
+        self.console_output = console_output
+        self.parts: list[str] = []
+        self.traces: list[Optional[tracing.Trace]] = []
+        self._first_at = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushing: Optional[asyncio.Task] = None
+
+        self.finals = 0
+        self.emitted = 0
+        self.merged = 0  # finals folded into another utterance (one classify call saved each)
+
+    def hold_time(self, text: str) -> float:
+        """Seconds to wait for a continuation of text; 0 means it is complete."""
+        text = text.strip()
+        words = _WORD_RE.findall(text.lower())
+        if not words:
+            return 0.0
+        if text.endswith((",", "...", "-", "—")) or words[-1] in TRAILING_CONNECTORS:
+            return self.fragment_window
+        if not text.endswith("?") and _opening(text).startswith(PREAMBLE_OPENERS):
+            return self.pause_window
+        return 0.0
+
+    async def feed(self, text: str, trace: Optional[tracing.Trace] = None):
+        text = text.strip()
+        if not text:
+            return
+        self.finals += 1
+        self._cancel_timer()
+        if not self.parts:
+            self._first_at = time.monotonic()
+        self.parts.append(text)
+        self.traces.append(trace)
+        window = self.hold_time(text)
+        if window == 0.0 or time.monotonic() - self._first_at >= self.max_hold:
+            await self.flush()
+        else:
+            self._schedule(window)
+
+    def note_speech(self):
+        """A partial arrived: the speaker is still going, wait for their next final."""
+        if self.parts and self._timer is not None:
+            self._cancel_timer()
+            self._schedule(self.max_hold)
+
+    async def flush(self):
+        """Pass on whatever is held."""
+        self._cancel_timer()
+        if not self.parts:
+            return
+        parts, traces = self.parts, self.traces
+        self.parts, self.traces = [], []
+        self.emitted += 1
+        self.merged += len(parts) - 1
+        text = " ".join(parts)
+        trace = traces[-1]  # the last final's speech_end is what the answer latency counts from
+        if trace is not None:
+            trace.mark("coalesced")
+            trace.text = text
+            trace.tags["coalesced_finals"] = str(len(parts))
+        for earlier in traces[:-1]:
+            if earlier is not None:
+                earlier.tags["coalesced_into"] = str(trace.id if trace is not None else "")
+                earlier.finish()
+        if self.console_output and len(parts) > 1:
+            print(f"[ENDPOINTING] Merged {len(parts)} finals: {text}")
+        await self.emit(text, trace)
+
+    def cancel(self):
+        """Drop anything held (e.g. on shutdown)."""
+        self._cancel_timer()
+        for trace in self.traces:
+            if trace is not None:
+                trace.finish()
+        self.parts, self.traces = [], []
+
+    def stats(self) -> dict:
+        return {"finals": self.finals, "emitted": self.emitted, "merged": self.merged}
+
+    def _schedule(self, window: float):
+        remaining = self.max_hold - (time.monotonic() - self._first_at)
+        self._timer = asyncio.get_running_loop().call_later(max(0.0, min(window, remaining)), self._timed_out)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _timed_out(self):
+        self._timer = None
+        self._flushing = asyncio.create_task(self.flush())
@@ -0,0 +1,280 @@
+"""
+Session-scoped engine: several interviews in one process.
+
+The Engine owns what sessions share:
+  - the LLM client and its connection pool (nlp.llm_client)
+  - the resilience guard
+  - the answer cache and the knowledge base
+  - the fast classifier model
+  - optionally a SharedSTTWorker
+
+Each Session owns what must not leak between interviews:
+  - classifier and answer history, and expansions
+  - an answer cache of its own when it has its own knowledge base (answers
+    grounded in one candidate's notes must not be served to another)
+  - its Pipeline and session log
+  - its metrics
+  - a cancellation scope for every task it starts
+
+    engine = Engine(cache=AnswerCache(), console_output=True)
+    session = engine.open_session(on_answer_stream=show)
+    session.start()
+    await session.submit("How would you design a rate limiter?")
+    ...
+    await engine.close_session(session.id)  # or engine.close() for all of them
+
+The engine does not close the shared resources handed to it (cache,
+knowledge base, STT worker, LLM client); their owner does. Sessions must be
+opened, used and closed on the event loop thread. load_test.py finds how
+many concurrent sessions one process sustains.
+"""
+import asyncio
+import itertools
+import os
+import time
+from typing import Optional
+
+from core import tracing
+from core.pipeline import Pipeline
+from core.session_log import SESSIONS_DIR, SessionRecorder
+from nlp.answer_cache import AnswerCache
+from nlp.answer_generation import AnswerGenerator, AnswerStream
+from nlp.classifier import NLPClassifier
+from nlp.fast_classifier import FastClassifier
+from nlp.retrieval import KnowledgeBase
+from nlp import resilience
+
+class SessionLimitReached(Exception):
+    """The engine already runs max_sessions sessions."""
+
+class Session:
+    """One interview: its own context, pipeline, metrics and cancellation scope."""
+
+    def __init__(
+        self,
+        engine: "Engine",
+        session_id: str,
+        classifier: NLPClassifier,
+        generator: AnswerGenerator,
+        recorder: Optional[SessionRecorder] = None,
+        console_output=False,
+        **pipeline_options,
+    ):
+        self.engine = engine
+        self.id = session_id
+        self.classifier = classifier
+        self.generator = generator
+        self.recorder = recorder
+        self.console_output = console_output
+        self.pipeline = Pipeline(classifier, generator, recorder=recorder, console_output=console_output, **pipeline_options)
+        self.tasks: set[asyncio.Task] = set()
+        self.streams: list = []  # SharedSTTStreams opened through stt_stream()
+        self.histograms = {name: tracing.Histogram(tracing.LATENCY_BUCKETS) for name, _, _ in tracing.SPANS}
+        self.opened_at = time.monotonic()
+        self.closed = False
+
+        self.finals = 0
+        self.utterances = 0  # finished traces
+
+    def start(self):
+        self.pipeline.start()
+
+    async def submit(self, text: str):
+        """Final transcript for this session; the active trace is tagged with the session id."""
+        trace = tracing.current()
+        if trace is not None:
+            trace.tags["session"] = self.id
+        self.finals += 1
+        await self.pipeline.submit(text)
+
+    def on_partial(self, text: str):
+        self.pipeline.on_partial(text)
+
+    def expand(self) -> Optional[AnswerStream]:
+        return self.pipeline.expand()
+
+    def spawn(self, coro, name: Optional[str] = None) -> asyncio.Task:
+        """Run coro as part of this session; close() cancels it if still running."""
+        task = asyncio.create_task(coro, name=name)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def stt_stream(self, name: str, partial_update=None, final_update=None, **kwargs):
+        """
+        A stream on the engine's shared STT worker, feeding this session by
+        default. The session stops it on close().
+        """
+        if self.engine.stt_worker is None:
+            raise RuntimeError("Engine was created without an stt_worker")
+        stream = self.engine.stt_worker.stream(
+            f"{self.id}/{name}",
+            partial_update if partial_update is not None else self.on_partial,
+            final_update if final_update is not None else self.submit,
+            **kwargs,
+        )
+        self.streams.append(stream)
+        return stream
+
+    async def close(self):
+        """Stop everything the session started and drop its context."""
+        if self.closed:
+            return
+        self.closed = True
+        for stream in self.streams:
+            stream.stop()
+        await self.pipeline.stop()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.generator.reset_context()  # also cancels running expansions
+        self.classifier.reset_context()
+        if self.generator.cache is not None and self.generator.cache is not self.engine.cache:
+            self.generator.cache.close()  # the session's private cache
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.console_output:
+            print(f"[ENGINE] Session {self.id} closed: {self.stats()}")
+
+    def observe(self, trace: tracing.Trace):
+        self.utterances += 1
+        for name, start, end in tracing.SPANS:
+            value = trace.span(start, end)
+            if value is not None:
+                self.histograms[name].observe(value)
+
+    def stats(self) -> dict:
+        stages = {
+            name: {
+                "count": hist.count,
+                "mean_ms": round(hist.sum / hist.count * 1000, 2),
+                "p95_le_ms": hist.quantile(0.95) * 1000,  # type: ignore
+            }
+            for name, hist in self.histograms.items() if hist.count
+        }
+        return {
+            "id": self.id,
+            "age_s": round(time.monotonic() - self.opened_at, 1),
+            "finals": self.finals,
+            "utterances": self.utterances,
+            "running_tasks": len(self.tasks),
+            "classifier": self.classifier.fast_path_stats(),
+            "expansions": self.generator.expansion_stats(),
+            "cancellation": self.pipeline.cancellation_stats(),
+            "stages": stages,
+        }
+
+class Engine:
+    MAX_SESSIONS = 16
+
+    def __init__(
+        self,
+        cache: Optional[AnswerCache] = None,
+        knowledge: Optional[KnowledgeBase] = None,
+        stt_worker=None,
+        max_sessions: int = MAX_SESSIONS,
+        fast_path: bool = True,
+        prefetch_detailed: bool = False,
+        record_sessions: bool = False,
+        console_output=False,
+        **pipeline_options,
+    ):
+        """pipeline_options (mode, speculative, combined, coalesce, ...) are the defaults for every session."""
+        self.cache = cache
+        self.knowledge = knowledge
+        self.stt_worker = stt_worker  # stt.shared_worker.SharedSTTWorker, already started
+        self.max_sessions = max_sessions
+        self.fast_path = FastClassifier() if fast_path else None
+        self.prefetch_detailed = prefetch_detailed
+        self.record_sessions = record_sessions  # one log per session in SESSIONS_DIR
+        self.console_output = console_output
+        self.pipeline_options = pipeline_options
+        self.sessions: dict[str, Session] = {}
+        self._ids = itertools.count(1)
+        if record_sessions:
+            os.makedirs(SESSIONS_DIR, exist_ok=True)
+        tracing.tracer.on_finish.append(self._on_trace)
+
+        self.opened = 0
+        self.closed = 0
+        self.rejected = 0
+        self.peak = 0
+
+    def open_session(
+        self,
+        session_id: Optional[str] = None,
+        knowledge: Optional[KnowledgeBase] = None,
+        metadata: Optional[dict] = None,
+        **pipeline_options,
+    ) -> Session:
+        """
+        New session with fresh history. knowledge overrides the shared
+        knowledge base (e.g. one candidate's own notes); the session then
+        caches answers in memory on its own instead of in the shared cache.
+        pipeline_options override the engine defaults. Call start() on the
+        returned session.
+        """
+        if len(self.sessions) >= self.max_sessions:
+            self.rejected += 1
+            raise SessionLimitReached(f"{len(self.sessions)} sessions already running (max_sessions={self.max_sessions})")
+        session_id = session_id or f"s{next(self._ids)}"
+        if session_id in self.sessions:
+            raise ValueError(f"Session {session_id} is already open")
+        recorder = SessionRecorder(
+            os.path.join(SESSIONS_DIR, time.strftime(f"session-%Y%m%d-%H%M%S-{session_id}.jsonl")),
+            metadata={"session": session_id, **(metadata or {})},
+            session_id=session_id,
+        ) if self.record_sessions else None
+        cache = self.cache
+        if knowledge is not None and cache is not None:
+            # the shared cache is keyed on the question only, not on the notes behind the answer
+            cache = AnswerCache(path=None, capacity=cache.capacity, ttl_seconds=cache.ttl_seconds,
+                                similarity_threshold=cache.similarity_threshold)
+        session = Session(
+            self,
+            session_id,
+            NLPClassifier(fast_path=self.fast_path or False, console_output=self.console_output),
+            AnswerGenerator(
+                cache=cache,
+                knowledge=knowledge or self.knowledge,
+                prefetch_detailed=self.prefetch_detailed,
+            ),
+            recorder=recorder,
+            console_output=self.console_output,
+            **{**self.pipeline_options, **pipeline_options},
+        )
+        self.sessions[session_id] = session
+        self.opened += 1
+        self.peak = max(self.peak, len(self.sessions))
+        if self.console_output:
+            print(f"[ENGINE] Session {session_id} opened ({len(self.sessions)}/{self.max_sessions})")
+        return session
+
+    async def close_session(self, session_id: str):
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            return
+        await session.close()
+        self.closed += 1
+
+    async def close(self):
+        """Close every session; shared resources stay open."""
+        await asyncio.gather(*(self.close_session(session_id) for session_id in list(self.sessions)))
+        if self._on_trace in tracing.tracer.on_finish:
+            tracing.tracer.on_finish.remove(self._on_trace)
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "opened": self.opened,
+            "closed": self.closed,
+            "rejected": self.rejected,
+            "peak": self.peak,
+            "resilience": resilience.guard.stats(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+    def _on_trace(self, trace: tracing.Trace):
+        session = self.sessions.get(trace.tags.get("session", ""))
+        if session is not None:
+            session.observe(trace)
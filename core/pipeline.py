@@ -0,0 +1,365 @@
+import asyncio
+import inspect
+from dataclasses import dataclass
+from typing import Optional
+
+from nlp.classifier import ClassificationResult, NLPClassifier
+from nlp.answer_generation import AnswerGenerator, AnswerStream, LLMAnswer
+from nlp.combined import CombinedResponder
+from core.endpointing import UtteranceCoalescer
+from core.session_log import SessionRecorder
+from core.speculation import SpeculativeRunner
+from core import tracing
+
+
+@dataclass
+class AnswerJob:
+    text: str
+    classification: ClassificationResult
+    answer: Optional[asyncio.Task] = None  # already running, e.g. speculative
+    stream: Optional[AnswerStream] = None  # deltas of `answer`
+    trace: Optional[tracing.Trace] = None
+    task: Optional[asyncio.Task] = None  # the running answer, cancelled when superseded
+    superseded: bool = False
+    committed: Optional[LLMAnswer] = None  # generation finished, so the turn is in the generator's history
+    committed_question: str = ""  # the text both histories store the turn under; the partial for a reused speculation
+
+    def __post_init__(self):
+        self.committed_question = self.committed_question or self.text
+
+
+async def _maybe_await(value):
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+class Pipeline:
+    """
+    Transcript -> classification -> answer pipeline.
+
+    Each stage is a worker task reading from a bounded asyncio.Queue, so a
+    slow LLM answer never holds up the next transcript. When a queue is full
+    the upstream stage waits (backpressure) instead of growing without limit.
+
+    With speculative=True, stabilized partials fed to on_partial() start the
+    classify/answer work early; the final transcript reuses it if it matches.
+
+    With combined=True, classification and answer come from one streamed call
+    (see nlp.combined) instead of two sequential round trips.
+
+    With coalesce=True, finals that look like half a question are held
+    briefly and merged with the next one (see core.endpointing) before they
+    reach the classifier.
+
+    With a recorder (core.session_log), finals, partials, classifications
+    and answers are logged for replay without touching the disk here.
+
+    With cancel_superseded=True (the default), a newer "respond"
+    classification cancels the answer still streaming for an older question
+    (closing its HTTP stream) and drops older answers still queued. A
+    cancelled turn never reaches the generator's history, or is rolled back
+    from it if it had just finished.
+    """
+
+    TRANSCRIPT_QUEUE_SIZE = 8
+    ANSWER_QUEUE_SIZE = 2
+
+    def __init__(
+        self,
+        classifier: NLPClassifier,
+        generator: AnswerGenerator,
+        on_classified=None,
+        on_answer=None,
+        on_answer_stream=None,
+        mode: str = "concise",
+        transcript_queue_size: Optional[int] = None,
+        answer_queue_size: Optional[int] = None,
+        speculative: bool = False,
+        combined: bool = False,
+        coalesce: bool = False,
+        coalesce_options: Optional[dict] = None,
+        recorder: Optional[SessionRecorder] = None,
+        cancel_superseded: bool = True,
+        console_output=False,
+    ):
+        self.classifier = classifier
+        self.generator = generator
+        self.on_classified = on_classified  # (text, ClassificationResult)
+        self.on_answer = on_answer  # (text, ClassificationResult, LLMAnswer)
+        # (text, ClassificationResult, AnswerStream) as soon as answering starts;
+        # must not block, consume the stream from a task or a timer
+        self.on_answer_stream = on_answer_stream
+        self.mode = mode
+        self.transcript_queue_size = transcript_queue_size or self.TRANSCRIPT_QUEUE_SIZE
+        self.answer_queue_size = answer_queue_size or self.ANSWER_QUEUE_SIZE
+        self.console_output = console_output
+        self.recorder = recorder
+        self.cancel_superseded = cancel_superseded
+        self.responder = (
+            CombinedResponder(classifier, generator, console_output=console_output)
+            if combined else None
+        )
+        self.speculator = (
+            SpeculativeRunner(
+                classifier,
+                generator,
+                mode=mode,
+                responder=self.responder,
+                console_output=console_output,
+            )
+            if speculative else None
+        )
+        self.coalescer = (
+            UtteranceCoalescer(self._enqueue, console_output=console_output, **(coalesce_options or {}))
+            if coalesce else None
+        )
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.transcripts: Optional[asyncio.Queue] = None
+        self.answers: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self.last_answered: Optional[AnswerJob] = None  # what expand() elaborates on
+        self.pending: list[AnswerJob] = []  # queued or answering, oldest first
+
+        self.superseded_streaming = 0  # cancelled mid-answer
+        self.superseded_queued = 0  # dropped before answering started
+        self.rolled_back = 0  # finished turns removed from the history again
+
+    def start(self):
+        """Spawn the stage workers on the running event loop."""
+        if self._workers:
+            return
+        # queues are created here so they bind to the loop that runs the workers
+        self._loop = asyncio.get_running_loop()
+        self.transcripts = asyncio.Queue(maxsize=self.transcript_queue_size)
+        self.answers = asyncio.Queue(maxsize=self.answer_queue_size)
+        self._workers = [
+            asyncio.create_task(self._classifier_worker(), name="pipeline-classifier"),
+            asyncio.create_task(self._generator_worker(), name="pipeline-generator"),
+        ]
+
+    async def stop(self):
+        if self.coalescer is not None:
+            self.coalescer.cancel()
+        if self.speculator is not None:
+            self.speculator.cancel()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for job in self.pending:
+            if job.task is not None:
+                job.task.cancel()
+            elif job.answer is not None:
+                job.answer.cancel()
+        self.pending = []
+
+    async def submit(self, text: str):
+        """Queue a final transcript. Waits only if the classifier is far behind."""
+        if self.transcripts is None:
+            raise RuntimeError("Pipeline.start() must be called before submit()")
+        if self.recorder is not None:
+            self.recorder.record("final", text=text)
+        # the active trace (if tracing is on) travels with the text
+        if self.coalescer is not None:
+            await self.coalescer.feed(text, tracing.current())
+        else:
+            await self._enqueue(text, tracing.current())
+
+    async def _enqueue(self, text: str, trace: Optional[tracing.Trace]):
+        await self.transcripts.put((text, trace))
+
+    async def drain(self):
+        """Wait until every submitted transcript has been classified and answered."""
+        if self.coalescer is not None:
+            await self.coalescer.flush()
+        await self.transcripts.join()
+        await self.answers.join()
+
+    def expand(self) -> Optional[AnswerStream]:
+        """
+        Detailed version of the latest answer (see AnswerGenerator.expand);
+        instant when it was prefetched. Must be called on the event loop thread.
+        """
+        job = self.last_answered
+        if job is None:
+            return None
+        brief = job.stream.answer.text if job.stream is not None and job.stream.answer is not None else None
+        return self.generator.expand(job.text, job.classification.intent, brief)
+
+    def on_partial(self, text: str):
+        """Feed a stabilized partial. Safe to call from the recorder's threads."""
+        if self.recorder is not None:
+            self.recorder.partial(text)
+        if self._loop is None or not self._workers:
+            return
+        if self.coalescer is not None:
+            self._loop.call_soon_threadsafe(self.coalescer.note_speech)
+        if self.speculator is not None:
+            self._loop.call_soon_threadsafe(self.speculator.on_partial, text)
+
+    async def _classifier_worker(self):
+        while True:
+            text, trace = await self.transcripts.get()
+            try:
+                with tracing.use(trace):
+                    await self._classify(text, trace)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.console_output:
+                    print(f"[PIPELINE] Classification failed: {e}")
+                if trace is not None:
+                    trace.finish()
+            finally:
+                self.transcripts.task_done()
+
+    async def _classify(self, text: str, trace: Optional[tracing.Trace]):
+        spec = self.speculator.claim(text) if self.speculator is not None else None
+        answer = stream = None
+        committed_question = text
+        if spec is not None:
+            if trace is not None:
+                trace.mark("classify_start")
+                trace.tags["speculation"] = "reused"
+            res = await spec.classification
+            if trace is not None:
+                trace.mark("classify_end")
+            answer, stream = spec.answer, spec.stream
+            committed_question = spec.text
+        elif self.responder is not None:
+            stream = AnswerStream(text)
+            header, answer = self.responder.start(text, self.mode, stream=stream)
+            res = await header
+        else:
+            res = await self.classifier.classify(text)
+        if self.recorder is not None:
+            self.recorder.record(
+                "classified",
+                text=text,
+                intent=res.intent,
+                action=res.action,
+                confidence=res.confidence,
+                reasoning=res.reasoning,
+            )
+        if self.on_classified is not None:
+            await _maybe_await(self.on_classified(text, res))
+        if res.action == "respond":
+            if self.cancel_superseded:
+                for older in self.pending:
+                    self._supersede(older, text)
+            job = AnswerJob(text=text, classification=res, answer=answer, stream=stream, trace=trace,
+                            committed_question=committed_question)
+            self.pending.append(job)
+            await self.answers.put(job)
+            return
+        if answer is not None:
+            answer.cancel()
+        if trace is not None:
+            trace.finish()
+
+    def cancellation_stats(self) -> dict:
+        return {
+            "superseded": self.superseded_streaming + self.superseded_queued,
+            "streaming": self.superseded_streaming,
+            "queued": self.superseded_queued,
+            "rolled_back": self.rolled_back,
+        }
+
+    def _supersede(self, job: AnswerJob, newer: str):
+        """Cancel job's answer because a newer question is being answered."""
+        if job.superseded or (job.task is not None and job.task.done()):
+            return
+        job.superseded = True
+        # the turn is never shown, so it leaves the classifier's context too
+        self.classifier.forget(job.committed_question, job.classification)
+        started = job.task is not None
+        if started:
+            self.superseded_streaming += 1
+            job.task.cancel()  # type: ignore  # _answer() rolls back the generator turn
+        else:
+            self.superseded_queued += 1
+            if job.answer is not None:
+                job.answer.cancel()  # pre-started (speculative/combined) answer
+                self._forget_answer(job)
+        if job.trace is not None:
+            job.trace.tags["superseded"] = "streaming" if started else "queued"
+        if self.recorder is not None:
+            self.recorder.record("superseded", question=job.text, by=newer, streaming=started)
+        if self.console_output:
+            print(f"[PIPELINE] Superseded answer to: {job.text}")
+
+    async def _generator_worker(self):
+        while True:
+            job = await self.answers.get()
+            try:
+                if job.superseded:
+                    continue
+                with tracing.use(job.trace):
+                    job.task = asyncio.create_task(self._answer(job), name="pipeline-answer")
+                # asyncio.wait only raises if this worker itself is cancelled
+                await asyncio.wait({job.task})
+                if not job.task.cancelled():
+                    job.task.result()
+            except asyncio.CancelledError:
+                if job.task is not None:
+                    job.task.cancel()
+                raise
+            except Exception as e:
+                if self.console_output:
+                    print(f"[PIPELINE] Answer generation failed: {e}")
+            finally:
+                self.pending = [other for other in self.pending if other is not job]
+                if job.trace is not None:
+                    job.trace.finish()
+                self.answers.task_done()
+
+    async def _answer(self, job: AnswerJob):
+        try:
+            await self._deliver(job)
+        except asyncio.CancelledError:
+            if job.stream is not None:
+                job.stream.close(None)
+            self._forget_answer(job)
+            raise
+
+    def _forget_answer(self, job: AnswerJob):
+        """Roll back job's generator turn if its answer finished (and was committed) before it was cancelled."""
+        answer = job.committed
+        if answer is None and job.answer is not None and job.answer.done() and not job.answer.cancelled() and job.answer.exception() is None:
+            answer = job.answer.result()
+        if answer is not None and self.generator.forget(job.committed_question, answer.text):
+            self.rolled_back += 1
+
+    async def _deliver(self, job: AnswerJob):
+        stream = job.stream = job.stream or AnswerStream(job.text)
+        self.last_answered = job
+        if self.on_answer_stream is not None:
+            await _maybe_await(self.on_answer_stream(job.text, job.classification, stream))
+        answer = await job.answer if job.answer is not None else None
+        if answer is None:
+            answer = await self.generator.generate(
+                question=job.text,
+                intent=job.classification.intent,
+                mode=self.mode,
+                stream=AnswerStream(job.text) if stream.done else stream,
+            )
+        job.committed = answer
+        self.generator.prefetch(job.text, job.classification.intent, answer)
+        if self.recorder is not None:
+            self.recorder.record(
+                "answer",
+                question=job.text,
+                text=answer.text,
+                mode=answer.mode,
+                confidence=answer.confidence,
+                source=job.trace.tags.get("answer_source") if job.trace is not None else None,
+            )
+        if job.trace is not None:
+            # pre-started answers (speculative) may have finished before the final text
+            job.trace.mark("answer_start", job.trace.marks.get("classify_end"))
+            job.trace.mark("first_token", job.trace.marks.get("classify_end"))
+            job.trace.mark("answer_end")
+        if self.on_answer is not None:
+            await _maybe_await(self.on_answer(job.text, job.classification, answer))
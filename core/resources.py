@@ -0,0 +1,302 @@
+"""
+CPU thread budget and resource governor.
+
+faster-whisper (final model), the realtime model, the Tk main loop and the
+asyncio loop all run on the same cores. plan_budget() splits the cores the
+process may use:
+
+  - app_cores are left to the UI, the event loop and the LLM client
+  - the rest go to transcription: the realtime model gets about a third of
+    them (it runs often, on short audio), the final model the remainder
+    (intra-op threads, CTranslate2 cpu_threads / OMP_NUM_THREADS)
+
+ResourceGovernor applies the budget to an STT profile, records the thread
+counts each transcriber's models really load with (the recorder path can
+only set one count for both models, and OMP_NUM_THREADS from the
+environment takes precedence over the budget), can pin the
+transcription process to the transcription cores, and watches CPU
+utilization: while the machine stays saturated it stretches the interval
+between realtime (partial) transcriptions, and restores it once load drops,
+so finals and UI redraws keep their share of the CPU:
+
+    governor = ResourceGovernor(pin_stt=True, console_output=True)
+    stt = realtimeSTT(..., governor=governor)
+    governor.start()
+    ...
+    print(governor.stats())
+
+CPU sampling uses psutil when installed (pip install psutil), /proc/stat on
+Linux otherwise; without either the budget and pinning still apply, only
+the adaptive part is off. Pinning uses os.sched_setaffinity or psutil.
+"""
+import os
+import sys
+import threading
+from dataclasses import dataclass, replace
+from typing import Callable, Optional
+
+try:
+    import psutil
+except ImportError:  # optional: /proc/stat and sched_setaffinity cover Linux
+    psutil = None
+
+def available_cores() -> tuple[int, ...]:
+    """Cores this process may run on (respects an affinity mask set from outside)."""
+    if hasattr(os, "sched_getaffinity"):
+        return tuple(sorted(os.sched_getaffinity(0)))
+    if psutil is not None:
+        return tuple(sorted(psutil.Process().cpu_affinity()))
+    return tuple(range(os.cpu_count() or 1))
+
+@dataclass(frozen=True)
+class ThreadBudget:
+    app_cores: tuple[int, ...]
+    stt_cores: tuple[int, ...]
+    main_threads: int
+    realtime_threads: int
+
+    def to_dict(self) -> dict:
+        return {
+            "app_cores": list(self.app_cores),
+            "stt_cores": list(self.stt_cores),
+            "main_threads": self.main_threads,
+            "realtime_threads": self.realtime_threads,
+        }
+
+def plan_budget(cores: Optional[tuple[int, ...]] = None, app_cores: Optional[int] = None) -> ThreadBudget:
+    """
+    app_cores: cores kept free for the UI/event loop; default 1 on machines
+    with up to 4 cores, 2 above. With a single core everything shares it.
+    """
+    cores = cores or available_cores()
+    if app_cores is None:
+        app_cores = 1 if len(cores) <= 4 else 2
+    app_cores = min(app_cores, len(cores) - 1)
+    app, stt = cores[:app_cores], cores[app_cores:]
+    realtime = max(1, len(stt) // 3)
+    return ThreadBudget(app_cores=app, stt_cores=stt, main_threads=max(1, len(stt) - realtime), realtime_threads=realtime)
+
+class CPUSampler:
+    """System-wide CPU utilization (0..1) since the previous sample."""
+
+    def __init__(self):
+        self._last: Optional[tuple[float, float]] = None
+        self.source = "psutil" if psutil is not None else "procfs" if os.path.exists("/proc/stat") else None
+        if self.source is not None:
+            self.sample()  # prime the baseline
+
+    def sample(self) -> Optional[float]:
+        if self.source == "psutil":
+            return psutil.cpu_percent(interval=None) / 100
+        if self.source == "procfs":
+            with open("/proc/stat", encoding="ascii") as f:
+                values = [float(v) for v in f.readline().split()[1:]]
+            idle, total = values[3] + values[4], sum(values)  # idle + iowait
+            last, self._last = self._last, (idle, total)
+            if last is None or total <= last[1]:
+                return None
+            return 1 - (idle - last[0]) / (total - last[1])
+        return None
+
+class ResourceGovernor:
+    SAMPLE_INTERVAL = 1.0  # seconds
+    HIGH_LOAD = 0.85  # utilization that counts as saturated
+    LOW_LOAD = 0.60  # below this the realtime interval is relaxed again
+    SUSTAIN = 2  # consecutive samples before acting
+    MAX_SLOWDOWN = 4  # realtime interval multiplier cap
+
+    def __init__(
+        self,
+        budget: Optional[ThreadBudget] = None,
+        pin_stt: bool = False,
+        adaptive: bool = True,
+        sample_interval: float = SAMPLE_INTERVAL,
+        on_decision: Optional[Callable[[str, dict], None]] = None,
+        console_output=False,
+    ):
+        """on_decision(kind, details) is called from the monitor thread for every pin/slow-down/speed-up."""
+        self.budget = budget or plan_budget()
+        self.pin_stt = pin_stt
+        self.adaptive = adaptive
+        self.sample_interval = sample_interval
+        self.on_decision = on_decision
+        self.console_output = console_output
+        self.sampler = CPUSampler()
+        self.targets: dict[str, tuple[Callable[[float], None], float]] = {}
+        self.slowdown = 1
+        self._high = 0
+        self._low = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.utilization: Optional[float] = None
+        self.samples = 0
+        self.saturated_samples = 0
+        self.slowdowns = 0
+        self.speedups = 0
+        self.pinned: dict[str, list[int]] = {}
+        self.threads: dict[str, dict[str, Optional[int]]] = {}  # target -> model -> effective intra-op threads
+
+    def apply_to_profile(self, profile):
+        """
+        A copy of an stt.profiles.STTProfile with thread counts from the
+        budget. A calibrated cpu_threads is kept when it is lower (more
+        threads than calibrated did not help on this machine).
+        """
+        main = self.budget.main_threads
+        if profile.cpu_threads:
+            main = min(main, profile.cpu_threads)
+        realtime = min(self.budget.realtime_threads, main)
+        return replace(profile, cpu_threads=main, realtime_cpu_threads=realtime)
+
+    def note_threads(self, name: str, main: Optional[int], realtime: Optional[int] = None):
+        """
+        Thread counts a transcriber's models were loaded with (None = library
+        default, realtime None = no realtime model), as opposed to the budget.
+        """
+        self.threads[name] = {"main": main, "realtime": realtime}
+        if main != self.budget.main_threads or (realtime is not None and realtime != self.budget.realtime_threads):
+            self._decide("threads", {"target": name, "main": main, "realtime": realtime, "budget": self.budget.to_dict()})
+
+    def limit_torch_threads(self):
+        """Silero VAD runs through torch, which otherwise spreads tiny inferences over every core."""
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            torch.set_num_threads(1)
+
+    def pin(self, name: str, pid: int) -> bool:
+        """Pin a transcription process to the transcription cores, if pin_stt is set."""
+        if not self.pin_stt or not self.budget.stt_cores:
+            return False
+        cores = set(self.budget.stt_cores)
+        try:
+            if hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(pid, cores)
+            elif psutil is not None:
+                psutil.Process(pid).cpu_affinity(sorted(cores))
+            else:
+                if self.console_output:
+                    print("[RESOURCES] Core pinning needs psutil on this platform (pip install psutil)")
+                return False
+        except (OSError, ValueError) as e:
+            if self.console_output:
+                print(f"[RESOURCES] Could not pin {name}: {e}")
+            return False
+        self.pinned[name] = sorted(cores)
+        self._decide("pin", {"target": name, "cores": sorted(cores)})
+        return True
+
+    def register(self, name: str, set_interval: Callable[[float], None], base_interval: float):
+        """A realtime transcriber whose partial interval the governor may stretch."""
+        with self._lock:
+            self.targets[name] = (set_interval, base_interval)
+            if self.slowdown > 1:
+                set_interval(base_interval * self.slowdown)
+
+    def unregister(self, name: str):
+        with self._lock:
+            self.targets.pop(name, None)
+
+    def start(self):
+        if self._thread is not None or not self.adaptive or self.sampler.source is None:
+            if self.adaptive and self.sampler.source is None and self.console_output:
+                print("[RESOURCES] No CPU sampler available (pip install psutil); realtime interval stays fixed")
+            return self
+        self._thread = threading.Thread(target=self._run, name="resource-governor", daemon=True)
+        self._thread.start()
+        if self.console_output:
+            print(f"[RESOURCES] Budget {self.budget.to_dict()}, sampling {self.sampler.source}")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.sample_interval * 2)
+            self._thread = None
+
+    def observe(self, utilization: float):
+        """Feed one utilization sample; adjusts the realtime interval when load stays high or low."""
+        self.samples += 1
+        self.utilization = utilization
+        if utilization >= self.HIGH_LOAD:
+            self.saturated_samples += 1
+            self._high, self._low = self._high + 1, 0
+        elif utilization <= self.LOW_LOAD:
+            self._high, self._low = 0, self._low + 1
+        else:
+            self._high = self._low = 0
+        if self._high >= self.SUSTAIN and self.slowdown < self.MAX_SLOWDOWN:
+            self._high = 0
+            self.slowdowns += 1
+            self._set_slowdown(self.slowdown * 2, "slow_down", utilization)
+        elif self._low >= self.SUSTAIN and self.slowdown > 1:
+            self._low = 0
+            self.speedups += 1
+            self._set_slowdown(self.slowdown // 2, "speed_up", utilization)
+
+    def stats(self) -> dict:
+        with self._lock:
+            intervals = {name: round(base * self.slowdown, 3) for name, (_, base) in self.targets.items()}
+        return {
+            "budget": self.budget.to_dict(),
+            "threads": {name: dict(models) for name, models in self.threads.items()},
+            "pinned": dict(self.pinned),
+            "sampler": self.sampler.source,
+            "utilization": round(self.utilization, 3) if self.utilization is not None else None,
+            "samples": self.samples,
+            "saturated_samples": self.saturated_samples,
+            "slowdown": self.slowdown,
+            "slowdowns": self.slowdowns,
+            "speedups": self.speedups,
+            "realtime_interval_s": intervals,
+        }
+
+    def prometheus_lines(self) -> list[str]:
+        """Gauges/counters for tracing.Tracer.collectors."""
+        lines = [
+            "# HELP interview_copilot_cpu_utilization System CPU utilization seen by the resource governor.",
+            "# TYPE interview_copilot_cpu_utilization gauge",
+            f"interview_copilot_cpu_utilization {self.utilization if self.utilization is not None else 'NaN'}",
+            "# HELP interview_copilot_realtime_slowdown Multiplier applied to the realtime transcription interval.",
+            "# TYPE interview_copilot_realtime_slowdown gauge",
+            f"interview_copilot_realtime_slowdown {self.slowdown}",
+            "# HELP interview_copilot_governor_adjustments_total Realtime interval changes by direction.",
+            "# TYPE interview_copilot_governor_adjustments_total counter",
+            f'interview_copilot_governor_adjustments_total{{direction="slow_down"}} {self.slowdowns}',
+            f'interview_copilot_governor_adjustments_total{{direction="speed_up"}} {self.speedups}',
+            "# HELP interview_copilot_stt_threads Intra-op threads each transcriber's models loaded with.",
+            "# TYPE interview_copilot_stt_threads gauge",
+        ]
+        for name, models in self.threads.items():
+            for model, threads in models.items():
+                if threads is not None:
+                    lines.append(f'interview_copilot_stt_threads{{target="{name}",model="{model}"}} {threads}')
+        return lines
+
+    def _set_slowdown(self, slowdown: int, kind: str, utilization: float):
+        with self._lock:
+            self.slowdown = slowdown
+            targets = list(self.targets.items())
+        for name, (set_interval, base) in targets:
+            try:
+                set_interval(base * slowdown)
+            except Exception as e:
+                if self.console_output:
+                    print(f"[RESOURCES] Could not retune {name}: {e}")
+        self._decide(kind, {"slowdown": slowdown, "utilization": round(utilization, 3)})
+
+    def _decide(self, kind: str, details: dict):
+        if self.console_output:
+            print(f"[RESOURCES] {kind}: {details}")
+        if self.on_decision is not None:
+            self.on_decision(kind, details)
+
+    def _run(self):
+        while not self._stop.wait(self.sample_interval):
+            try:
+                utilization = self.sampler.sample()
+            except OSError:
+                continue
+            if utilization is not None:
+                self.observe(utilization)
@@ -0,0 +1,111 @@
+"""
+Append-only session log.
+
+Every final transcript, classification and answer of a session (and, when
+tracing is on, each utterance's stage timings) becomes one JSON line:
+
+    {"t": 12.345, "ts": 1718000000.123, "kind": "final", "text": "..."}
+
+t is seconds since the session started (monotonic), ts the wall clock.
+record() only timestamps the event and appends it to an in-memory queue; a
+background thread serializes and writes whatever has queued up every
+flush_interval, so the transcription and answer path never waits on the
+disk. At most flush_interval seconds of events are lost on a hard crash.
+
+replay_session.py feeds a logged session back through the pipeline.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from typing import Optional
+
+from core import tracing
+
+SESSIONS_DIR = os.getenv("SESSIONS_DIR", "sessions")
+
+class SessionRecorder:
+    FLUSH_INTERVAL = 0.5  # seconds
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        flush_interval: float = FLUSH_INTERVAL,
+        record_partials: bool = True,
+        metadata: Optional[dict] = None,
+        session_id: Optional[str] = None,
+    ):
+        """session_id: only record traces tagged with it (core.engine runs several sessions per process)."""
+        if path is None:
+            os.makedirs(SESSIONS_DIR, exist_ok=True)
+            path = os.path.join(SESSIONS_DIR, time.strftime("session-%Y%m%d-%H%M%S.jsonl"))
+        self.path = path
+        self.flush_interval = flush_interval
+        self.record_partials = record_partials
+        self.session_id = session_id
+        self.started = time.monotonic()
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._closed = threading.Event()
+
+        self.recorded = 0
+        self.written = 0
+        self.flushes = 0
+
+        self._writer = threading.Thread(target=self._run, name="session-log", daemon=True)
+        self._writer.start()
+        tracing.tracer.on_finish.append(self._on_trace)
+        self.record("session_start", **(metadata or {}))
+
+    def record(self, kind: str, **fields):
+        """Queue one event. Thread-safe and never blocks on I/O."""
+        if self._closed.is_set():
+            return
+        self.recorded += 1
+        self._queue.put((time.monotonic() - self.started, time.time(), kind, fields))
+
+    def partial(self, text: str):
+        if self.record_partials:
+            self.record("partial", text=text)
+
+    def close(self):
+        """Write everything still queued and stop the writer."""
+        if self._closed.is_set():
+            return
+        if self._on_trace in tracing.tracer.on_finish:
+            tracing.tracer.on_finish.remove(self._on_trace)
+        self.record("session_end")
+        self._closed.set()
+        self._writer.join(timeout=5)
+
+    def stats(self) -> dict:
+        return {"path": self.path, "recorded": self.recorded, "written": self.written, "flushes": self.flushes}
+
+    def _on_trace(self, trace: tracing.Trace):
+        if self.session_id is not None and trace.tags.get("session") != self.session_id:
+            return
+        entry = trace.to_dict()
+        self.record("trace", text=entry["text"], spans_ms=entry["spans_ms"], tags=entry["tags"])
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                closing = self._closed.wait(self.flush_interval)
+                lines = []
+                try:
+                    while True:
+                        t, ts, kind, fields = self._queue.get_nowait()
+                        lines.append(json.dumps({"t": round(t, 4), "ts": round(ts, 3), "kind": kind, **fields}, ensure_ascii=False))
+                except queue.Empty:
+                    pass
+                if lines:
+                    f.write("\n".join(lines) + "\n")
+                    f.flush()
+                    self.written += len(lines)
+                    self.flushes += 1
+                if closing:
+                    return
+
+def load_session(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
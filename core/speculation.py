@@ -0,0 +1,161 @@
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Optional
+
+from nlp.classifier import ClassificationResult, NLPClassifier
+from nlp.answer_generation import AnswerGenerator, AnswerStream, LLMAnswer
+from nlp.combined import CombinedResponder
+from nlp.fast_classifier import FastClassifier
+
+_PUNCT_RE = re.compile(r"[^a-z0-9' ]+")
+
+def normalize(text: str) -> str:
+    return " ".join(_PUNCT_RE.sub(" ", text.lower()).split())
+
+def similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, normalize(a), normalize(b)).ratio()
+
+def _finished(future: asyncio.Future):
+    """future's result if it completed normally, else None."""
+    if future.done() and not future.cancelled() and future.exception() is None:
+        return future.result()
+    return None
+
+@dataclass
+class Speculation:
+    text: str
+    classification: asyncio.Future  # -> ClassificationResult
+    answer: asyncio.Task  # -> Optional[LLMAnswer], None when not a question
+    stream: AnswerStream  # deltas of `answer` as they arrive
+    started_at: float = field(default_factory=time.time)
+
+    def cancel(self):
+        self.classification.cancel()
+        self.answer.cancel()
+
+class SpeculativeRunner:
+    """
+    Starts classification and answer generation from a stabilized partial
+    transcript that already looks like a complete question, before the
+    end-of-speech silence produces the final text.
+
+    A discarded speculation is cancelled, and whatever it already committed
+    (classifier and answer history, a fresh answer cache entry) is rolled
+    back, so only questions that were really asked shape later answers.
+
+    All methods must be called from the event loop thread.
+    """
+
+    MATCH_THRESHOLD = 0.85  # final vs. partial similarity needed to reuse the result
+    MIN_WORDS = 4
+    QUESTION_CONFIDENCE = 0.85
+
+    def __init__(
+        self,
+        classifier: NLPClassifier,
+        generator: AnswerGenerator,
+        mode: str = "concise",
+        match_threshold: float = MATCH_THRESHOLD,
+        min_words: int = MIN_WORDS,
+        responder: Optional[CombinedResponder] = None,
+        console_output=False,
+    ):
+        self.classifier = classifier
+        self.generator = generator
+        self.mode = mode
+        self.match_threshold = match_threshold
+        self.min_words = min_words
+        self.responder = responder  # single-call classify + answer when set
+        self.console_output = console_output
+        self.detector = classifier.fast_path or FastClassifier()
+        self.current: Optional[Speculation] = None
+
+        self.started = 0
+        self.reused = 0
+        self.discarded = 0
+        self.rolled_back = 0
+
+    def looks_complete(self, text: str) -> bool:
+        if len(text.split()) < self.min_words:
+            return False
+        guess = self.detector.predict(text)
+        return guess.label == "question" and guess.confidence >= self.QUESTION_CONFIDENCE
+
+    def on_partial(self, text: str):
+        if not self.looks_complete(text):
+            return
+        if self.current is not None:
+            if similarity(self.current.text, text) >= self.match_threshold:
+                return  # still the same question, keep the running speculation
+            self._discard(self.current)
+        self.current = self._launch(text)
+
+    def claim(self, final_text: str) -> Optional[Speculation]:
+        """Hand over the running speculation if it matches the final text, else cancel it."""
+        spec, self.current = self.current, None
+        if spec is None:
+            return None
+        if similarity(spec.text, final_text) >= self.match_threshold:
+            self.reused += 1
+            if self.console_output:
+                print(f"[SPECULATION] Reusing result for: {spec.text}")
+            return spec
+        self._discard(spec)
+        return None
+
+    def cancel(self):
+        if self.current is not None:
+            self._discard(self.current)
+            self.current = None
+
+    def stats(self) -> dict:
+        return {"started": self.started, "reused": self.reused, "discarded": self.discarded, "rolled_back": self.rolled_back}
+
+    def _discard(self, spec: Speculation):
+        spec.cancel()
+        self.discarded += 1
+        if self.console_output:
+            print(f"[SPECULATION] Discarded: {spec.text}")
+        self._rollback(spec)
+
+    def _rollback(self, spec: Speculation):
+        """Undo the commits of the parts of spec that finished before it was cancelled."""
+        res: Optional[ClassificationResult] = _finished(spec.classification)
+        if res is None or res.action != "respond":
+            return  # only "respond" classifications are remembered
+        self.classifier.forget(spec.text, res)
+        answer: Optional[LLMAnswer] = _finished(spec.answer)
+        if answer is not None:
+            # fallback answers are never committed, and then match nothing here
+            self.generator.forget(spec.text, answer.text)
+            if self.generator.cache is not None:
+                self.generator.cache.discard(spec.text, res.intent, self.mode, answer.text, since=spec.started_at)
+        self.rolled_back += 1
+        if self.console_output:
+            print(f"[SPECULATION] Rolled back: {spec.text}")
+
+    def _launch(self, text: str) -> Speculation:
+        self.started += 1
+        if self.console_output:
+            print(f"[SPECULATION] Starting on partial: {text}")
+        stream = AnswerStream(text)
+        if self.responder is not None:
+            classification, answer = self.responder.start(text, self.mode, stream=stream)
+            return Speculation(text=text, classification=classification, answer=answer, stream=stream)
+        classification = asyncio.create_task(self.classifier.classify(text))
+        answer = asyncio.create_task(self._answer(text, classification, stream))
+        return Speculation(text=text, classification=classification, answer=answer, stream=stream)
+
+    async def _answer(self, text: str, classification: asyncio.Future, stream: AnswerStream) -> Optional[LLMAnswer]:
+        try:
+            res: ClassificationResult = await asyncio.shield(classification)
+        except BaseException:
+            stream.close(None)
+            raise
+        if res.action != "respond":
+            stream.close(None)
+            return None
+        return await self.generator.generate(question=text, intent=res.intent, mode=self.mode, stream=stream)
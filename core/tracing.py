@@ -0,0 +1,285 @@
+"""
+Per-utterance stage timing.
+
+A Trace holds monotonic-clock marks for one utterance as it moves through
+realtimeSTT -> NLPClassifier -> AnswerGenerator. The active trace travels
+in a ContextVar, so the classifier and generator pick it up without any
+signature changes. Finished traces feed histograms that can be exported as
+JSONL or served as Prometheus text. JSONL lines are written by a background
+thread in batches (like core.session_log), never on the event loop.
+
+Disabled by default: tracer.start() then returns None and every hook is a
+single ContextVar lookup.
+"""
+import contextlib
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+# (span name, start mark, end mark)
+SPANS = (
+    ("endpointing", "speech_end", "final"),
+    ("coalescing", "final", "coalesced"),
+    ("queue_wait", "final", "classify_start"),
+    ("classify", "classify_start", "classify_end"),
+    ("answer_queue", "classify_end", "answer_start"),
+    ("time_to_first_token", "answer_start", "first_token"),
+    ("streaming", "first_token", "answer_end"),
+    ("final_to_answer", "final", "answer_end"),
+    ("end_to_end", "speech_end", "answer_end"),
+)
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_RATE_BUCKETS = (5, 10, 25, 50, 100, 200, 400, 800, 1600)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Upper bucket bound containing the q-quantile (coarse, but cheap),
+        capped at the largest observed value, so the overflow bucket stays finite.
+        """
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+class Trace:
+    __slots__ = ("id", "text", "marks", "counters", "tags", "tracer", "finished")
+
+    def __init__(self, tracer: "Tracer", trace_id: int, text: Optional[str]):
+        self.id = trace_id
+        self.text = text
+        self.marks: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+        self.tags: dict[str, str] = {}
+        self.tracer = tracer
+        self.finished = False
+
+    def mark(self, name: str, t: Optional[float] = None):
+        """Record a mark; the first value for a name wins."""
+        if name not in self.marks:
+            self.marks[name] = time.monotonic() if t is None else t
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def span(self, start: str, end: str) -> Optional[float]:
+        if start in self.marks and end in self.marks:
+            return self.marks[end] - self.marks[start]
+        return None
+
+    def finish(self):
+        if not self.finished:
+            self.finished = True
+            self.tracer.finish(self)
+
+    def to_dict(self) -> dict:
+        origin = min(self.marks.values()) if self.marks else 0.0
+        spans = {}
+        for name, start, end in SPANS:
+            value = self.span(start, end)
+            if value is not None:
+                spans[name] = round(value * 1000, 3)
+        return {
+            "id": self.id,
+            "text": self.text,
+            "marks_ms": {k: round((v - origin) * 1000, 3) for k, v in self.marks.items()},
+            "spans_ms": spans,
+            "counters": self.counters,
+            "tags": self.tags,
+        }
+
+_current: ContextVar[Optional[Trace]] = ContextVar("utterance_trace", default=None)
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+@contextlib.contextmanager
+def use(trace: Optional[Trace]):
+    """Make trace the active trace for the enclosed code (and tasks it creates)."""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+class Tracer:
+    FLUSH_INTERVAL = 0.5  # seconds between JSONL writes
+
+    def __init__(self, enabled: bool = False, jsonl_path: Optional[str] = None, flush_interval: float = FLUSH_INTERVAL):
+        self.enabled = enabled
+        self.jsonl_path = jsonl_path
+        self.flush_interval = flush_interval
+        self.on_finish: list[Callable[[Trace], None]] = []
+        # extra Prometheus lines (gauges from other components) appended to prometheus_text()
+        self.collectors: list[Callable[[], list[str]]] = []
+        self.histograms = {name: Histogram(LATENCY_BUCKETS) for name, _, _ in SPANS}
+        self.token_rate = Histogram(TOKEN_RATE_BUCKETS)
+        self.finished = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._records: queue.SimpleQueue = queue.SimpleQueue()  # trace dicts waiting for the writer
+        self._writer: Optional[threading.Thread] = None
+        self._closing = threading.Event()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self, text: Optional[str] = None) -> Optional[Trace]:
+        if not self.enabled:
+            return None
+        return Trace(self, next(self._ids), text)
+
+    def finish(self, trace: Trace):
+        with self._lock:
+            self.finished += 1
+            for name, start, end in SPANS:
+                value = trace.span(start, end)
+                if value is not None:
+                    self.histograms[name].observe(value)
+            streaming = trace.span("first_token", "answer_end")
+            tokens = trace.counters.get("tokens", 0)
+            if streaming and tokens:
+                self.token_rate.observe(tokens / streaming)
+            if self.jsonl_path:
+                if self._writer is None:
+                    self._closing.clear()
+                    self._writer = threading.Thread(target=self._write_jsonl, args=(self.jsonl_path,), name="trace-log", daemon=True)
+                    self._writer.start()
+                self._records.put(trace.to_dict())  # serialized and written off the event loop
+        for callback in self.on_finish:
+            callback(trace)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = {}
+            for name, hist in self.histograms.items():
+                if hist.count:
+                    stages[name] = {
+                        "count": hist.count,
+                        "mean_ms": round(hist.sum / hist.count * 1000, 2),
+                        "p50_le_ms": hist.quantile(0.5) * 1000,  # type: ignore
+                        "p95_le_ms": hist.quantile(0.95) * 1000,  # type: ignore
+                    }
+            return {"utterances": self.finished, "stages": stages}
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP interview_copilot_stage_seconds Per-utterance stage latency.",
+            "# TYPE interview_copilot_stage_seconds histogram",
+        ]
+        with self._lock:
+            for name, hist in self.histograms.items():
+                lines += _histogram_lines("interview_copilot_stage_seconds", hist, f'stage="{name}",')
+            lines += [
+                "# HELP interview_copilot_token_rate Answer streaming throughput in tokens per second.",
+                "# TYPE interview_copilot_token_rate histogram",
+            ]
+            lines += _histogram_lines("interview_copilot_token_rate", self.token_rate, "")
+        for collect in self.collectors:
+            lines += collect()
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port: int, host: str = "127.0.0.1"):
+        """Expose prometheus_text() at http://host:port/metrics from a daemon thread."""
+        tracer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._closing.set()  # the writer drains the queue before it exits
+            writer.join(timeout=5)
+
+    def _write_jsonl(self, path: str):
+        with open(path, "a", encoding="utf-8") as f:
+            while True:
+                closing = self._closing.wait(self.flush_interval)
+                lines = []
+                try:
+                    while True:
+                        lines.append(json.dumps(self._records.get_nowait()))
+                except queue.Empty:
+                    pass
+                if lines:
+                    f.write("\n".join(lines) + "\n")
+                    f.flush()
+                if closing:
+                    return
+
+def _histogram_lines(metric: str, hist: Histogram, labels: str) -> list[str]:
+    lines, cumulative = [], 0
+    for bound, n in zip(hist.buckets + (float("inf"),), hist.counts):
+        cumulative += n
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f'{metric}_bucket{{{labels}le="{le}"}} {cumulative}')
+    plain = f"{{{labels.rstrip(',')}}}" if labels else ""
+    lines.append(f"{metric}_sum{plain} {hist.sum}")
+    lines.append(f"{metric}_count{plain} {hist.count}")
+    return lines
+
+tracer = Tracer()
+
+def configure_from_env(console_output=False) -> Tracer:
+    """
+    TRACE_JSONL=path  write one JSON line per finished utterance
+    METRICS_PORT=n    serve Prometheus text at http://127.0.0.1:n/metrics
+    Tracing stays disabled (near-zero overhead) when neither is set.
+    """
+    jsonl_path = os.getenv("TRACE_JSONL") or None
+    metrics_port = os.getenv("METRICS_PORT")
+    if jsonl_path or metrics_port:
+        tracer.enabled = True
+        tracer.jsonl_path = jsonl_path
+        if metrics_port:
+            tracer.serve_metrics(int(metrics_port))
+        if console_output:
+            print(f"[TRACING] Enabled (jsonl={jsonl_path}, metrics_port={metrics_port})")
+    return tracer
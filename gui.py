@@ -1,10 +1,14 @@
 import customtkinter as ctk
 import asyncio
 import threading
+import os
 import ctypes
-from stt.realtimeSTT import realtimeSTT
-from nlp.classifier import NLPClassifier
-from nlp.answer_generation import AnswerGenerator
+import time
+from core import tracing
+from ui_scheduler import UIUpdateScheduler
+
+# stt (faster-whisper, torch) and nlp (LLM SDK) are imported by
+# UltraMinimalHUD.warm_up on a background thread so the window shows at once
 
 # --- Win32 Stealth Constants ---
 GWL_EXSTYLE = -20
@@ -14,6 +18,8 @@ WDA_EXCLUDEFROMCAPTURE = 0x00000011
 WS_EX_TOOLWINDOW = 0x00000080  # The secret to hiding from Taskbar
 WS_EX_APPWINDOW = 0x00040000   # The style we want to remove
 
+ANSWER_FRAME_MS = 33  # streamed answer text is appended at most ~30 times a second
+
 def set_click_through(hwnd, enabled=True):
     try:
         style = ctypes.windll.user32.GetWindowLongW(hwnd, GWL_EXSTYLE)
@@ -80,22 +86,55 @@ class UltraMinimalHUD(ctk.CTk):
                                        wrap="word", corner_radius=4)
         self.answer_box.grid(row=1, column=0, sticky="nsew", pady=(2, 2))
 
-        # 4. CLOSE BUTTON
+        # 4. EXPAND BUTTON (detailed version of the current answer, also Ctrl+E)
+        self.expand_btn = ctk.CTkButton(self, text="+", width=30, height=30,
+                                       fg_color="transparent", text_color=self.accent,
+                                       hover_color="#222", font=("Arial", 18, "bold"),
+                                       command=self.expand_answer)
+        self.expand_btn.grid(row=0, column=3, sticky="ne", pady=5)
+
+        # 5. CLOSE BUTTON
         self.close_btn = ctk.CTkButton(self, text="×", width=30, height=30,
                                       fg_color="transparent", text_color="#ff5555",
                                       hover_color="#331111", font=("Arial", 20),
                                       command=self.on_closing)
-        self.close_btn.grid(row=0, column=3, padx=10, sticky="ne", pady=5)
+        self.close_btn.grid(row=0, column=4, padx=10, sticky="ne", pady=5)
 
-        # Logic
-        self.classifier = NLPClassifier()
-        self.llm_generator = AnswerGenerator()
+        # Logic (built by warm_up)
+        self.tracer = tracing.configure_from_env()
+        self.classifier = None
+        self.answer_cache = None
+        self.knowledge = None
+        self.llm_generator = None
+        self.pipeline = None
         self.stt = None
+        self.governor = None
+        self.session = None
+        self.answer_stream = None
+        self.answer_shown = 0  # deltas of answer_stream already in the textbox
+        self.launched_at = time.perf_counter()
+        self.session_requested_at = None
+        # background threads post widget updates here instead of after(0, ...)
+        self.ui = UIUpdateScheduler(self)
+        self._hit_rects = None  # screen rects that disable click-through, see check_mouse_position
+        self._pointer_state = None
+        self._hwnd = None
+
+        # One long-lived asyncio loop for all sessions, so the shared LLM
+        # connection pool (bound to its loop) stays warm between sessions
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+        self.btn_toggle.configure(text="...", text_color="#ffa620", state="disabled")
+        self.transcript_line.configure(text="Loading speech models...", text_color="#ffa620")
+        threading.Thread(target=self.warm_up, name="warm-up", daemon=True).start()
 
         self.drag_handle.bind("<ButtonPress-1>", self.start_move)
         self.drag_handle.bind("<B1-Motion>", self.do_move)
         self.handle_label.bind("<ButtonPress-1>", self.start_move)
         self.handle_label.bind("<B1-Motion>", self.do_move)
+        self.bind("<Configure>", self.invalidate_hit_rects)
+        self.bind("<Control-e>", self.expand_answer)
         
         self.after(10, self.hide_from_taskbar)
         self.after(100, self.apply_initial_styles)
@@ -125,32 +164,40 @@ class UltraMinimalHUD(ctk.CTk):
         except Exception as e:
             print(f"Taskbar Stealth Error: {e}")
 
+    def invalidate_hit_rects(self, event=None):
+        self._hit_rects = None
+
+    def compute_hit_rects(self):
+        """Screen rects of the interactive widgets; only recomputed after a move/resize."""
+        rects = []
+        for w in (self.drag_handle, self.btn_toggle, self.expand_btn, self.close_btn):
+            wx, wy = w.winfo_rootx(), w.winfo_rooty()
+            rects.append((wx, wy, wx + w.winfo_width(), wy + w.winfo_height()))
+        # right edge of the answer box, so it can be scrolled
+        ax, ay = self.answer_box.winfo_rootx(), self.answer_box.winfo_rooty()
+        aw, ah = self.answer_box.winfo_width(), self.answer_box.winfo_height()
+        rects.append((ax + aw - 100, ay, ax + aw, ay + ah))
+        return rects
+
     def check_mouse_position(self):
         try:
-            px, py = self.winfo_pointerx(), self.winfo_pointery()
-            widgets = [self.drag_handle, self.btn_toggle, self.close_btn]
-            over_interactive = False
-            for w in widgets:
-                wx, wy = w.winfo_rootx(), w.winfo_rooty()
-                ww, wh = w.winfo_width(), w.winfo_height()
-                if wx <= px <= wx + ww and wy <= py <= wy + wh:
-                    over_interactive = True
-                    break
-            
-            ax = self.answer_box.winfo_rootx()
-            ay = self.answer_box.winfo_rooty()
-            aw = self.answer_box.winfo_width()
-            ah = self.answer_box.winfo_height()
-            if ax + aw - 100 <= px <= ax + aw and ay <= py <= ay + ah:
-                over_interactive = True
-            
-            hwnd = ctypes.windll.user32.GetParent(self.winfo_id()) or self.winfo_id()
-            if over_interactive:
-                set_click_through(hwnd, enabled=False)
-                self.attributes("-alpha", 1.0)
-            elif self.active:
-                set_click_through(hwnd, enabled=True)
-                self.attributes("-alpha", 0.7)
+            if self._hit_rects is None:
+                self._hit_rects = self.compute_hit_rects()
+            px, py = self.winfo_pointerxy()
+            over_interactive = any(x0 <= px <= x1 and y0 <= py <= y1 for x0, y0, x1, y1 in self._hit_rects)
+
+            # only touch the window styles when something changed
+            state = (over_interactive, self.active)
+            if state != self._pointer_state:
+                self._pointer_state = state
+                if self._hwnd is None:
+                    self._hwnd = ctypes.windll.user32.GetParent(self.winfo_id()) or self.winfo_id()
+                if over_interactive:
+                    set_click_through(self._hwnd, enabled=False)
+                    self.attributes("-alpha", 1.0)
+                elif self.active:
+                    set_click_through(self._hwnd, enabled=True)
+                    self.attributes("-alpha", 0.7)
         except: pass
         self.after(100, self.check_mouse_position)
 
@@ -163,43 +210,80 @@ class UltraMinimalHUD(ctk.CTk):
     def apply_initial_styles(self):
         ensure_stealth(self)
 
+    def warm_up(self):
+        """Background thread: heavy imports, models and LLM connection, once per app run."""
+        try:
+            from stt.realtimeSTT import realtimeSTT
+            from nlp.classifier import NLPClassifier
+            from nlp.answer_generation import AnswerGenerator
+            from nlp.answer_cache import AnswerCache
+            from nlp.retrieval import KNOWLEDGE_DIR, KnowledgeBase
+            from nlp import llm_client
+            from core.pipeline import Pipeline
+            from core.session_log import SessionRecorder
+            from core.resources import ResourceGovernor
+
+            # Warm the LLM connection while the STT models load
+            asyncio.run_coroutine_threadsafe(llm_client.prewarm(), self.loop)
+            self.classifier = NLPClassifier()
+            self.answer_cache = AnswerCache()
+            if os.path.isdir(KNOWLEDGE_DIR):
+                self.knowledge = KnowledgeBase(console_output=True)
+                self.knowledge.reindex()
+            self.llm_generator = AnswerGenerator(cache=self.answer_cache, knowledge=self.knowledge, prefetch_detailed=True)
+            self.pipeline = Pipeline(
+                self.classifier,
+                self.llm_generator,
+                on_answer_stream=self.gui_answer_stream,
+                speculative=False,
+                combined=False,
+                coalesce=True,
+                recorder=SessionRecorder(metadata={"frontend": "gui"}),
+            )
+            # keep cores free for Tk and the event loop; RealtimeSTT transcribes in its own process on Windows
+            self.governor = ResourceGovernor(pin_stt=True)
+            self.tracer.collectors.append(self.governor.prometheus_lines)
+            self.stt = realtimeSTT(
+                governor=self.governor,
+                input_device_index=1,
+                partial_update=self.gui_partial_update,
+                final_update=self.gui_final_update,
+                on_ready=self.gui_session_ready,
+            )
+            print(f"[GUI] Cold start: {time.perf_counter() - self.launched_at:.2f} s "
+                  f"(models {self.stt.timings['cold_start_s']} s)")
+            self.governor.start()
+            self.ui.post("idle", self.reset_ui_to_idle)
+        except Exception as e:
+            self.ui.post("transcript", self.transcript_line.configure, text=f"ERROR: {e}", text_color="#ff5555")
+
     def toggle_session(self):
+        if self.stt is None:
+            return
         if not self.active:
-            # Starting Phase
+            # Starting Phase: resume the warm recorder
             self.active = True
+            self.session_requested_at = time.perf_counter()
             self.btn_toggle.configure(text="...", text_color="#ffa620", state="disabled")
             self.transcript_line.configure(text="Initializing...", text_color="#ffa620")
-            
-            # Use after() to let the UI update before blocking the thread with STT init
-            self.after(200, self.launch_stt_thread)
+            self.session = asyncio.run_coroutine_threadsafe(self.run_session(self.stt), self.loop)
+            self.session.add_done_callback(lambda _: self.ui.post("idle", self.reset_ui_to_idle))
         else:
-            # Stopping Phase
+            # Stopping Phase: pause keeps the models loaded for the next session
             self.active = False
             self.btn_toggle.configure(text="...", text_color="#ff5555", state="disabled")
             self.transcript_line.configure(text="Stopping...", text_color="#ff5555")
-            
-            if self.stt:
-                self.stt.stop()
-                self.stt = None
-            
-            self.after(500, self.reset_ui_to_idle)
+            threading.Thread(target=self.stt.pause, daemon=True).start()
 
-    def launch_stt_thread(self):
-        try:
-            self.stt = realtimeSTT(
-                input_device_index=1, 
-                partial_update=self.gui_partial_update,
-                final_update=self.gui_final_update
-            )
-            threading.Thread(target=self.run_stt, daemon=True).start()
-            
-            self.btn_toggle.configure(text="■", text_color="#ff5555", state="normal")
-            self.transcript_line.configure(text="Listening...", text_color=self.accent)
-        except Exception as e:
-            self.transcript_line.configure(text=f"ERROR: {str(e)}", text_color="#ff5555")
-            self.reset_ui_to_idle()
+    def gui_session_ready(self):
+        elapsed = time.perf_counter() - self.session_requested_at  # type: ignore
+        print(f"[GUI] Session {self.stt.sessions} listening after {elapsed * 1000:.0f} ms")  # type: ignore
+        self.ui.post("toggle", self.btn_toggle.configure, text="■", text_color="#ff5555", state="normal")
+        self.ui.post("transcript", self.transcript_line.configure, text="Listening...", text_color=self.accent)
 
     def reset_ui_to_idle(self):
+        self.ui.cancel("transcript")
+        self.ui.cancel("toggle")
         self.active = False
         self.btn_toggle.configure(text="▶", text_color=self.accent, state="normal")
         self.transcript_line.configure(text="Ready to assist.", text_color="#666")
@@ -208,14 +292,48 @@ class UltraMinimalHUD(ctk.CTk):
 
     def gui_partial_update(self, text):
         display_text = text[-90:] if len(text) > 90 else text
-        self.after(0, lambda: self.transcript_line.configure(text=f"• {display_text}", text_color="white"))
+        self.ui.post("transcript", self.transcript_line.configure, text=f"• {display_text}", text_color="white")
+        self.pipeline.on_partial(text)
 
     async def gui_final_update(self, text):
-        self.after(0, lambda: self.transcript_line.configure(text=f"Q: {text}", text_color=self.accent))
-        res = await self.classifier.classify(text)
-        if res.action == "respond":
-            ans = await self.llm_generator.generate(question=text, intent=res.intent)
-            self.after(0, self.show_ai_response, ans.text)
+        self.ui.post("transcript", self.transcript_line.configure, text=f"Q: {text}", text_color=self.accent)
+        await self.pipeline.submit(text)
+
+    def gui_answer_stream(self, text, res, stream):
+        # runs on the asyncio loop thread; rendering happens on Tk timers
+        self.ui.post("answer", self.show_answer_stream, stream)
+
+    def expand_answer(self, event=None):
+        if self.pipeline is not None:
+            self.loop.call_soon_threadsafe(self.show_expansion)
+
+    def show_expansion(self):
+        # runs on the asyncio loop thread; instant when the expansion was prefetched
+        stream = self.pipeline.expand()  # type: ignore
+        if stream is not None:
+            self.ui.post("answer", self.show_answer_stream, stream)
+
+    def show_answer_stream(self, stream):
+        self.answer_stream = stream
+        self.answer_shown = 0
+        self.show_ai_response("")
+        self.render_answer_stream(stream)
+
+    def render_answer_stream(self, stream):
+        """Append the deltas that arrived since the last frame, coalesced into one insert."""
+        if stream is not self.answer_stream:
+            return  # superseded by a newer answer
+        count = len(stream.deltas)
+        if count > self.answer_shown:
+            self.answer_box.insert("end", "".join(stream.deltas[self.answer_shown:count]))
+            self.answer_box.see("end")
+            self.answer_shown = count
+        if stream.done and self.answer_shown == len(stream.deltas):
+            final = stream.answer.text if stream.answer is not None else None
+            if final is not None and final != stream.text.strip():
+                self.show_ai_response(final)  # e.g. the fallback answer, which is not streamed
+            return
+        self.after(ANSWER_FRAME_MS, self.render_answer_stream, stream)
 
     def show_ai_response(self, text):
         self.geometry("900x220") 
@@ -223,16 +341,40 @@ class UltraMinimalHUD(ctk.CTk):
         self.answer_box.delete("1.0", "end")
         self.answer_box.insert("1.0", text)
 
-    def run_stt(self):
-        if not self.stt: return
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+    async def run_session(self, stt):
+        if self.knowledge is not None:
+            # pick up notes edited between sessions; searches also run on this loop, so never concurrently
+            self.knowledge.reindex()
+        if self.pipeline.recorder is not None:
+            self.pipeline.recorder.record("listening", session=stt.sessions + 1)
+        self.pipeline.start()
         try:
-            loop.run_until_complete(self.stt.start())
+            await stt.start()
         except Exception: pass
+        finally:
+            await self.pipeline.stop()
 
     def on_closing(self):
         if self.stt: self.stt.stop()
+        if self.pipeline is not None:
+            from nlp import llm_client
+            try:
+                asyncio.run_coroutine_threadsafe(llm_client.close_client(), self.loop).result(timeout=2)
+            except Exception: pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.answer_cache is not None:
+            self.answer_cache.close()
+        if self.pipeline is not None and self.pipeline.recorder is not None:
+            self.pipeline.recorder.close()
+        if self.knowledge is not None:
+            self.knowledge.close()
+        if self.governor is not None:
+            self.governor.stop()
+            print(f"[GUI] Resources: {self.governor.stats()}")
+        if self.pipeline is not None:
+            print(f"[GUI] Superseded answers: {self.pipeline.cancellation_stats()}")
+        self.tracer.close()
+        print(f"[GUI] UI updates: {self.ui.stats()}")
         self.destroy()
 
 if __name__ == "__main__":
@@ -0,0 +1,33 @@
+"""
+Build or refresh the local knowledge base used to ground answers.
+
+Put the candidate's resume, notes and project write-ups (.txt/.md/.rst,
+.pdf with `pip install pypdf`) in a folder and index it. Only files that
+changed since the last run are re-read:
+
+    python index_knowledge.py                     # ./knowledge -> ./knowledge_index
+    python index_knowledge.py ~/interview-notes --query "How did you scale the billing service?"
+
+main.py and gui.py refresh the index themselves when the folder exists
+(KNOWLEDGE_DIR / KNOWLEDGE_INDEX in .env).
+"""
+import argparse
+
+from nlp.retrieval import INDEX_DIR, KNOWLEDGE_DIR, KnowledgeBase, format_context
+
+def main(args):
+    kb = KnowledgeBase(args.source, args.index, console_output=True)
+    kb.reindex(force=args.force)
+    for query in args.query:
+        passages = kb.context(query)
+        print(f"\n[{query}] {kb.last_query_ms:.2f} ms")
+        print(format_context(passages) or "  (no matching notes)")
+    kb.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index notes/resume/project docs for grounded answers")
+    parser.add_argument("source", nargs="?", default=KNOWLEDGE_DIR, help="folder of documents")
+    parser.add_argument("--index", default=INDEX_DIR, help="where to keep the index")
+    parser.add_argument("--force", action="store_true", help="re-read every file")
+    parser.add_argument("--query", nargs="*", default=[], help="show what would be retrieved for these questions")
+    main(parser.parse_args())
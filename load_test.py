@@ -0,0 +1,227 @@
+"""
+Load test for the multi-session engine (core/engine.py).
+
+Simulates N concurrent interview sessions in one process. Each session
+replays the transcript corpus (benchmark.py format) through its own Session
+against the mock LLM backend. The backend runs in a separate process, so
+its CPU use is not charged to the engine. N is stepped up until a level
+misses the latency SLO (p95 end of speech -> first token), the event loop
+lag budget or the fallback-answer budget:
+
+    python load_test.py --sessions 1 2 4 8 16 32 64 --speed 4
+    python load_test.py --sessions 8 16 32 --combined --pool-connections 64 --output load.json
+
+The largest level that passes is reported as the per-process limit for
+that configuration. Event loop lag (how late a 50 ms timer fires) shows
+when one loop can no longer keep up. CPU is this process's CPU time per
+wall second. If latency fails while CPU and lag are low, try a larger
+--pool-connections: the shared LLM connection pool may be the limit.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import time
+
+import httpx
+
+import benchmark
+from core import tracing
+from nlp import llm_client
+
+LAG_INTERVAL = 0.05  # seconds between event loop lag probes
+
+def _serve_mock(options: dict, ready):
+    """Mock backend process entry point."""
+    from mock_llm_server import MockLLMServer
+
+    async def serve():
+        server = MockLLMServer(port=0, **options)
+        await server.start()
+        ready.send(server.base_url)
+        ready.close()
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+def start_mock(args) -> tuple[multiprocessing.process.BaseProcess, str]:
+    context = multiprocessing.get_context("spawn")
+    parent, child = context.Pipe(duplex=False)
+    options = dict(
+        first_token_latency=args.first_token_ms / 1000,
+        token_latency=args.token_ms / 1000,
+        error_rate=args.error_rate,
+        stall_rate=args.stall_rate,
+        answer_length=args.answer_tokens,
+    )
+    process = context.Process(target=_serve_mock, args=(options, child), name="mock-llm", daemon=True)
+    process.start()
+    child.close()
+    if not parent.poll(30):
+        process.terminate()
+        raise TimeoutError("mock LLM server did not start")
+    return process, parent.recv()
+
+async def measure_loop_lag(lags: list[float]):
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + LAG_INTERVAL
+        await asyncio.sleep(LAG_INTERVAL)
+        lags.append(max(0.0, loop.time() - expected))
+
+async def run_session(engine, index: int, sessions: int, args):
+    # stagger the starts so the sessions do not all ask the same question at the same instant
+    await asyncio.sleep(args.stagger * index / sessions)
+    session = engine.open_session()
+    session.start()
+    try:
+        for path in benchmark.collect_corpus(args.corpus):
+            await benchmark.replay_transcript(path, session, args.speed, args.endpoint_delay_ms / 1000)
+        await session.pipeline.drain()
+    finally:
+        await engine.close_session(session.id)
+
+async def run_level(sessions: int, args) -> dict:
+    from core.engine import Engine
+    from core.endpointing import UtteranceCoalescer
+    from nlp.answer_cache import AnswerCache
+    from nlp import resilience
+
+    clock = benchmark.StageClock()
+    engine = Engine(
+        cache=AnswerCache(path=None) if args.cache else None,
+        max_sessions=sessions,
+        fast_path=not args.no_fast_path,
+        speculative=args.speculative,
+        combined=args.combined,
+        coalesce=args.coalesce,
+        cancel_superseded=not args.no_cancel,
+        coalesce_options={
+            "pause_window": UtteranceCoalescer.PAUSE_WINDOW / args.speed,
+            "fragment_window": UtteranceCoalescer.FRAGMENT_WINDOW / args.speed,
+            "max_hold": UtteranceCoalescer.MAX_HOLD / args.speed,
+        },
+    )
+    guard_before = resilience.guard.stats()
+    lags: list[float] = []
+    lag_probe = asyncio.create_task(measure_loop_lag(lags))
+    started, cpu_started = time.monotonic(), time.process_time()
+    try:
+        await asyncio.gather(*(run_session(engine, i, sessions, args) for i in range(sessions)))
+    finally:
+        lag_probe.cancel()
+        await engine.close()
+        tracing.tracer.on_finish.remove(clock.traces.append)
+    wall = time.monotonic() - started
+    guard = resilience.guard.stats()
+
+    stages = clock.report()
+    fallbacks = sum(1 for t in clock.traces if t.tags.get("answer_source") == "fallback")
+    answered = clock.answered
+    p95_first_token = stages["eos_to_first_token"].get("p95_ms")
+    lag = benchmark.summarize(lags)
+    checks = {
+        "latency": p95_first_token is not None and p95_first_token <= args.slo_ms,
+        "loop_lag": lag.get("p95_ms", 0.0) <= args.max_lag_ms,
+        "fallbacks": answered > 0 and fallbacks / answered <= args.max_fallback_rate,
+    }
+    return {
+        "sessions": sessions,
+        "passed": all(checks.values()),
+        "checks": checks,
+        "wall_seconds": round(wall, 3),
+        "utterances": len(clock.traces),
+        "answered": answered,
+        "fallback_answers": fallbacks,
+        "answers_per_second": round(answered / wall, 2) if wall else None,
+        "cpu_per_wall_second": round((time.process_time() - cpu_started) / wall, 3) if wall else None,
+        "loop_lag": lag,
+        "stages": stages,
+        "llm": {key: guard[key] - guard_before[key] for key in ("calls", "hedges", "hedge_wins", "deadlines_missed", "short_circuited")},
+        "peak_sessions": engine.peak,
+    }
+
+def print_level(result: dict):
+    first_token = result["stages"]["eos_to_first_token"]
+    print(f"[Load test] {result['sessions']:>4} sessions: {'pass' if result['passed'] else 'FAIL'} "
+          f"| eos->first token p50 {first_token.get('p50_ms', '-')} p95 {first_token.get('p95_ms', '-')} ms "
+          f"| loop lag p95 {result['loop_lag'].get('p95_ms', '-')} ms "
+          f"| cpu {result['cpu_per_wall_second']} "
+          f"| {result['answered']} answered, {result['fallback_answers']} fallback, {result['llm']['hedges']} hedges")
+
+async def main(args):
+    process, base_url = start_mock(args)
+    llm_client.configure(
+        backend=llm_client.BackendConfig(provider="local", model="mock", base_url=base_url),
+        limits=httpx.Limits(max_connections=args.pool_connections, max_keepalive_connections=args.pool_connections),
+    )
+    from nlp import resilience
+
+    resilience.configure(hedging=not args.no_hedge)
+    levels = []
+    try:
+        await llm_client.prewarm()
+        for sessions in sorted(args.sessions):
+            result = await run_level(sessions, args)
+            levels.append(result)
+            print_level(result)
+            if not result["passed"] and not args.all_levels:
+                break
+    finally:
+        await llm_client.close_client()
+        process.terminate()
+
+    passing = [level["sessions"] for level in levels if level["passed"]]
+    report = {
+        "label": args.label,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        "config": {
+            "corpus": args.corpus,
+            "speed": args.speed,
+            "stagger": args.stagger,
+            "speculative": args.speculative,
+            "combined": args.combined,
+            "coalesce": args.coalesce,
+            "cancel_superseded": not args.no_cancel,
+            "cache": args.cache,
+            "fast_path": not args.no_fast_path,
+            "hedging": not args.no_hedge,
+            "pool_connections": args.pool_connections,
+            "slo_ms": args.slo_ms,
+            "max_lag_ms": args.max_lag_ms,
+            "max_fallback_rate": args.max_fallback_rate,
+            "backend": {
+                "first_token_ms": args.first_token_ms,
+                "token_ms": args.token_ms,
+                "error_rate": args.error_rate,
+                "stall_rate": args.stall_rate,
+                "answer_tokens": args.answer_tokens,
+            },
+        },
+        "max_sessions_passing": max(passing) if passing else 0,
+        "levels": levels,
+    }
+    print(f"[Load test] Per-process limit: {report['max_sessions_passing']} concurrent sessions")
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[Load test] Results written to {args.output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-session load test against the mock LLM backend")
+    parser.add_argument("corpus", nargs="*", default=["benchmarks/corpus"], help="transcript (.jsonl/.json) files or directories")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="concurrency levels to step through")
+    parser.add_argument("--all-levels", action="store_true", help="keep going after the first failing level")
+    parser.add_argument("--stagger", type=float, default=2.0, help="seconds over which session starts are spread")
+    parser.add_argument("--pool-connections", type=int, default=llm_client.POOL_LIMITS.max_connections)
+    parser.add_argument("--slo-ms", type=float, default=1500, help="p95 end of speech -> first token budget")
+    parser.add_argument("--max-lag-ms", type=float, default=50, help="p95 event loop lag budget")
+    parser.add_argument("--max-fallback-rate", type=float, default=0.01)
+    parser.add_argument("--output", default="load_test_results.json")
+    benchmark.add_config_arguments(parser)
+    args = parser.parse_args()
+    if args.real_backend:
+        parser.error("load_test.py always runs against the mock backend")
+    asyncio.run(main(args))
@@ -1,18 +1,94 @@
 import asyncio
+import os
+import sys
+import threading
 import dotenv
 
 from audio_devices import print_audio_devices
 from stt.realtimeSTT import realtimeSTT
+from stt.shared_worker import SharedSTTWorker
 from nlp.classifier import NLPClassifier
 from nlp.answer_generation import AnswerGenerator
+from nlp.answer_cache import AnswerCache
+from nlp.retrieval import KNOWLEDGE_DIR, KnowledgeBase
+from nlp import llm_client
+from core.pipeline import Pipeline
+from core.session_log import SessionRecorder
+from core.resources import ResourceGovernor
+from core import tracing
 
 dotenv.load_dotenv()
 
 DEVICE_INDEX = 1
+CANDIDATE_DEVICE_INDEX = None  # also transcribe the candidate mic; both streams then share one STT worker process
+SPECULATIVE_ANSWERS = False  # start answering from stabilized partials
+COMBINED_CALL = False  # classify and answer in one streamed call instead of two
+COALESCE_UTTERANCES = True  # merge finals split mid-question before classifying
+RECORD_SESSIONS = True  # log transcripts, classifications and answers to sessions/ (see replay_session.py)
+PREFETCH_DETAILED = True  # generate the detailed version of each answer in the background; type "e" + Enter to show it
+PIN_STT_CORES = False  # pin the transcription process to its cores (the STT worker, or RealtimeSTT's own process off Linux)
+ADAPTIVE_REALTIME = True  # stretch the partial transcription interval while the CPU is saturated
 classifier = NLPClassifier(console_output=True)
-llm_generator = AnswerGenerator()
+answer_cache = AnswerCache()
+# notes/resume/project docs for grounded answers; reindexing only reads changed files
+knowledge = KnowledgeBase(console_output=True) if os.path.isdir(KNOWLEDGE_DIR) else None
+if knowledge is not None:
+    knowledge.reindex()
+tracer = tracing.configure_from_env(console_output=True)
+llm_generator = AnswerGenerator(cache=answer_cache, knowledge=knowledge, prefetch_detailed=PREFETCH_DETAILED)
 
 interviewer_stt = None
+candidate_stt = None
+stt_worker = None
+background_tasks: set[asyncio.Task] = set()  # cancelled on shutdown
+
+def spawn(coro) -> asyncio.Task:
+    """Run coro in the background, keeping a reference so it is not garbage collected mid-run."""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+def print_classification(text, res):
+    print(f"[Classification Result]: {res}")
+
+async def print_answer_stream(stream):
+    print("[LLM]: ", end="", flush=True)
+    async for delta in stream:
+        print(delta, end="", flush=True)
+    if not stream.deltas and stream.answer is not None:
+        print(stream.answer.text, end="")  # fallback answers are not streamed
+    print()
+
+def start_answer_stream(text, res, stream):
+    spawn(print_answer_stream(stream))
+
+recorder = SessionRecorder(metadata={
+    "speculative": SPECULATIVE_ANSWERS,
+    "combined": COMBINED_CALL,
+    "coalesce": COALESCE_UTTERANCES,
+}) if RECORD_SESSIONS else None
+
+governor = ResourceGovernor(
+    pin_stt=PIN_STT_CORES,
+    adaptive=ADAPTIVE_REALTIME,
+    on_decision=(lambda kind, details: recorder.record("governor", decision=kind, **details)) if recorder is not None else None,
+    console_output=True,
+)
+tracer.collectors.append(governor.prometheus_lines)
+
+pipeline = Pipeline(
+    classifier,
+    llm_generator,
+    on_classified=print_classification,
+    on_answer_stream=start_answer_stream,
+    mode="concise",
+    speculative=SPECULATIVE_ANSWERS,
+    combined=COMBINED_CALL,
+    coalesce=COALESCE_UTTERANCES,
+    recorder=recorder,
+    console_output=True,
+)
 
 async def final_transcription(text):
     print(f"[Final Transcription]: {text}")
@@ -21,32 +97,72 @@ async def final_transcription(text):
         if interviewer_stt is not None:
             interviewer_stt.stop()
         return
-    res = await classifier.classify(text)
-    print(f"[Classification Result]: {res}")
-    if res.action == "respond":
-        llm_answer = await llm_generator.generate(
-            question=text,
-            intent=res.intent,
-            mode="concise",
-        )
-        print(f"[LLM]: {llm_answer.text}")
+    await pipeline.submit(text)
 
 def partial_transcription(text):
     print(f"\r[Interviewer] partial: {text}", flush=True)
+    pipeline.on_partial(text)
 
-async def main():    
-    global interviewer_stt
-    interviewer_stt = realtimeSTT(
+async def candidate_transcription(text):
+    print(f"[Candidate]: {text}")
+
+def expand_answer():
+    stream = pipeline.expand()
+    if stream is None:
+        print("[System] Nothing to expand yet")
+        return
+    print("[System] Detailed answer:")
+    spawn(print_answer_stream(stream))
+
+def read_commands(loop):
+    """Console commands while listening (daemon thread, so a pending readline never blocks exit)."""
+    for line in sys.stdin:
+        if line.strip().lower() in ("e", "expand"):
+            loop.call_soon_threadsafe(expand_answer)
+
+def build_stt():
+    global candidate_stt, stt_worker
+    if CANDIDATE_DEVICE_INDEX is not None:
+        stt_worker = SharedSTTWorker(language="en", console_output=True, governor=governor).start()
+        candidate_stt = stt_worker.stream(
+            "Candidate",
+            partial_update=None,
+            final_update=candidate_transcription,
+            input_device_index=CANDIDATE_DEVICE_INDEX,
+        )
+        return stt_worker.stream(
+            "Interviewer",
+            partial_update=partial_transcription,
+            final_update=final_transcription,
+            input_device_index=DEVICE_INDEX,
+            console_output=True,
+        )
+    return realtimeSTT(
         name="Interviewer",
         language="en",
         input_device_index=DEVICE_INDEX,
         partial_update=partial_transcription,
         final_update=final_transcription,
+        governor=governor,
         console_output=True
     )
+
+async def main():    
+    global interviewer_stt
+    # Load the STT models off the loop while the LLM connection pool warms up
+    loop = asyncio.get_running_loop()
+    interviewer_stt, _ = await asyncio.gather(
+        loop.run_in_executor(None, build_stt),
+        llm_client.prewarm(console_output=True),
+    )
     
+    pipeline.start()
+    governor.start()
+    threading.Thread(target=read_commands, args=(loop,), name="commands", daemon=True).start()
     try:
-        print("\n--- System Active (Press Ctrl+C to stop) ---")
+        print("\n--- System Active (Press Ctrl+C to stop, \"e\" + Enter to expand the last answer) ---")
+        if candidate_stt is not None:
+            spawn(candidate_stt.start())
         await interviewer_stt.start()
         
     except asyncio.CancelledError:
@@ -54,6 +170,32 @@ async def main():
     except KeyboardInterrupt:
         if interviewer_stt is not None:
             interviewer_stt.stop()
+    finally:
+        if candidate_stt is not None:
+            candidate_stt.stop()
+        if stt_worker is not None:
+            stt_worker.stop()
+        await pipeline.stop()
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        governor.stop()
+        print(f"[Resources] {governor.stats()}")
+        print(f"[Classifier] {classifier.fast_path_stats()}")
+        print(f"[Cancellation] {pipeline.cancellation_stats()}")
+        print(f"[Answer cache] {answer_cache.stats()}")
+        print(f"[Expansions] {llm_generator.expansion_stats()}")
+        if knowledge is not None:
+            print(f"[Knowledge] {knowledge.stats()}")
+            knowledge.close()
+        if tracer.enabled:
+            print(f"[Tracing] {tracer.snapshot()}")
+        answer_cache.close()
+        if recorder is not None:
+            recorder.close()
+            print(f"[Session log] {recorder.stats()}")
+        tracer.close()
+        await llm_client.close_client()
 
 if __name__ == "__main__":
     try:
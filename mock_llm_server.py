@@ -0,0 +1,287 @@
+"""
+Local OpenAI-compatible stand-in for the LLM backend.
+
+Streams deterministic tokens with configurable first-token latency,
+per-token latency, error rate and stall rate, so the pipeline can be run and
+benchmarked with no network:
+
+    python mock_llm_server.py --port 8008 --first-token-ms 250 --token-ms 15
+    LLM_BACKEND=local python main.py
+
+Serves both /v1/... (OpenAI SDK) and /openai/v1/... (Groq SDK) paths.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import zlib
+from typing import Optional
+
+QUESTION_WORDS = (
+    "what", "how", "why", "when", "where", "which", "who", "can", "could",
+    "would", "tell", "describe", "explain", "walk", "have", "do", "did", "is", "are",
+)
+
+ANSWER_WORDS = (
+    "In", "my", "last", "role", "I", "focused", "on", "keeping", "the", "design",
+    "simple", "measurable", "and", "easy", "to", "change", "so", "we", "could",
+    "ship", "quickly", "while", "still", "hitting", "our", "latency", "and",
+    "reliability", "targets", "for", "every", "release",
+)
+
+_WORD_RE = re.compile(r"[a-z']+")
+
+def looks_like_question(text: str) -> bool:
+    words = _WORD_RE.findall(text.lower())
+    return "?" in text or (len(words) >= 3 and words[0] in QUESTION_WORDS)
+
+def answer_tokens(text: str, count: int) -> list[str]:
+    """Deterministic answer for a given prompt: same text in, same tokens out."""
+    offset = zlib.crc32(text.encode()) % len(ANSWER_WORDS)
+    words = [ANSWER_WORDS[(offset + i) % len(ANSWER_WORDS)] for i in range(count)]
+    return [w + (" " if i < count - 1 else ".") for i, w in enumerate(words)]
+
+class MockLLMServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8008,
+        first_token_latency: float = 0.25,
+        token_latency: float = 0.015,
+        error_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        stall_latency: float = 30.0,
+        answer_length: int = 40,
+        seed: int = 0,
+        console_output=False,
+    ):
+        self.host = host
+        self.port = port
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.error_rate = error_rate
+        self.stall_rate = stall_rate  # fraction of requests that hang for stall_latency before responding
+        self.stall_latency = stall_latency
+        self.answer_length = answer_length
+        self.console_output = console_output
+        self.random = random.Random(seed)
+        self.server: Optional[asyncio.AbstractServer] = None
+        self._connections: set[asyncio.Task] = set()
+
+        self.requests = 0
+        self.errors = 0
+        self.stalls = 0
+        self.tokens = 0  # actually sent; a stream the client closes stops counting
+        self.abandoned = 0  # streams closed by the client before the last token
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        # port=0 picks a free port
+        self.port = self.server.sockets[0].getsockname()[1]
+        if self.console_output:
+            print(f"[MOCK LLM] Listening on {self.base_url}")
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            for task in list(self._connections):
+                task.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self.server.wait_closed()
+            self.server = None
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:  # type: ignore
+            await self.server.serve_forever()  # type: ignore
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "stalls": self.stalls,
+            "tokens": self.tokens,
+            "abandoned": self.abandoned,
+        }
+
+    # ----- HTTP -----
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)  # type: ignore
+        try:
+            while True:  # keep-alive: serve requests until the client closes
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                body = await reader.readexactly(length) if length else b""
+
+                path = path.split("?", 1)[0].removeprefix("/openai")
+                if method == "GET" and path == "/v1/models":
+                    await self._send_json(writer, 200, {
+                        "object": "list",
+                        "data": [{"id": "mock", "object": "model", "created": 0, "owned_by": "local"}],
+                    })
+                elif method == "POST" and path == "/v1/chat/completions":
+                    await self._chat(writer, json.loads(body or b"{}"))
+                else:
+                    await self._send_json(writer, 404, {"error": {"message": f"no route for {method} {path}"}})
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # cancelled by stop(); returning normally keeps asyncio from
+            # logging the cancellation as an unhandled callback error
+            pass
+        finally:
+            self._connections.discard(task)  # type: ignore
+            writer.close()
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+
+    async def _send_chunk(self, writer: asyncio.StreamWriter, data: str):
+        raw = data.encode()
+        writer.write(f"{len(raw):x}\r\n".encode() + raw + b"\r\n")
+        await writer.drain()
+
+    # ----- chat completions -----
+
+    def _content(self, request: dict) -> list[str]:
+        messages = request.get("messages", [])
+        latest = messages[-1]["content"] if messages else ""
+        system = messages[0]["content"] if messages and messages[0]["role"] == "system" else ""
+        is_question = looks_like_question(latest)
+
+        if (request.get("response_format") or {}).get("type") == "json_object":
+            return [json.dumps({
+                "intent": "general" if is_question else "filler",
+                "action": "respond" if is_question else "ignore",
+                "confidence": 0.9 if is_question else 0.8,
+                "reasoning": "mock",
+            })]
+
+        tokens = answer_tokens(latest, self.answer_length)
+        if "JSON header" in system:  # combined classify-and-answer prompt
+            header = json.dumps({
+                "intent": "general" if is_question else "filler",
+                "action": "respond" if is_question else "ignore",
+                "confidence": 0.9,
+            })
+            return [header + "\n"] + (tokens if is_question else [])
+        return tokens
+
+    async def _chat(self, writer: asyncio.StreamWriter, request: dict):
+        self.requests += 1
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors += 1
+            await asyncio.sleep(self.first_token_latency)
+            await self._send_json(writer, 503, {"error": {"message": "mock backend overloaded", "type": "overloaded"}})
+            return
+
+        model = request.get("model", "mock")
+        completion_id = f"mock-{self.requests}"
+        created = int(time.time())
+        tokens = self._content(request)
+
+        if self.stall_rate and self.random.random() < self.stall_rate:
+            self.stalls += 1
+            await asyncio.sleep(self.stall_latency)
+        await asyncio.sleep(self.first_token_latency)
+        if not request.get("stream"):
+            self.tokens += len(tokens)
+            text = "".join(tokens)
+            await self._send_json(writer, 200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+            })
+            return
+
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\nTransfer-Encoding: chunked\r\n\r\n"
+        )
+        for i, token in enumerate(tokens + [None]):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            if writer.transport.is_closing():
+                self.abandoned += 1  # e.g. a superseded or hedged-out answer
+                return
+            if token is not None:
+                self.tokens += 1
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": token} if token is not None else {},
+                    "finish_reason": None if token is not None else "stop",
+                }],
+            }
+            try:
+                await self._send_chunk(writer, f"data: {json.dumps(chunk)}\n\n")
+            except ConnectionError:
+                self.abandoned += 1
+                raise
+        await self._send_chunk(writer, "data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+async def main(args):
+    server = MockLLMServer(
+        host=args.host,
+        port=args.port,
+        first_token_latency=args.first_token_ms / 1000,
+        token_latency=args.token_ms / 1000,
+        error_rate=args.error_rate,
+        stall_rate=args.stall_rate,
+        stall_latency=args.stall_ms / 1000,
+        answer_length=args.answer_tokens,
+        seed=args.seed,
+        console_output=True,
+    )
+    await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8008)
+    parser.add_argument("--first-token-ms", type=float, default=250)
+    parser.add_argument("--token-ms", type=float, default=15)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="fraction of requests that hang before responding")
+    parser.add_argument("--stall-ms", type=float, default=30000)
+    parser.add_argument("--answer-tokens", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        print("[MOCK LLM] Stopped")
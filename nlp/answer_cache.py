@@ -0,0 +1,317 @@
+import math
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+FILLER_WORDS = {"um", "uh", "so", "like", "okay", "ok", "well", "yeah", "basically", "actually", "just", "please"}
+
+# Function words a near duplicate may add, drop or swap ("how do you" / "how would you").
+# Question words and negations are left out on purpose: they change the answer.
+STOP_WORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "been", "do", "does", "did",
+    "would", "could", "should", "can", "will", "you", "your", "i", "me", "my", "we",
+    "our", "us", "to", "of", "in", "on", "at", "for", "with", "about", "and",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+# Wording that points back at the conversation ("can you elaborate on that?"):
+# the right answer depends on the previous exchange, which the key does not see.
+# A relative "that" ("a time that you ...") does not count.
+_FOLLOW_UP_RE = re.compile(
+    r"\b(?:it|its|this|these|those|they|them"
+    r"|that(?! (?:you|your|we|i|he|she|they)\b)"
+    r"|elaborate|expand|clarify|more details?|go deeper|dig deeper|tell me more|say more"
+    r"|another example|what about|how about|what else|why not|you mentioned|you said|earlier|previous)\b"
+)
+FOLLOW_UP_MIN_WORDS = 3  # "why?", "how so?" only make sense after an answer
+
+def normalize_question(question: str) -> str:
+    """Lowercase, strip punctuation and spoken filler so near-identical phrasings share a key."""
+    words = _WORD_RE.findall(question.lower())
+    return " ".join(w for w in words if w not in FILLER_WORDS)
+
+def is_follow_up(question: str) -> bool:
+    """True when question only makes sense in the context of the conversation so far."""
+    normalized = normalize_question(question)
+    return len(normalized.split()) < FOLLOW_UP_MIN_WORDS or _FOLLOW_UP_RE.search(normalized) is not None
+
+def content_words(normalized: str) -> frozenset[str]:
+    """The words of a normalized question that carry its meaning."""
+    return frozenset(w for w in normalized.split() if w not in STOP_WORDS)
+
+def _vectorize(normalized: str) -> dict[int, float]:
+    """L2-normalized hashed bag of unigrams and bigrams."""
+    words = normalized.split()
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vec: dict[int, float] = {}
+    for g in grams:
+        h = zlib.crc32(g.encode())
+        vec[h] = vec.get(h, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+    return {k: v / norm for k, v in vec.items()}
+
+def _cosine(a: dict[int, float], b: dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+@dataclass
+class CacheEntry:
+    key: str
+    bucket: str  # intent|mode, fuzzy matches never cross buckets
+    question: str
+    answer: str
+    created_at: float
+    last_access: float
+    vector: dict[int, float] = field(default_factory=dict, repr=False)
+
+class AnswerCache:
+    """
+    Persistent answer cache keyed on normalized question + intent (+ mode).
+
+    Lookups are served from memory: exact key first, then a near-duplicate
+    search over a small inverted index of hashed n-grams. A near duplicate
+    must also have the same content words: n-gram similarity alone scores a
+    one-word swap in a long question ("TCP and UDP" / "TCP and HTTP") above
+    the threshold. SQLite keeps the
+    entries across restarts. Eviction is LRU by capacity plus a TTL.
+
+    The key has no conversation context, so follow-ups ("can you elaborate
+    on that?") are neither served nor stored; they always go to the LLM.
+    """
+
+    DEFAULT_PATH = "answer_cache.sqlite3"
+    CAPACITY = 512
+    REPLACED_KEPT = 32  # overwritten entries kept so discard() can restore them
+    TTL_SECONDS = 7 * 24 * 3600
+    SIMILARITY_THRESHOLD = 0.85
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_PATH,
+        capacity: int = CAPACITY,
+        ttl_seconds: float = TTL_SECONDS,
+        similarity_threshold: float = SIMILARITY_THRESHOLD,
+        console_output=False,
+    ):
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.console_output = console_output
+
+        self.entries: OrderedDict[str, CacheEntry] = OrderedDict()  # LRU order, oldest first
+        self.index: dict[int, set[str]] = {}  # hashed n-gram -> keys
+        self._touched: set[str] = set()  # keys whose last_access is not yet persisted
+        self._replaced: OrderedDict[str, CacheEntry] = OrderedDict()  # key -> entry the latest put() overwrote
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.follow_ups = 0  # lookups bypassed because the question depends on context
+
+        # path=None keeps the cache in memory only
+        self.db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                bucket TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self.db.commit()
+        self._load()
+
+    # ----- public API -----
+
+    def get(self, question: str, intent: str, mode: str = "concise") -> Optional[str]:
+        if is_follow_up(question):
+            self.follow_ups += 1
+            return None
+        normalized = normalize_question(question)
+        bucket = f"{intent}|{mode}"
+        key = f"{bucket}|{normalized}"
+        now = time.time()
+
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                entry = self._nearest(bucket, normalized, now)
+                if entry is None:
+                    self.misses += 1
+                    return None
+                self.near_hits += 1
+            else:
+                self.hits += 1
+
+            entry.last_access = now
+            self.entries.move_to_end(entry.key)
+            self._touched.add(entry.key)
+            if self.console_output:
+                print(f"[CACHE] Hit for: {entry.question}")
+            return entry.answer
+
+    def put(self, question: str, intent: str, mode: str, answer: str):
+        normalized = normalize_question(question)
+        if not normalized or not answer or is_follow_up(question):
+            return
+        bucket = f"{intent}|{mode}"
+        key = f"{bucket}|{normalized}"
+        now = time.time()
+
+        with self._lock:
+            previous = self.entries.get(key)
+            if previous is not None:
+                self._remove(key)
+                self._replaced[key] = previous
+                self._replaced.move_to_end(key)
+                while len(self._replaced) > self.REPLACED_KEPT:
+                    self._replaced.popitem(last=False)
+            else:
+                self._replaced.pop(key, None)
+            self._insert(CacheEntry(key, bucket, question, answer, now, now, _vectorize(normalized)))
+            while len(self.entries) > self.capacity:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+            self.db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)",
+                (key, bucket, question, answer, now, now),
+            )
+            self._flush_touched()
+            self.db.commit()
+
+    def discard(self, question: str, intent: str, mode: str, answer: str, since: float):
+        """
+        Roll back a put(): if the entry for question still holds answer and
+        was written at or after since, drop it and restore the entry it
+        overwrote, if any.
+        """
+        key = f"{intent}|{mode}|{normalize_question(question)}"
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry.answer != answer or entry.created_at < since:
+                return
+            self._remove(key)
+            previous = self._replaced.pop(key, None)
+            if previous is not None and not self._expired(previous, time.time()):
+                self._insert(previous)
+                self.db.execute(
+                    "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, previous.bucket, previous.question, previous.answer, previous.created_at, previous.last_access),
+                )
+            self.db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "follow_ups": self.follow_ups,
+            "hit_rate": (self.hits + self.near_hits) / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.index.clear()
+            self._touched.clear()
+            self._replaced.clear()
+            self.db.execute("DELETE FROM answers")
+            self.db.commit()
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self.db.commit()
+            self.db.close()
+
+    # ----- internals (call with the lock held) -----
+
+    def _load(self):
+        now = time.time()
+        self.db.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl_seconds,))
+        rows = self.db.execute(
+            "SELECT key, bucket, question, answer, created_at, last_access "
+            "FROM answers ORDER BY last_access DESC LIMIT ?",
+            (self.capacity,),
+        ).fetchall()
+        for key, bucket, question, answer, created_at, last_access in reversed(rows):
+            normalized = key[len(bucket) + 1:]
+            self._insert(CacheEntry(key, bucket, question, answer, created_at, last_access, _vectorize(normalized)))
+        self.db.commit()
+
+    def _expired(self, entry: CacheEntry, now: float) -> bool:
+        return now - entry.created_at > self.ttl_seconds
+
+    def _nearest(self, bucket: str, normalized: str, now: float) -> Optional[CacheEntry]:
+        vec = _vectorize(normalized)
+        candidates: set[str] = set()
+        for h in vec:
+            candidates |= self.index.get(h, set())
+
+        content = content_words(normalized)
+        best, best_score = None, self.similarity_threshold
+        for key in candidates:
+            entry = self.entries[key]
+            if entry.bucket != bucket:
+                continue
+            score = _cosine(vec, entry.vector)
+            # only filler and function words may differ
+            if score >= best_score and content_words(key[len(bucket) + 1:]) == content:
+                best, best_score = entry, score
+
+        if best is not None and self._expired(best, now):
+            self._remove(best.key)
+            return None
+        return best
+
+    def _insert(self, entry: CacheEntry):
+        self.entries[entry.key] = entry
+        for h in entry.vector:
+            self.index.setdefault(h, set()).add(entry.key)
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for h in entry.vector:
+            keys = self.index.get(h)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.index[h]
+        self._touched.discard(key)
+        self.db.execute("DELETE FROM answers WHERE key = ?", (key,))
+
+    def _flush_touched(self):
+        # last_access only matters for LRU order after a restart, so it is
+        # written in batches instead of on every hit
+        if not self._touched:
+            return
+        self.db.executemany(
+            "UPDATE answers SET last_access = ? WHERE key = ?",
+            [(self.entries[k].last_access, k) for k in self._touched if k in self.entries],
+        )
+        self._touched.clear()
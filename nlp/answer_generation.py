@@ -1,7 +1,16 @@
+import asyncio
 import dotenv
-from groq import AsyncGroq
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Literal
+from functools import partial
+from typing import Literal, Optional
+
+from nlp.answer_cache import AnswerCache, normalize_question
+from nlp.history import ConversationHistory
+from nlp.retrieval import KnowledgeBase, format_context
+from nlp.llm_client import get_client, model_for, timeout_for
+from nlp import resilience
+from core import tracing
 
 dotenv.load_dotenv()
 
@@ -12,79 +21,295 @@ class LLMAnswer:
     text: str
     mode: LLMMode
     confidence: float
-    
-class AnswerGenerator:
-    MAX_HISTORY = 10  # limit history to prevent token explosion
 
-    def __init__(self, on_answer=None):
-        self.client = AsyncGroq()
-        self.history: list[dict] = []
-        self.on_answer = on_answer
-    async def generate(
-        self,
-        question: str,
-        intent: str,
-        mode: str = "concise",
-    ) -> LLMAnswer:
+class AnswerStream:
+    """
+    Token deltas of one answer as they arrive, then the final LLMAnswer.
+
+    Deltas are kept, so a consumer that subscribes late replays them from
+    the start; any number of consumers can iterate concurrently:
+
+        async for delta in stream: ...
+        answer = await stream.result()
+
+    Consumers on other threads (e.g. a Tk timer) may also just poll
+    `deltas` and `done`.
+    """
+
+    def __init__(self, question: str = ""):
+        self.question = question
+        self.deltas: list[str] = []
+        self.answer: Optional[LLMAnswer] = None  # None once done means cancelled / not answered
+        self.done = False
+        self.task: Optional[asyncio.Task] = None  # set by AnswerGenerator.stream()
+        self._waiter: Optional[asyncio.Future] = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self.deltas)
+
+    def push(self, delta: str):
+        self.deltas.append(delta)
+        self._wake()
+
+    def close(self, answer: Optional[LLMAnswer]):
+        if not self.done:
+            self.answer = answer
+            self.done = True
+            self._wake()
 
-        # ----- YOUR ORIGINAL PROMPT (UNCHANGED) -----
-        prompt = f"""
-You are helping a candidate answer an interview question verbally.
+    def _wake(self):
+        waiter, self._waiter = self._waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
 
-Question:
-{question}
+    async def __aiter__(self):
+        i = 0
+        while True:
+            while i < len(self.deltas):
+                yield self.deltas[i]
+                i += 1
+            if self.done:
+                return
+            if self._waiter is None:
+                self._waiter = asyncio.get_running_loop().create_future()
+            await asyncio.shield(self._waiter)
 
-Intent:
-{intent}
+    async def result(self) -> Optional[LLMAnswer]:
+        async for _ in self:
+            pass
+        return self.answer
+
+# Sent once per request as the system message; never stored in history
+SYSTEM_PROMPT = """
+You are helping a candidate answer interview questions verbally.
 
 Instructions:
 - Answer as if speaking in an interview
 - Use plain text only (no markdown, no bullets)
-- Limit to 2-3 sentences
 - Be clear and confident
 - Do NOT mention AI
 - Do NOT list options unless explicitly asked
-
-Answer:
+- {length}
 """.strip()
-        # -------------------------------------------
 
-        # Add the new user prompt into history
-        self.history.append({
+MODE_INSTRUCTIONS = {
+    "concise": "Limit to 2-3 sentences",
+    "detailed": "Go deeper: 2-3 short spoken paragraphs covering the approach, the key details or trade-offs, and a concrete example",
+}
+
+def system_prompt(mode: str) -> str:
+    return SYSTEM_PROMPT.format(length=MODE_INSTRUCTIONS.get(mode, MODE_INSTRUCTIONS["concise"]))
+
+# Appended to the system prompt with the passages retrieved for the question
+KNOWLEDGE_PROMPT = """
+
+Notes from the candidate's own resume and prep material (use them when relevant, never invent other experience):
+"""
+
+class AnswerGenerator:
+    """
+    Streams concise answers; detailed expansions are generated lazily.
+
+    expand() starts (or returns the already running / finished) detailed
+    answer for a question, built on the concise answer and the same
+    conversation context. With prefetch_detailed=True every completed
+    concise answer handed to prefetch() (the pipeline does this for every
+    answer it delivers) starts its expansion in the background, so asking for
+    more detail replays a finished stream instead of a new round trip.
+    Expansions are kept per question (and in the answer cache with
+    mode="detailed") but never added to the conversation history.
+    """
+
+    TOKEN_BUDGET = 1200  # estimated tokens of past Q/A kept for follow-ups
+    EXPANSIONS_KEPT = 32
+
+    def __init__(
+        self,
+        on_delta=None,
+        cache: Optional[AnswerCache] = None,
+        token_budget=TOKEN_BUDGET,
+        summarize_history=False,
+        knowledge: Optional[KnowledgeBase] = None,
+        prefetch_detailed: bool = False,
+    ):
+        self.client = get_client()
+        self.history = ConversationHistory(token_budget=token_budget, summarize=summarize_history)
+        self.on_delta = on_delta  # called with each new chunk of answer text
+        self.cache = cache
+        self.guard = resilience.guard  # deadlines, hedging, circuit breaker
+        self.knowledge = knowledge  # retrieved notes go into the system prompt, never into history
+        self.prefetch_detailed = prefetch_detailed
+        self.expansions: OrderedDict[str, AnswerStream] = OrderedDict()  # normalized question -> detailed answer
+
+        self.expansions_started = 0
+        self.expansions_reused = 0
+
+    def stream(self, question: str, intent: str, mode: str = "concise") -> AnswerStream:
+        """Start generate() in the background and return its AnswerStream right away."""
+        stream = AnswerStream(question)
+        stream.task = asyncio.create_task(self.generate(question, intent, mode, stream=stream))
+        return stream
+
+    def expand(self, question: str, intent: str, brief: Optional[str] = None) -> AnswerStream:
+        """
+        Detailed answer to question, generated once and then replayed.
+        brief is the concise answer already given, which the expansion builds on.
+        Must be called on the event loop thread.
+        """
+        key = normalize_question(question)
+        stream = self.expansions.get(key)
+        # a cancelled or fallback expansion is retried
+        if stream is not None and not (stream.done and (stream.answer is None or stream.answer.confidence < 0.5)):
+            self.expansions.move_to_end(key)
+            self.expansions_reused += 1
+            return stream
+        stream = AnswerStream(question)
+        stream.task = asyncio.create_task(self._expand(question, intent, brief, stream))
+        self.expansions[key] = stream
+        self.expansions_started += 1
+        while len(self.expansions) > self.EXPANSIONS_KEPT:
+            _, oldest = self.expansions.popitem(last=False)
+            if oldest.task is not None:
+                oldest.task.cancel()
+        return stream
+
+    def prefetch(self, question: str, intent: str, answer: Optional[LLMAnswer]):
+        """Start the background expansion of a completed concise answer when prefetching is on."""
+        if self.prefetch_detailed and answer is not None and answer.mode == "concise" and answer.confidence > 0.5:
+            self.expand(question, intent, answer.text)
+
+    async def _expand(self, question: str, intent: str, brief: Optional[str], stream: AnswerStream) -> Optional[LLMAnswer]:
+        answer = None
+        try:
+            with tracing.use(None):  # not part of the concise answer's latency trace
+                answer = await self._generate(question, intent, "detailed", stream, brief=brief)
+        finally:
+            stream.close(answer)
+        return answer
+
+    def expansion_stats(self) -> dict:
+        return {"started": self.expansions_started, "reused": self.expansions_reused}
+
+    def grounded_prompt(self, system_prompt: str, question: str) -> str:
+        """system_prompt plus the knowledge-base passages relevant to question, if any."""
+        if self.knowledge is None:
+            return system_prompt
+        passages = self.knowledge.context(question)
+        trace = tracing.current()
+        if trace is not None:
+            trace.tags["knowledge_passages"] = str(len(passages))
+        if not passages:
+            return system_prompt
+        return system_prompt + KNOWLEDGE_PROMPT + format_context(passages)
+
+    def publish(self, stream: Optional[AnswerStream], delta: str, notify: bool = True):
+        if not delta:
+            return
+        if stream is not None:
+            stream.push(delta)
+        if notify and self.on_delta:
+            self.on_delta(delta)
+
+    async def generate(
+        self,
+        question: str,
+        intent: str,
+        mode: str = "concise",
+        stream: Optional[AnswerStream] = None,
+    ) -> LLMAnswer:
+        try:
+            answer = await self._generate(question, intent, mode, stream)
+        except asyncio.CancelledError:
+            if stream is not None:
+                stream.close(None)
+            raise
+        if stream is not None:
+            stream.close(answer)
+        return answer
+
+    async def _generate(
+        self,
+        question: str,
+        intent: str,
+        mode: str,
+        stream: Optional[AnswerStream],
+        brief: Optional[str] = None,
+    ) -> LLMAnswer:
+
+        # History is only committed once the answer completes, so a cancelled
+        # (e.g. speculative) request leaves no trace in the conversation
+        expanding = mode == "detailed" and brief is not None
+        content = f"Question: {question}\nIntent: {intent}"
+        if expanding:
+            content += f"\nYour short answer was: {brief}\nNow expand on it."
+        user_message = {
             "role": "user",
-            "content": prompt
-        })
+            "content": content
+        }
+        trace = tracing.current()
+        if trace is not None:
+            trace.mark("answer_start")
+
+        cached = self.cache.get(question, intent, mode) if self.cache is not None else None
+        if cached is not None:
+            if trace is not None:
+                trace.mark("first_token")
+                trace.mark("answer_end")
+                trace.tags["answer_source"] = "cache"
+            self.publish(stream, cached, notify=not expanding)
+            if not expanding:
+                self.remember(question, cached)
+            return LLMAnswer(
+                text=cached,
+                mode=mode,  # type: ignore
+                confidence=0.9,
+            )
 
-        # Trim history (rolling buffer)
-        if len(self.history) > self.MAX_HISTORY:
-            self.history = self.history[-self.MAX_HISTORY:]
+        messages = self.history.messages(self.grounded_prompt(system_prompt(mode), question), user_message)
 
         try:
-            response = await self.client.chat.completions.create(
-                model="openai/gpt-oss-120b",
-                messages=self.history, # type: ignore
+            response = await self.guard.stream("generate", partial(
+                self.client.chat.completions.create,
+                model=model_for("generate"),
+                timeout=timeout_for("generate"),
+                messages=messages, # type: ignore
                 temperature=0.3,
                 stream=True,
-            )
+            ))
+
+            parts = []
+            complete = True
+            try:
+                async for chunk in response:
+                    delta = chunk.choices[0].delta.content if chunk.choices[0].delta.content else ""
+                    if not delta:
+                        continue
+                    if trace is not None:
+                        trace.mark("first_token")
+                        trace.count("tokens")
+                    parts.append(delta)
+                    self.publish(stream, delta, notify=not expanding)
+            except asyncio.CancelledError:
+                # stop the HTTP stream so a discarded answer stops costing tokens
+                await response.close()
+                raise
+            except resilience.DeadlineExceeded:
+                if not parts:
+                    raise
+                complete = False  # keep what arrived rather than waiting on a stalled stream
 
-            text = ""
-            async for chunk in response:
-                # You could stream partial content here if desired
-                text += chunk.choices[0].delta.content if chunk.choices[0].delta.content else ""
-                if self.on_answer:
-                    self.on_answer(text)  # Update UI with streaming text
-                
-            text = text.strip()
-
-            # Store assistant reply for future follow-ups
-            self.history.append({
-                "role": "assistant",
-                "content": text
-            })
-
-            # Trim again after assistant reply
-            if len(self.history) > self.MAX_HISTORY:
-                self.history = self.history[-self.MAX_HISTORY:]
+            text = "".join(parts).strip()
+            if trace is not None:
+                trace.mark("answer_end")
+                trace.tags["answer_source"] = "llm" if complete else "llm_truncated"
+
+            # Store question and assistant reply for future follow-ups
+            # (expansions stay out: they would crowd the history for little gain)
+            if not expanding:
+                self.remember(question, text)
+            if self.cache is not None and complete:
+                self.cache.put(question, intent, mode, text)
 
             return LLMAnswer(
                 text=text,
@@ -93,11 +318,34 @@ Answer:
             )
 
         except Exception as e:
+            if trace is not None:
+                trace.mark("answer_end")
+                trace.tags["answer_source"] = "fallback"
             return self._fallback_answer(intent, str(e))
 
+    def remember(self, question: str, answer: str):
+        """Commit a completed question/answer turn to the history."""
+        self.history.add_exchange(question, answer)
+
+    def forget(self, question: str, answer: Optional[str] = None) -> bool:
+        """
+        Roll back a completed turn that was superseded or discarded before it
+        was delivered: drop it from the history and stop its unfinished
+        expansion. answer, when known, makes sure only that turn is dropped.
+        Returns whether a turn was removed.
+        """
+        stream = self.expansions.get(normalize_question(question))
+        if stream is not None and not stream.done and stream.task is not None:
+            stream.task.cancel()
+        return self.history.remove_exchange(question, answer)
+
     def reset_context(self):
         """Call when starting a new interview session."""
-        self.history = []
+        self.history.clear()
+        for stream in self.expansions.values():
+            if stream.task is not None:
+                stream.task.cancel()
+        self.expansions.clear()
 
     def _fallback_answer(self, intent: str, reason: str) -> LLMAnswer:
         if intent == "algorithmic":
@@ -115,7 +363,7 @@ Answer:
             text = "Ask a clarifying question or explain your thinking briefly."
 
         return LLMAnswer(
-            text=f"[Groq unavailable: {reason}] {text}",
+            text=f"[LLM unavailable: {reason}] {text}",
             mode="concise",
             confidence=0.4,
         )
\ No newline at end of file
@@ -1,10 +1,16 @@
 import os
 import json
 import dotenv
-from groq import AsyncGroq
 from dataclasses import dataclass
+from functools import partial
 from typing import Literal
 
+from nlp.fast_classifier import FastClassifier
+from nlp.history import ConversationHistory
+from nlp.llm_client import get_client, model_for, timeout_for
+from nlp import resilience
+from core import tracing
+
 dotenv.load_dotenv()
 
 Action = Literal[
@@ -13,6 +19,8 @@ Action = Literal[
     "ignore",
 ]
 
+FAST_PATH_REASON = "Local fast path"
+
 @dataclass
 class ClassificationResult:
     intent: str
@@ -23,17 +31,29 @@ class ClassificationResult:
 class NLPClassifier:
     """
     Flexible LLM-based classifier with context memory.
+    Confident cases are decided by a local fast path; only the ambiguous
+    middle band is escalated to the LLM.
     """
 
-    MAX_HISTORY = 10  # prevent token explosion
+    TOKEN_BUDGET = 300  # earlier questions only give context, keep them short
+    FAST_PATH_THRESHOLD = 0.85
 
-    def __init__(self, console_output=False):
-        self.client = AsyncGroq()
-        self.history: list[dict] = []
+    def __init__(self, console_output=False, fast_path=True, fast_path_threshold=FAST_PATH_THRESHOLD, token_budget=TOKEN_BUDGET):
+        self.client = get_client()
+        self.history = ConversationHistory(token_budget=token_budget)
         self.console_output = console_output
-
-    async def classify(self, text: str) -> ClassificationResult:
-        # print(f"[CLASSIFIER] Classifying: {text}")
+        # fast_path may be a shared FastClassifier (its n-gram model is trained on construction)
+        self.fast_path = fast_path if isinstance(fast_path, FastClassifier) else FastClassifier() if fast_path else None
+        self.fast_path_threshold = fast_path_threshold
+        self.guard = resilience.guard  # deadlines, hedging, circuit breaker
+        self.llm_calls = 0
+        self.llm_calls_skipped = 0
+
+    def classify_locally(self, text: str):
+        """
+        Decide without the LLM when possible.
+        Returns None when the text falls in the ambiguous band and needs the LLM.
+        """
         text = text.strip()
 
         # Fast STT guard
@@ -45,6 +65,53 @@ class NLPClassifier:
                 reasoning="Too short or likely STT fragment",
             )
 
+        # Local fast path
+        if self.fast_path is not None:
+            guess = self.fast_path.predict(text)
+            if guess.confidence >= self.fast_path_threshold:
+                return ClassificationResult(
+                    intent=guess.intent,
+                    action="respond" if guess.label == "question" else "ignore",
+                    confidence=guess.confidence,
+                    reasoning=f"{FAST_PATH_REASON}: {guess.reason}",
+                )
+
+        return None
+
+    def classify_offline(self, text: str, reason: str) -> ClassificationResult:
+        """Best local guess when the LLM cannot be used, whatever its confidence."""
+        guess = (self.fast_path or FastClassifier()).predict(text.strip())
+        return ClassificationResult(
+            intent=guess.intent,
+            action="respond" if guess.label == "question" else "ignore",
+            confidence=guess.confidence,
+            reasoning=f"{FAST_PATH_REASON} ({reason}): {guess.reason}",
+        )
+
+    async def classify(self, text: str) -> ClassificationResult:
+        trace = tracing.current()
+        if trace is None:
+            return await self._classify(text)
+        trace.mark("classify_start")
+        res = await self._classify(text)
+        trace.mark("classify_end")
+        trace.tags["classify_source"] = "fast_path" if res.reasoning.startswith(FAST_PATH_REASON) else "llm"
+        return res
+
+    async def _classify(self, text: str) -> ClassificationResult:
+        # print(f"[CLASSIFIER] Classifying: {text}")
+        text = text.strip()
+
+        local = self.classify_locally(text)
+        if local is not None:
+            if local.reasoning.startswith(FAST_PATH_REASON):
+                self.llm_calls_skipped += 1
+                if self.console_output:
+                    print(f"[CLASSIFIER] Fast path result: {local}")
+            if local.action == "respond":
+                self.remember(text, json.dumps({"intent": local.intent, "action": local.action}))
+            return local
+
         system_prompt = """
 You classify interview speech transcripts.
 
@@ -74,22 +141,19 @@ Use previous messages only if the latest message is meaningful.
 Provide extremely concise reasoning.
 """
 
-        # Add latest message to history
-        # self.history.append({"role": "user", "content": text})
-
-        # Trim history
-        if len(self.history) > self.MAX_HISTORY:
-            self.history = self.history[-self.MAX_HISTORY:]
-
         try:
-            messages = [{"role": "system", "content": system_prompt}] + self.history + [{"role": "user", "content": text}]
+            messages = self.history.messages(system_prompt, {"role": "user", "content": text})
+
+            self.llm_calls += 1
 
-            response = await self.client.chat.completions.create(
-                model="openai/gpt-oss-120b",
+            response = await self.guard.request("classify", partial(
+                self.client.chat.completions.create,
+                model=model_for("classify"),
+                timeout=timeout_for("classify"),
                 messages=messages, # type: ignore
                 temperature=0,
                 response_format={"type": "json_object"},
-            )
+            ))
 
             content = response.choices[0].message.content
             parsed = json.loads(content)  # type: ignore
@@ -97,15 +161,9 @@ Provide extremely concise reasoning.
             if self.console_output:
                 print(f"[CLASSIFIER] Parsed result: {parsed}")
 
-            # Store assistant reply to maintain continuity
+            # Store the question and compact reply to maintain continuity
             if parsed.get("action") == "respond":
-                self.history.append({
-                    "role": "assistant",
-                    "content": content
-                })
-
-            if len(self.history) > self.MAX_HISTORY:
-                self.history = self.history[-self.MAX_HISTORY:]
+                self.remember(text, json.dumps({"intent": parsed.get("intent", "unknown"), "action": "respond"}))
 
             return ClassificationResult(
                 intent=parsed.get("intent", "unknown"),
@@ -114,6 +172,11 @@ Provide extremely concise reasoning.
                 reasoning=parsed.get("reasoning", ""),
             )
 
+        except resilience.BackendUnavailable:
+            self.llm_calls -= 1
+            self.llm_calls_skipped += 1
+            return self.classify_offline(text, "LLM unavailable")
+
         except Exception as e:
             return ClassificationResult(
                 intent="unknown",
@@ -122,6 +185,25 @@ Provide extremely concise reasoning.
                 reasoning=f"LLM classification error: {str(e)}",
             )
 
+    def remember(self, text: str, content: str):
+        """Store a 'respond' classification to maintain continuity."""
+        self.history.add_exchange(text, content)
+
+    def forget(self, text: str, res: ClassificationResult) -> bool:
+        """Roll back a remembered 'respond' classification (a superseded or discarded turn)."""
+        if res.action != "respond":
+            return False
+        return self.history.remove_exchange(text.strip(), json.dumps({"intent": res.intent, "action": "respond"}))
+
+    def fast_path_stats(self) -> dict:
+        """How many classifications the local tier decided without the LLM."""
+        total = self.llm_calls + self.llm_calls_skipped
+        return {
+            "llm_calls": self.llm_calls,
+            "llm_calls_skipped": self.llm_calls_skipped,
+            "skip_rate": self.llm_calls_skipped / total if total else 0.0,
+        }
+
     def reset_context(self):
         """Call when starting a new interview session."""
-        self.history = []
\ No newline at end of file
+        self.history.clear()
@@ -0,0 +1,221 @@
+import asyncio
+import json
+from functools import partial
+from typing import Optional
+
+from nlp.classifier import FAST_PATH_REASON, ClassificationResult, NLPClassifier
+from nlp.answer_generation import MODE_INSTRUCTIONS, AnswerGenerator, AnswerStream, LLMAnswer
+from nlp.llm_client import model_for, timeout_for
+from nlp import resilience
+from core import tracing
+
+COMBINED_PROMPT = """
+You help a candidate during a verbal interview. For the latest transcript,
+first classify it, then answer it if it is an interview question.
+
+Output format:
+Line 1: ONLY a compact JSON header:
+{"intent": string, "action": "respond | ignore", "confidence": number (0.0-1.0)}
+Line 2 onwards: the answer (only when action = respond, otherwise output nothing else).
+
+Classification rules:
+1. If the text is filler, incomplete, broken, random, or grammatically invalid: action = ignore
+2. If the text is a clear interview question: action = respond
+3. Intent should be a short descriptive label.
+4. Be conservative. When unsure, prefer action = ignore.
+
+Answer instructions:
+- Answer as if speaking in an interview
+- Use plain text only (no markdown, no bullets)
+- {length}
+- Be clear and confident
+- Do NOT mention AI
+- Do NOT list options unless explicitly asked
+""".strip()
+
+def combined_prompt(mode: str) -> str:
+    return COMBINED_PROMPT.replace("{length}", MODE_INSTRUCTIONS.get(mode, MODE_INSTRUCTIONS["concise"]))
+
+def parse_header(buffer: str):
+    """
+    Returns (header dict, remaining text) once the JSON header is complete,
+    or None if more of the stream is needed.
+    """
+    start = buffer.find("{")
+    end = buffer.find("}", start)
+    if start == -1 or end == -1:
+        return None
+    header = json.loads(buffer[start:end + 1])
+    return header, buffer[end + 1:].lstrip()
+
+class CombinedResponder:
+    """
+    Classify and answer in a single streamed LLM call.
+
+    The stream starts with a small JSON header (intent, action, confidence);
+    it is closed right away when the header says the text should be ignored.
+    Returns the same ClassificationResult / LLMAnswer types as the two-call path.
+    """
+
+    def __init__(self, classifier: NLPClassifier, generator: AnswerGenerator, console_output=False):
+        self.classifier = classifier
+        self.generator = generator
+        self.console_output = console_output
+
+    def start(self, text: str, mode: str = "concise", stream: Optional[AnswerStream] = None):
+        """
+        Start the combined call.
+        Returns (classification future, answer task); the future resolves as
+        soon as the header has streamed in, long before the answer completes.
+        Answer text is published to `stream` as it arrives.
+        """
+        header: asyncio.Future = asyncio.get_running_loop().create_future()
+        answer = asyncio.create_task(self._run(text.strip(), mode, header, stream))
+        return header, answer
+
+    async def classify_and_answer(self, text: str, mode: str = "concise"):
+        header, answer = self.start(text, mode)
+        res: ClassificationResult = await header
+        return res, await answer
+
+    async def _run(self, text: str, mode: str, header: asyncio.Future, stream: Optional[AnswerStream] = None) -> Optional[LLMAnswer]:
+        answer = None
+        try:
+            answer = await self._stream(text, mode, header, stream)
+        except asyncio.CancelledError:
+            header.cancel()
+            raise
+        except Exception as e:
+            if not header.done():
+                header.set_result(ClassificationResult(
+                    intent="unknown",
+                    action="ignore",
+                    confidence=0.0,
+                    reasoning=f"LLM classification error: {str(e)}",
+                ))
+            else:
+                answer = self.generator._fallback_answer(header.result().intent, str(e))
+        finally:
+            if stream is not None:
+                stream.close(answer)
+        return answer
+
+    async def _stream(self, text: str, mode: str, header: asyncio.Future, stream: Optional[AnswerStream]) -> Optional[LLMAnswer]:
+        trace = tracing.current()
+        if trace is not None:
+            trace.mark("classify_start")
+
+        local = self.classifier.classify_locally(text)
+        if local is not None and local.action == "ignore":
+            if local.reasoning.startswith(FAST_PATH_REASON):
+                self.classifier.llm_calls_skipped += 1
+            if trace is not None:
+                trace.mark("classify_end")
+                trace.tags["classify_source"] = "fast_path"
+            header.set_result(local)
+            return None
+
+        user_message = {"role": "user", "content": text}
+        messages = self.generator.history.messages(self.generator.grounded_prompt(combined_prompt(mode), text), user_message)
+
+        try:
+            response = await self.generator.guard.stream("combined", partial(
+                self.generator.client.chat.completions.create,
+                model=model_for("combined"),
+                timeout=timeout_for("combined"),
+                messages=messages, # type: ignore
+                temperature=0.3,
+                stream=True,
+            ))
+        except resilience.BackendUnavailable:
+            # backend is down: local classification, cached or fallback answer
+            res = await self.classifier.classify(text)
+            header.set_result(res)
+            if res.action != "respond":
+                return None
+            return await self.generator._generate(text, res.intent, mode, stream)
+        self.classifier.llm_calls += 1
+
+        buffer = ""  # only until the header is parsed
+        parts: list[str] = []
+        res: Optional[ClassificationResult] = None
+        complete = True
+        try:
+            async for chunk in response:
+                delta = chunk.choices[0].delta.content if chunk.choices[0].delta.content else ""
+                if res is not None:
+                    if delta:
+                        if trace is not None:
+                            trace.mark("first_token")
+                            trace.count("tokens")
+                        parts.append(delta)
+                        self.generator.publish(stream, delta)
+                    continue
+
+                buffer += delta
+                parsed = parse_header(buffer)
+                if parsed is None:
+                    continue
+                fields, buffer = parsed
+                res = ClassificationResult(
+                    intent=fields.get("intent", "unknown"),
+                    action=fields.get("action", "ignore"),
+                    confidence=float(fields.get("confidence", 0.5)),
+                    reasoning="Combined classify-and-answer call",
+                )
+                if self.console_output:
+                    print(f"[COMBINED] Header: {fields}")
+                if trace is not None:
+                    trace.mark("classify_end")
+                    trace.mark("answer_start")
+                    trace.tags["classify_source"] = "combined"
+                    if buffer:
+                        trace.mark("first_token")
+                header.set_result(res)
+                if res.action != "respond":
+                    # nothing more to read, stop paying for tokens
+                    await response.close()
+                    return None
+                self.classifier.remember(text, json.dumps({"intent": res.intent, "action": res.action}))
+
+                cache = self.generator.cache
+                cached = cache.get(text, res.intent, mode) if cache is not None else None
+                if cached is not None:
+                    await response.close()
+                    if trace is not None:
+                        trace.mark("first_token")
+                        trace.mark("answer_end")
+                        trace.tags["answer_source"] = "cache"
+                    self.generator.publish(stream, cached)
+                    self.generator.remember(text, cached)
+                    return LLMAnswer(
+                        text=cached,
+                        mode=mode,  # type: ignore
+                        confidence=0.9,
+                    )
+                if buffer:  # answer text that arrived with the header
+                    parts.append(buffer)
+                    self.generator.publish(stream, buffer)
+        except asyncio.CancelledError:
+            await response.close()
+            raise
+        except resilience.DeadlineExceeded:
+            if not parts:
+                raise
+            complete = False  # keep what arrived rather than waiting on a stalled stream
+
+        if res is None:
+            raise ValueError("stream ended before the classification header")
+
+        answer = "".join(parts).strip()
+        if trace is not None:
+            trace.mark("answer_end")
+            trace.tags["answer_source"] = "combined" if complete else "combined_truncated"
+        self.generator.remember(text, answer)
+        if self.generator.cache is not None and complete:
+            self.generator.cache.put(text, res.intent, mode, answer)
+        return LLMAnswer(
+            text=answer,
+            mode=mode,  # type: ignore
+            confidence=0.9,
+        )
@@ -0,0 +1,244 @@
+import math
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Literal
+
+Label = Literal["question", "filler"]
+
+@dataclass
+class FastPrediction:
+    label: Label
+    intent: str
+    confidence: float
+    reason: str
+
+# --- Lexical rules ---
+FILLER_WORDS = {
+    "yeah", "yes", "yep", "ok", "okay", "so", "um", "uh", "hmm", "mm", "right",
+    "alright", "well", "like", "you", "know", "i", "mean", "sure", "cool",
+    "great", "nice", "and", "but", "the", "a", "oh", "ah", "got", "it", "see",
+    "thanks", "thank", "good", "fine", "just", "actually", "basically", "let",
+    "me", "think", "anyway", "sorry", "wait", "one", "second", "hold", "on",
+}
+
+QUESTION_OPENERS = (
+    "can you", "could you", "would you", "will you", "tell me", "walk me through",
+    "talk me through", "how would", "how do", "how does", "how did", "how can",
+    "how is", "how are", "what is", "what's", "what are", "what was", "what would",
+    "what do", "what does", "what did", "what happens", "why do", "why does",
+    "why did", "why would", "why is", "when would", "when did", "where do",
+    "which", "who", "describe", "explain", "give me", "have you ever", "do you",
+    "did you", "are you", "is there", "imagine", "suppose", "design", "implement",
+    "write a", "compare", "difference between",
+)
+
+# Small talk and call logistics phrased as questions ("Can you see my screen?",
+# "Are you ready to get started?"): never settled locally as a question
+SMALL_TALK_CUES = (
+    "screen", "hear me", "see me", "audio", "video", "camera", "mic", "microphone",
+    "mute", "muted", "unmute", "connection", "internet", "lagging", "frozen", "breaking up",
+    "ready", "get started", "get going", "water", "coffee", "break", "bathroom", "restroom",
+    "weather", "weekend", "how are you", "how's it going", "how is it going", "how's your day",
+    "time zone", "reschedule", "zoom", "the link", "the chat", "share my", "sharing",
+    "good morning", "good afternoon", "nice to meet",
+)
+_SMALL_TALK_RE = re.compile(r"\b(?:" + "|".join(re.escape(c) for c in SMALL_TALK_CUES) + r")\b")
+
+QUESTION_MARK_CONFIDENCE = 0.75  # "?" alone: below the fast-path threshold unless the model agrees
+SMALL_TALK_CONFIDENCE = 0.6
+
+TRAILING_CONNECTORS = {"and", "so", "but", "or", "because", "then", "like", "the", "a", "to", "of"}
+
+INTENT_KEYWORDS = {
+    "behavioral": (
+        "tell me about a time", "describe a situation", "conflict", "challenge",
+        "mistake", "failure", "weakness", "strength", "team", "manager",
+        "yourself", "motivate", "proud", "disagree", "deadline",
+    ),
+    "algorithmic": (
+        "complexity", "algorithm", "array", "linked list", "tree", "graph",
+        "sort", "hash", "binary", "dynamic programming", "recursion", "big o",
+        "string", "stack", "queue", "heap", "search",
+    ),
+    "system_design": (
+        "design", "scale", "shard", "distributed", "cache", "load balancer",
+        "database", "microservice", "throughput", "latency", "architecture",
+        "replication", "api",
+    ),
+}
+
+def _keyword_pattern(keyword: str) -> str:
+    """keyword plus its plural/verb forms ("cache" -> caches, cached, caching), as whole words only."""
+    if keyword.endswith("e"):
+        return re.escape(keyword[:-1]) + "(?:e|es|ed|ing)"
+    return re.escape(keyword) + "(?:s|es|ed|ing)?"
+
+# whole-word matching, so "street" is not a tree and "cheap" is not a heap
+_INTENT_RES = {
+    intent: re.compile(r"\b(?:" + "|".join(_keyword_pattern(k) for k in keywords) + r")\b")
+    for intent, keywords in INTENT_KEYWORDS.items()
+}
+
+# --- Bundled seed corpus for the hashed n-gram model ---
+SEED_QUESTIONS = (
+    "can you walk me through your last project",
+    "tell me about yourself",
+    "tell me about a time you disagreed with your manager",
+    "how would you design a url shortener",
+    "what is the time complexity of binary search",
+    "what's the difference between a process and a thread",
+    "why do you want to work here",
+    "how do you handle tight deadlines",
+    "explain how a hash map works",
+    "describe a challenging bug you fixed",
+    "what are your greatest strengths",
+    "how would you scale this system to millions of users",
+    "can you explain the cap theorem",
+    "what happens when you type a url into the browser",
+    "how would you reverse a linked list",
+    "have you ever worked with distributed systems",
+    "why are you leaving your current job",
+    "what would you do differently next time",
+    "how do you prioritize your work",
+    "could you describe your role on the team",
+    "what is dependency injection",
+    "how does garbage collection work in python",
+    "walk me through how you would debug a slow query",
+    "where do you see yourself in five years",
+    "what was the hardest technical decision you made",
+    "how would you find duplicates in an array",
+    "do you have any experience with kubernetes",
+    "explain the difference between sql and nosql databases",
+)
+
+SEED_FILLER = (
+    "yeah okay so",
+    "um let me think",
+    "okay great",
+    "right right",
+    "sounds good",
+    "thanks for that",
+    "okay cool",
+    "yeah that makes sense",
+    "sorry go ahead",
+    "can you hear me okay",
+    "let me share my screen",
+    "one second",
+    "alright so",
+    "you know what i mean",
+    "okay perfect thank you",
+    "hmm interesting",
+    "yeah yeah",
+    "that's fine",
+    "hold on a sec",
+    "i think we're good",
+    "so yeah",
+    "nice nice",
+    "uh huh",
+    "great let's move on",
+    "okay so the next thing",
+    "i see",
+    "got it thanks",
+    "all right",
+)
+
+_TOKEN_RE = re.compile(r"[a-z']+")
+
+def _tokens(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+class HashedNGramModel:
+    """
+    Tiny multinomial naive Bayes over hashed unigrams and bigrams.
+    Trained from the bundled seed corpus at construction (well under a millisecond).
+    """
+
+    def __init__(self, buckets: int = 4096, alpha: float = 0.5, temperature: float = 0.35):
+        self.buckets = buckets
+        self.alpha = alpha
+        self.temperature = temperature
+        self.counts = {"question": [0] * buckets, "filler": [0] * buckets}
+        self.totals = {"question": 0, "filler": 0}
+        self.fit(SEED_QUESTIONS, "question")
+        self.fit(SEED_FILLER, "filler")
+
+    def _features(self, text: str) -> list[int]:
+        tokens = _tokens(text)
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return [zlib.crc32(g.encode()) % self.buckets for g in grams]
+
+    def fit(self, examples, label: Label):
+        counts = self.counts[label]
+        for example in examples:
+            for f in self._features(example):
+                counts[f] += 1
+                self.totals[label] += 1
+
+    def predict_proba(self, text: str) -> float:
+        """Probability that text is a question."""
+        features = self._features(text)
+        if not features:
+            return 0.5
+        log_odds = 0.0
+        q_denom = self.totals["question"] + self.alpha * self.buckets
+        f_denom = self.totals["filler"] + self.alpha * self.buckets
+        for f in features:
+            q = (self.counts["question"][f] + self.alpha) / q_denom
+            p = (self.counts["filler"][f] + self.alpha) / f_denom
+            log_odds += math.log(q / p)
+        # naive Bayes is overconfident on a corpus this small, so soften it
+        log_odds *= self.temperature
+        return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, log_odds))))
+
+class FastClassifier:
+    """
+    Local tier in front of the LLM: lexical rules plus a hashed n-gram model.
+    Only predictions at or above the caller's threshold should skip the LLM.
+    """
+
+    def __init__(self):
+        self.model = HashedNGramModel()
+
+    def predict(self, text: str) -> FastPrediction:
+        tokens = _tokens(text)
+        lowered = " ".join(tokens)
+        p_question = self.model.predict_proba(text)
+
+        rule_label, rule_conf, reason = None, 0.0, "n-gram model"
+        if tokens and all(t in FILLER_WORDS for t in tokens):
+            rule_label, rule_conf, reason = "filler", 0.97, "only filler words"
+        elif tokens and tokens[-1] in TRAILING_CONNECTORS:
+            # sentence trails off, let the LLM (or the next utterance) decide
+            return FastPrediction("filler", "filler", 0.5, "trailing connector")
+        elif len(tokens) >= 4 and lowered.startswith(QUESTION_OPENERS):
+            rule_label, rule_conf, reason = "question", 0.9, "question opener"
+        elif text.rstrip().endswith("?") and len(tokens) >= 4:
+            # any sentence can end in "?" ("Is my audio coming through?"), so on its
+            # own this only skips the LLM when the n-gram model is confident too
+            rule_label, rule_conf, reason = "question", QUESTION_MARK_CONFIDENCE, "question mark"
+
+        model_label = "question" if p_question >= 0.5 else "filler"
+        model_conf = max(p_question, 1.0 - p_question)
+
+        if rule_label is None:
+            label, confidence = model_label, min(model_conf, 0.8)
+        elif rule_label == model_label:
+            label, confidence = rule_label, max(rule_conf, model_conf)
+        else:
+            # rule and model disagree: keep the rule's label but stay below any sane threshold
+            label, confidence = rule_label, rule_conf * 0.7
+            reason += ", model disagrees"
+
+        if label == "question" and _SMALL_TALK_RE.search(lowered):
+            confidence = min(confidence, SMALL_TALK_CONFIDENCE)  # let the LLM decide
+            reason += ", small talk cue"
+
+        intent = self._intent(lowered) if label == "question" else "filler"
+        return FastPrediction(label, intent, round(confidence, 3), reason)
+
+    def _intent(self, lowered: str) -> str:
+        for intent, pattern in _INTENT_RES.items():
+            if pattern.search(lowered):
+                return intent
+        return "general"
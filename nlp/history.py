@@ -0,0 +1,107 @@
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English)."""
+    return len(text) // 4 + 1
+
+def _clip_words(text: str, max_words: int) -> str:
+    words = text.split()
+    if len(words) <= max_words:
+        return " ".join(words)
+    return " ".join(words[:max_words]) + "..."
+
+@dataclass
+class Turn:
+    role: str
+    content: str
+    tokens: int
+
+class ConversationHistory:
+    """
+    Compact conversation memory shared by the classifier and the generator.
+
+    Only question/answer content is stored; instructions are passed as the
+    system prompt per request and never accumulate. Turns are trimmed by an
+    estimated token budget rather than by message count. With summarize=True
+    the trimmed turns are folded into a short rolling summary instead of
+    being dropped outright.
+    """
+
+    def __init__(self, token_budget: int = 1200, summarize: bool = False, summary_budget: int = 150):
+        self.token_budget = token_budget
+        self.summarize = summarize
+        self.summary_budget = summary_budget
+        self.turns: list[Turn] = []
+        self.summary: list[str] = []  # one line per folded exchange, oldest first
+
+    @property
+    def tokens(self) -> int:
+        return sum(t.tokens for t in self.turns) + sum(estimate_tokens(s) for s in self.summary)
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def add(self, role: str, content: str):
+        self.turns.append(Turn(role, content, estimate_tokens(content)))
+        self._trim()
+
+    def add_exchange(self, question: str, answer: str):
+        self.turns.append(Turn("user", question, estimate_tokens(question)))
+        self.turns.append(Turn("assistant", answer, estimate_tokens(answer)))
+        self._trim()
+
+    def remove_exchange(self, question: str, answer: Optional[str] = None) -> bool:
+        """
+        Roll back the latest exchange for question (e.g. an answer that was
+        superseded). With answer set, only an exchange with that reply matches.
+        """
+        for i in range(len(self.turns) - 1, -1, -1):
+            turn = self.turns[i]
+            if turn.role == "user" and turn.content == question:
+                replied = i + 1 < len(self.turns) and self.turns[i + 1].role == "assistant"
+                if answer is not None and not (replied and self.turns[i + 1].content == answer):
+                    continue
+                end = i + 2 if replied else i + 1
+                del self.turns[i:end]
+                return True
+        return False
+
+    def messages(self, system_prompt: Optional[str] = None, latest: Optional[dict] = None) -> list[dict]:
+        """Build the request messages: system prompt, rolling summary, stored turns, latest message."""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        if self.summary:
+            messages.append({
+                "role": "system",
+                "content": "Earlier in the interview:\n" + "\n".join(self.summary),
+            })
+        messages += [{"role": t.role, "content": t.content} for t in self.turns]
+        if latest is not None:
+            messages.append(latest)
+        return messages
+
+    def clear(self):
+        self.turns = []
+        self.summary = []
+
+    def _trim(self):
+        while self.turns and sum(t.tokens for t in self.turns) > self.token_budget:
+            oldest = self.turns.pop(0)
+            # keep exchanges whole: drop the answer that belongs to a dropped question
+            answer = self.turns.pop(0) if self.turns and oldest.role == "user" and self.turns[0].role == "assistant" else None
+            if self.summarize:
+                self._fold(oldest, answer)
+
+    def _fold(self, first: Turn, answer: Optional[Turn]):
+        line = f"Q: {_clip_words(first.content, 12)}" if first.role == "user" else _clip_words(first.content, 20)
+        if answer is not None:
+            first_sentence = _SENTENCE_RE.split(answer.content.strip(), maxsplit=1)[0]
+            line += f" -> A: {_clip_words(first_sentence, 20)}"
+        self.summary.append(line)
+        while self.summary and sum(estimate_tokens(s) for s in self.summary) > self.summary_budget:
+            self.summary.pop(0)
@@ -0,0 +1,139 @@
+import os
+import time
+import dotenv
+import httpx
+from groq import AsyncGroq
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+dotenv.load_dotenv()
+
+Provider = Literal["groq", "openai", "local"]
+
+DEFAULT_MODEL = "openai/gpt-oss-120b"
+LOCAL_BASE_URL = "http://127.0.0.1:8008"  # see mock_llm_server.py
+
+@dataclass
+class BackendConfig:
+    """
+    Which LLM endpoint to talk to.
+
+    groq   - Groq cloud (default)
+    openai - any OpenAI-compatible endpoint at base_url (needs the `openai` package)
+    local  - the bundled stand-in server (mock_llm_server.py) or any local
+             server that also answers on the /openai/v1 prefix
+    """
+    provider: Provider = "groq"
+    model: str = DEFAULT_MODEL
+    classify_model: Optional[str] = None  # defaults to model
+    base_url: Optional[str] = None
+    api_key: Optional[str] = None
+
+def backend_from_env() -> BackendConfig:
+    provider = os.getenv("LLM_BACKEND", "groq").lower()
+    if provider not in ("groq", "openai", "local"):
+        raise ValueError(f"Unknown LLM_BACKEND: {provider}")
+    return BackendConfig(
+        provider=provider,  # type: ignore
+        model=os.getenv("LLM_MODEL", DEFAULT_MODEL),
+        classify_model=os.getenv("LLM_CLASSIFY_MODEL") or None,
+        base_url=os.getenv("LLM_BASE_URL") or (LOCAL_BASE_URL if provider == "local" else None),
+        api_key=os.getenv("LLM_API_KEY") or None,
+    )
+
+BACKEND = backend_from_env()
+
+# Per call-type timeouts in seconds. connect is kept short on purpose:
+# a stalled handshake should fail fast rather than eat the answer budget.
+TIMEOUTS = {
+    "classify": httpx.Timeout(8.0, connect=3.0),
+    "generate": httpx.Timeout(30.0, connect=3.0),
+    "combined": httpx.Timeout(30.0, connect=3.0),
+    "prewarm": httpx.Timeout(5.0, connect=3.0),
+}
+
+POOL_LIMITS = httpx.Limits(
+    max_connections=20,
+    max_keepalive_connections=10,
+    keepalive_expiry=300,  # keep TLS connections alive across quiet stretches of an interview
+)
+
+_client = None
+
+def configure(
+    timeouts: Optional[dict] = None,
+    limits: Optional[httpx.Limits] = None,
+    backend: Optional[BackendConfig] = None,
+):
+    """
+    Override timeouts (seconds or httpx.Timeout per call type), pool limits
+    and the backend. Call before the classifier/generator are created.
+    """
+    global POOL_LIMITS, BACKEND, _client
+    for call_type, value in (timeouts or {}).items():
+        TIMEOUTS[call_type] = value if isinstance(value, httpx.Timeout) else httpx.Timeout(value, connect=3.0)
+    if limits is not None:
+        POOL_LIMITS = limits
+    if backend is not None:
+        if backend.provider == "local" and backend.base_url is None:
+            backend.base_url = LOCAL_BASE_URL
+        BACKEND = backend
+        _client = None  # rebuilt lazily for the new backend
+
+# Retries are left to nlp.resilience (a hedge fires at once on a fast failure);
+# the SDK's own retries back off for seconds and would blow the call deadlines.
+MAX_RETRIES = 0
+
+def _build_client():
+    http_client = httpx.AsyncClient(limits=POOL_LIMITS, timeout=TIMEOUTS["generate"])
+    if BACKEND.provider == "openai":
+        try:
+            from openai import AsyncOpenAI
+        except ImportError as e:
+            raise ImportError("LLM_BACKEND=openai needs the `openai` package (pip install openai)") from e
+        return AsyncOpenAI(
+            api_key=BACKEND.api_key or os.getenv("OPENAI_API_KEY") or "unused",
+            base_url=BACKEND.base_url,
+            http_client=http_client,
+            max_retries=MAX_RETRIES,
+        )
+    if BACKEND.provider == "local":
+        return AsyncGroq(api_key=BACKEND.api_key or "local", base_url=BACKEND.base_url, http_client=http_client, max_retries=MAX_RETRIES)
+    return AsyncGroq(api_key=BACKEND.api_key, base_url=BACKEND.base_url, http_client=http_client, max_retries=MAX_RETRIES)
+
+def get_client():
+    """The process-wide LLM client; classifier and generator share its connection pool."""
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
+
+def model_for(call_type: str) -> str:
+    if call_type == "classify" and BACKEND.classify_model:
+        return BACKEND.classify_model
+    return BACKEND.model
+
+def timeout_for(call_type: str) -> httpx.Timeout:
+    return TIMEOUTS.get(call_type, TIMEOUTS["generate"])
+
+async def prewarm(console_output=False) -> bool:
+    """
+    Open a pooled connection (DNS, TCP, TLS) ahead of the first real request.
+    Call when a session starts; failures are not fatal.
+    """
+    started = time.perf_counter()
+    try:
+        await get_client().models.list(timeout=timeout_for("prewarm"))
+    except Exception as e:
+        if console_output:
+            print(f"[LLM] Pre-warm failed: {e}")
+        return False
+    if console_output:
+        print(f"[LLM] Connection pre-warmed in {(time.perf_counter() - started) * 1000:.0f} ms ({BACKEND.provider})")
+    return True
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
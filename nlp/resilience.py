@@ -0,0 +1,311 @@
+"""
+Deadlines, hedged requests and a circuit breaker for LLM calls.
+
+Every classify/answer call goes through the shared `guard`:
+
+  - deadlines: the first response (first streamed token, or the whole reply
+    for non-streaming calls) and the complete call each have an upper bound,
+    so a stalled request fails in seconds instead of whenever the SDK gives up
+  - hedging: when the first attempt has not responded within the observed
+    p95 latency for its call type, an identical second request is fired and
+    whichever responds first is used; the other is cancelled
+  - circuit breaker: after a few consecutive failures the backend is treated
+    as down for a cooldown period and calls fail immediately with
+    BackendUnavailable, so callers go straight to their local fallback
+    (fast-path classification, cached or canned answers). One probe request
+    is let through after the cooldown to test recovery.
+
+All methods must be called from the event loop thread.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from core import tracing
+
+# seconds per call type
+DEADLINES = {
+    "classify": {"first_response": 4.0, "total": 4.0},
+    "generate": {"first_response": 6.0, "total": 20.0},
+    "combined": {"first_response": 6.0, "total": 20.0},
+}
+
+# hedge delay used until enough latencies have been observed
+INITIAL_HEDGE_AFTER = {"classify": 1.5, "generate": 2.0, "combined": 2.0}
+
+class BackendUnavailable(Exception):
+    """The circuit breaker is open; the call was not attempted."""
+
+class DeadlineExceeded(Exception):
+    """The backend did not respond within the call's deadline."""
+
+class LatencyTracker:
+    """Rolling window of first-response latencies per call type."""
+
+    WINDOW = 200
+    MIN_SAMPLES = 20
+
+    def __init__(self, window: int = WINDOW, min_samples: int = MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self.samples: dict[str, deque] = {}
+
+    def observe(self, call_type: str, seconds: float):
+        self.samples.setdefault(call_type, deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, call_type: str, q: float) -> Optional[float]:
+        """Nearest-rank quantile, or None until min_samples have been seen."""
+        samples = self.samples.get(call_type)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class CircuitBreaker:
+    """
+    closed    - calls go through
+    open      - calls are refused until `cooldown` has passed
+    half_open - a single probe call is in flight; its outcome closes or reopens
+    """
+
+    FAILURE_THRESHOLD = 3  # consecutive failures
+    COOLDOWN = 15.0
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN, console_output=False):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.console_output = console_output
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+
+        self.opens = 0
+        self.short_circuited = 0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = "half_open"
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record_success(self):
+        if self.state != "closed" and self.console_output:
+            print("[LLM] Backend healthy again, circuit closed")
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opens += 1
+                if self.console_output:
+                    print(f"[LLM] Backend unhealthy, using local fallbacks for {self.cooldown:.0f} s")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """The probe was cancelled without an outcome; let the next call probe instead."""
+        if self.state == "half_open":
+            self.state = "open"
+
+class GuardedStream:
+    """
+    A streaming response whose first chunks were already read by the guard.
+    Iterating enforces the call's total deadline between chunks.
+    """
+
+    def __init__(self, guard: "LLMGuard", call_type: str, response, chunks, head: list, deadline_at: float):
+        self.guard = guard
+        self.call_type = call_type
+        self.response = response
+        self._chunks = chunks
+        self._head = head
+        self.deadline_at = deadline_at
+
+    async def close(self):
+        await self.response.close()
+
+    async def __aiter__(self):
+        for chunk in self._head:
+            yield chunk
+        while True:
+            remaining = self.deadline_at - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                chunk = await asyncio.wait_for(self._chunks.__anext__(), remaining)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                await self.response.close()
+                self.guard.deadline_missed(self.call_type)
+                raise DeadlineExceeded(f"{self.call_type} did not finish within {DEADLINES[self.call_type]['total']:.0f} s") from None
+            yield chunk
+
+def _has_content(chunk) -> bool:
+    return bool(chunk.choices and chunk.choices[0].delta.content)
+
+class LLMGuard:
+    HEDGE_QUANTILE = 0.95
+    MIN_HEDGE_AFTER = 0.2  # never hedge sooner than this, however fast the backend is
+
+    def __init__(
+        self,
+        breaker: Optional[CircuitBreaker] = None,
+        tracker: Optional[LatencyTracker] = None,
+        hedging: bool = True,
+        console_output=False,
+    ):
+        self.breaker = breaker or CircuitBreaker(console_output=console_output)
+        self.tracker = tracker or LatencyTracker()
+        self.hedging = hedging
+        self.console_output = console_output
+
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadlines_missed = 0
+
+    def hedge_after(self, call_type: str) -> Optional[float]:
+        if not self.hedging:
+            return None
+        observed = self.tracker.quantile(call_type, self.HEDGE_QUANTILE)
+        if observed is None:
+            return INITIAL_HEDGE_AFTER.get(call_type)
+        return max(self.MIN_HEDGE_AFTER, observed)
+
+    async def request(self, call_type: str, create: Callable[[], Awaitable]):
+        """Non-streaming call: returns the first complete response."""
+        return await self._call(call_type, create, None)
+
+    async def stream(self, call_type: str, create: Callable[[], Awaitable]) -> GuardedStream:
+        """Streaming call: returns once the first token has arrived."""
+        started = time.monotonic()
+
+        async def open_stream():
+            response = await create()
+            chunks = response.__aiter__()
+            head = []
+            try:
+                while not head or not _has_content(head[-1]):
+                    head.append(await chunks.__anext__())
+            except StopAsyncIteration:
+                pass
+            except BaseException:
+                await response.close()
+                raise
+            return response, chunks, head
+
+        async def discard(opened):
+            await opened[0].close()
+
+        response, chunks, head = await self._call(call_type, open_stream, discard)
+        return GuardedStream(self, call_type, response, chunks, head, started + DEADLINES[call_type]["total"])
+
+    def deadline_missed(self, call_type: str):
+        self.deadlines_missed += 1
+        self.breaker.record_failure()
+        if self.console_output:
+            print(f"[LLM] {call_type} missed its deadline")
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "deadlines_missed": self.deadlines_missed,
+            "breaker_state": self.breaker.state,
+            "breaker_opens": self.breaker.opens,
+            "short_circuited": self.breaker.short_circuited,
+            "p95_ms": {
+                call_type: round(p95 * 1000, 1)
+                for call_type in self.tracker.samples
+                if (p95 := self.tracker.quantile(call_type, self.HEDGE_QUANTILE)) is not None
+            },
+        }
+
+    async def _call(self, call_type: str, attempt: Callable[[], Awaitable], discard):
+        if not self.breaker.allow():
+            raise BackendUnavailable("LLM backend marked unhealthy, using local fallback")
+        self.calls += 1
+        # a recovery probe is a single request, never hedged
+        hedge_after = self.hedge_after(call_type) if self.breaker.state == "closed" else None
+        deadline = DEADLINES[call_type]["first_response"]
+        try:
+            result = await asyncio.wait_for(self._first_of(call_type, attempt, discard, hedge_after), deadline)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except asyncio.TimeoutError:
+            self.deadline_missed(call_type)
+            raise DeadlineExceeded(f"no {call_type} response within {deadline:.1f} s") from None
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _first_of(self, call_type: str, attempt: Callable[[], Awaitable], discard, hedge_after: Optional[float]):
+        started = time.monotonic()  # a hedge is timed from here too: this is the latency the caller sees
+        attempts = [asyncio.create_task(attempt())]
+        pending = set(attempts)
+        winner: Optional[asyncio.Task] = None
+        error: Optional[BaseException] = None
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((t for t in attempts if t in done and t.exception() is None), None)
+                if winner is not None:
+                    # the loser is recorded too, censored at the moment it is cancelled:
+                    # keeping only winners would pull the p95, and so the hedge delay, down
+                    elapsed = time.monotonic() - started
+                    for task in attempts:
+                        if not task.done() or task.exception() is None:
+                            self.tracker.observe(call_type, elapsed)
+                    if winner is not attempts[0]:
+                        self.hedge_wins += 1
+                    return winner.result()
+                for task in done:
+                    error = task.exception()
+                if hedge_after is not None and len(attempts) == 1:
+                    # slow, or failed fast: one duplicate request
+                    hedge_after = None
+                    self.hedges += 1
+                    trace = tracing.current()
+                    if trace is not None:
+                        trace.count("hedges")
+                    if self.console_output:
+                        print(f"[LLM] Hedging slow {call_type} request")
+                    hedge = asyncio.create_task(attempt())
+                    attempts.append(hedge)
+                    pending.add(hedge)
+                elif not pending:
+                    raise error  # type: ignore
+        finally:
+            for task in attempts:
+                task.cancel()
+            if discard is not None:
+                # every loser is cancelled before anything is awaited, so none can
+                # finish (and open a stream) unnoticed while another is closed
+                for task in attempts:
+                    if task is not winner and task.done() and not task.cancelled() and task.exception() is None:
+                        try:
+                            await discard(task.result())
+                        except Exception:
+                            pass
+
+guard = LLMGuard()
+
+def configure(deadlines: Optional[dict] = None, hedging: Optional[bool] = None, console_output: Optional[bool] = None):
+    """Override deadlines ({call_type: {"first_response": s, "total": s}}) and hedging."""
+    for call_type, values in (deadlines or {}).items():
+        DEADLINES.setdefault(call_type, {}).update(values)
+    if hedging is not None:
+        guard.hedging = hedging
+    if console_output is not None:
+        guard.console_output = guard.breaker.console_output = console_output
@@ -0,0 +1,391 @@
+"""
+Local knowledge base: the candidate's notes, resume and project docs.
+
+A folder of documents is split into short passages and indexed for BM25
+ranking. The index lives on disk and is memory-mapped on load, so opening
+it is cheap and a query only touches the postings of its own terms. Per
+question, the best passages that fit a token budget are added to the answer
+prompt instead of pasting whole documents into the conversation.
+
+Index layout (index_dir):
+    index.json        term -> (postings offset, document frequency), passage sources
+    postings_ids.bin  uint32 passage ids, grouped by term
+    postings_tf.bin   uint32 term frequencies, parallel to postings_ids.bin
+    lengths.bin       uint32 passage lengths in terms
+    offsets.bin       uint64 start offsets into passages.bin (one extra at the end)
+    passages.bin      UTF-8 passage text
+    segments.json     per-file passages and term counts, for incremental rebuilds
+
+Reindexing only re-reads files whose size or mtime changed; the merged
+postings are then rebuilt from the cached per-file term counts.
+"""
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import time
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from nlp.history import estimate_tokens
+
+KNOWLEDGE_DIR = os.getenv("KNOWLEDGE_DIR", "knowledge")
+INDEX_DIR = os.getenv("KNOWLEDGE_INDEX", "knowledge_index")
+TEXT_EXTENSIONS = (".txt", ".md", ".markdown", ".rst")
+PDF_EXTENSIONS = (".pdf",)  # needs the optional `pypdf` package
+
+INDEX_VERSION = 1
+_INDEX_FILES = ("postings_ids.bin", "postings_tf.bin", "lengths.bin", "offsets.bin", "passages.bin")
+
+_TERM_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+_HEADING_RE = re.compile(r"^\s*#+\s*(.+?)\s*#*\s*$")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "could", "did", "do",
+    "does", "for", "from", "had", "has", "have", "how", "i", "if", "in", "into", "is",
+    "it", "its", "me", "my", "of", "on", "or", "our", "so", "that", "the", "their",
+    "them", "then", "there", "this", "to", "us", "was", "we", "were", "what", "when",
+    "where", "which", "who", "why", "will", "with", "would", "you", "your",
+}
+
+def terms(text: str) -> list[str]:
+    """Lowercased words without stopwords, with plural endings folded."""
+    out = []
+    for word in _TERM_RE.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith("ies"):
+            word = word[:-3] + "y"
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        out.append(word)
+    return out
+
+def read_document(path: str) -> str:
+    if path.lower().endswith(PDF_EXTENSIONS):
+        try:
+            from pypdf import PdfReader
+        except ImportError as e:
+            raise ImportError(f"Indexing {path} needs the `pypdf` package (pip install pypdf)") from e
+        return "\n\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+def split_passages(text: str, max_words: int) -> list[str]:
+    """
+    Paragraph-aligned passages of up to max_words words. Markdown headings
+    are carried into the passages below them for context.
+    """
+    passages: list[str] = []
+    heading = ""
+    current: list[str] = []
+
+    def close():
+        if current:
+            body = " ".join(current)
+            passages.append(f"{heading}: {body}" if heading else body)
+            current.clear()
+
+    for block in re.split(r"\n\s*\n", text):
+        lines = block.strip().splitlines()
+        if not lines:
+            continue
+        match = _HEADING_RE.match(lines[0])
+        if match:
+            close()
+            heading = match.group(1)
+            lines = lines[1:]
+        words = " ".join(lines).split()
+        if current and len(current) + len(words) > max_words:
+            close()
+        while len(words) > max_words:
+            passages.append((f"{heading}: " if heading else "") + " ".join(words[:max_words]))
+            words = words[max_words:]
+        current.extend(words)
+    close()
+    return passages
+
+@dataclass
+class Passage:
+    text: str
+    source: str
+    score: float
+
+class KnowledgeBase:
+    """
+    BM25 over passages of the files in `source_dir`.
+
+        kb = KnowledgeBase("knowledge")
+        kb.reindex()                      # incremental; cheap when nothing changed
+        kb.context("How did you scale the billing service?")
+
+    search() and context() are read-only and safe to call from any thread,
+    but not while reindex() swaps the files underneath them.
+    """
+
+    PASSAGE_WORDS = 120
+    TOP_K = 4
+    TOKEN_BUDGET = 300
+    MIN_RELATIVE_SCORE = 0.35  # drop passages scoring far below the best one
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(
+        self,
+        source_dir: str = KNOWLEDGE_DIR,
+        index_dir: str = INDEX_DIR,
+        passage_words: int = PASSAGE_WORDS,
+        top_k: int = TOP_K,
+        token_budget: int = TOKEN_BUDGET,
+        console_output=False,
+    ):
+        self.source_dir = source_dir
+        self.index_dir = index_dir
+        self.passage_words = passage_words
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self.console_output = console_output
+
+        self.term_index: dict[str, list[int]] = {}  # term -> [postings offset, df]
+        self.sources: list[int] = []  # passage id -> file number
+        self.files: list[str] = []
+        self.avg_length = 0.0
+        self._maps: list[mmap.mmap] = []
+        self._ids = self._tfs = self._lengths = self._offsets = None
+        self._text = None
+
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.last_query_ms = 0.0
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    # ----- query -----
+
+    def search(self, query: str, k: Optional[int] = None) -> list[Passage]:
+        started = time.perf_counter()
+        scores: dict[int, float] = {}
+        n = len(self.sources)
+        if n:
+            k1, b, avg = self.K1, self.B, self.avg_length or 1.0
+            lengths, ids, tfs = self._lengths, self._ids, self._tfs
+            for term in set(terms(query)):
+                entry = self.term_index.get(term)
+                if entry is None:
+                    continue
+                start, df = entry
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                for i in range(start, start + df):
+                    pid, tf = ids[i], tfs[i]  # type: ignore
+                    norm = k1 * (1 - b + b * lengths[pid] / avg)  # type: ignore
+                    scores[pid] = scores.get(pid, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        best = heapq.nlargest(k or self.top_k, scores.items(), key=lambda item: item[1])
+        results = [Passage(self.passage(pid), self.files[self.sources[pid]], score) for pid, score in best]
+
+        elapsed = time.perf_counter() - started
+        self.queries += 1
+        self.query_seconds += elapsed
+        self.last_query_ms = elapsed * 1000
+        return results
+
+    def passage(self, pid: int) -> str:
+        start, end = self._offsets[pid], self._offsets[pid + 1]  # type: ignore
+        return self._text[start:end].decode("utf-8")  # type: ignore
+
+    def context(self, question: str, token_budget: Optional[int] = None) -> list[Passage]:
+        """The top passages for question that fit in token_budget (estimated tokens)."""
+        budget = token_budget or self.token_budget
+        hits = self.search(question)
+        if not hits:
+            return []
+        floor = hits[0].score * self.MIN_RELATIVE_SCORE
+        chosen, used = [], 0
+        for hit in hits:
+            if hit.score < floor:
+                break
+            cost = estimate_tokens(hit.text)
+            if used + cost > budget:
+                if not chosen:  # always give the best passage, clipped to the budget
+                    hit.text = " ".join(hit.text.split()[: budget * 3 // 4]) + "..."
+                    chosen.append(hit)
+                break
+            chosen.append(hit)
+            used += cost
+        return chosen
+
+    def stats(self) -> dict:
+        return {
+            "passages": len(self.sources),
+            "files": len(self.files),
+            "terms": len(self.term_index),
+            "queries": self.queries,
+            "avg_query_ms": round(self.query_seconds / self.queries * 1000, 3) if self.queries else 0.0,
+            "last_query_ms": round(self.last_query_ms, 3),
+        }
+
+    # ----- index files -----
+
+    def load(self) -> bool:
+        """Map the index from disk; returns False when there is none yet."""
+        self.close()
+        meta_path = os.path.join(self.index_dir, "index.json")
+        if not os.path.exists(meta_path):
+            return False
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            return False
+        views = []
+        for name, typecode in zip(_INDEX_FILES, ("I", "I", "I", "Q", "B")):
+            views.append(self._map(os.path.join(self.index_dir, name), typecode))
+        self._ids, self._tfs, self._lengths, self._offsets, self._text = views
+        self.term_index = meta["terms"]
+        self.sources = meta["sources"]
+        self.files = meta["files"]
+        self.avg_length = meta["avg_length"]
+        return True
+
+    def close(self):
+        for view in (self._ids, self._tfs, self._lengths, self._offsets):
+            if isinstance(view, memoryview):
+                view.release()
+        self._ids = self._tfs = self._lengths = self._offsets = None
+        self._text = None
+        for m in self._maps:
+            m.close()
+        self._maps = []
+        self.term_index, self.sources, self.files, self.avg_length = {}, [], [], 0.0
+
+    def _map(self, path: str, typecode: str):
+        if os.path.getsize(path) == 0:
+            return array(typecode)  # empty files cannot be mapped
+        with open(path, "rb") as f:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(m)
+        return m if typecode == "B" else memoryview(m).cast(typecode)
+
+    # ----- indexing -----
+
+    def reindex(self, force: bool = False) -> dict:
+        """
+        Bring the index up to date with source_dir. Unchanged files reuse
+        their cached passages and term counts. Returns counts of what changed.
+        """
+        started = time.perf_counter()
+        segments_path = os.path.join(self.index_dir, "segments.json")
+        segments: dict = {}
+        if not force and os.path.exists(segments_path):
+            with open(segments_path, encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("version") == INDEX_VERSION and cached.get("passage_words") == self.passage_words:
+                segments = cached["files"]
+
+        found = {}
+        for root, dirs, names in os.walk(self.source_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in names:
+                if name.lower().endswith(TEXT_EXTENSIONS + PDF_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    st = os.stat(path)
+                    found[os.path.relpath(path, self.source_dir)] = [st.st_size, st.st_mtime_ns]
+
+        changed = [p for p, sig in found.items() if p not in segments or segments[p]["signature"] != sig]
+        removed = [p for p in segments if p not in found]
+        if not changed and not removed and os.path.exists(os.path.join(self.index_dir, "index.json")):
+            if not self.sources:
+                self.load()
+            return {"changed": 0, "removed": 0, "files": len(found), "passages": len(self), "seconds": 0.0}
+
+        for path in removed:
+            del segments[path]
+        for path in changed:
+            try:
+                text = read_document(os.path.join(self.source_dir, path))
+            except Exception as e:
+                if self.console_output:
+                    print(f"[KNOWLEDGE] Skipping {path}: {e}")
+                segments.pop(path, None)
+                continue
+            passages = split_passages(text, self.passage_words)
+            segments[path] = {
+                "signature": found[path],
+                "passages": passages,
+                "terms": [Counter(terms(p)) for p in passages],
+            }
+
+        self.close()  # mapped files cannot be replaced on Windows
+        self._write(segments)
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(segments_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "passage_words": self.passage_words, "files": segments}, f)
+        os.replace(segments_path + ".tmp", segments_path)
+        self.load()
+
+        result = {
+            "changed": len(changed),
+            "removed": len(removed),
+            "files": len(found),
+            "passages": len(self),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        if self.console_output:
+            print(f"[KNOWLEDGE] Indexed {result['files']} files, {result['passages']} passages "
+                  f"({result['changed']} changed, {result['removed']} removed) in {result['seconds']} s")
+        return result
+
+    def _write(self, segments: dict):
+        # index.json goes first and comes back last, so a crash mid-rebuild
+        # never leaves it pointing at half-written files
+        meta_path = os.path.join(self.index_dir, "index.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        files = sorted(segments)
+        sources: list[int] = []
+        lengths = array("I")
+        offsets = array("Q", [0])
+        text = bytearray()
+        postings: dict[str, list[tuple[int, int]]] = {}
+        for file_no, path in enumerate(files):
+            segment = segments[path]
+            for passage, counts in zip(segment["passages"], segment["terms"]):
+                pid = len(sources)
+                sources.append(file_no)
+                lengths.append(sum(counts.values()))
+                text += passage.encode("utf-8")
+                offsets.append(len(text))
+                for term, tf in counts.items():
+                    postings.setdefault(term, []).append((pid, tf))
+
+        ids, tfs = array("I"), array("I")
+        term_index = {}
+        for term, plist in postings.items():
+            term_index[term] = [len(ids), len(plist)]
+            for pid, tf in plist:
+                ids.append(pid)
+                tfs.append(tf)
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        for name, data in zip(_INDEX_FILES, (ids, tfs, lengths, offsets, text)):
+            path = os.path.join(self.index_dir, name)
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        meta = {
+            "version": INDEX_VERSION,
+            "terms": term_index,
+            "sources": sources,
+            "files": files,
+            "avg_length": sum(lengths) / len(lengths) if lengths else 0.0,
+        }
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+def format_context(passages: list[Passage]) -> str:
+    return "\n".join(f"- ({os.path.basename(p.source)}) {p.text}" for p in passages)
@@ -0,0 +1,103 @@
+"""
+Replay a recorded session (core/session_log.py) through the pipeline and
+compare it with the original run.
+
+Finals, and the partials that led up to them, are fed with their original
+timing (scaled by --speed) to NLPClassifier/AnswerGenerator under the
+configuration given on the command line (same options as benchmark.py):
+
+    python replay_session.py sessions/session-20250101-101500.jsonl --combined --speed 4
+    python replay_session.py sessions/session-20250101-101500.jsonl --real-backend --label groq
+
+The report covers classification agreement, answer similarity, and
+latency percentiles per stage. Latency comes from the trace events, so the
+original session needs TRACE_JSONL or METRICS_PORT set for its side. Each
+replay is logged too, so two configurations can be compared with --baseline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import benchmark
+from core.session_log import SESSIONS_DIR, SessionRecorder, load_session
+from core.speculation import normalize, similarity
+
+COMPARED_SPANS = ("classify", "time_to_first_token", "final_to_answer", "end_to_end")
+
+def by_text(events: list[dict], kind: str, field: str = "text") -> dict[str, dict]:
+    return {normalize(e[field]): e for e in events if e["kind"] == kind}
+
+def span_values(events: list[dict], span: str) -> list[float]:
+    return [e["spans_ms"][span] / 1000 for e in events if e["kind"] == "trace" and span in e["spans_ms"]]
+
+def compare(baseline: list[dict], replay: list[dict]) -> dict:
+    before, after = by_text(baseline, "classified"), by_text(replay, "classified")
+    common = before.keys() & after.keys()
+    changed = [
+        {"text": after[k]["text"], "before": before[k]["action"], "after": after[k]["action"]}
+        for k in sorted(common) if before[k]["action"] != after[k]["action"]
+    ]
+    answers_before, answers_after = by_text(baseline, "answer", "question"), by_text(replay, "answer", "question")
+    scores = [similarity(answers_before[k]["text"], answers_after[k]["text"]) for k in answers_before.keys() & answers_after.keys()]
+    return {
+        "classifications": {
+            "baseline": len(before),
+            "replay": len(after),
+            "matched": len(common),
+            "agreement": round(1 - len(changed) / len(common), 3) if common else None,
+            "changed": changed,
+        },
+        "answers": {
+            "baseline": len(answers_before),
+            "replay": len(answers_after),
+            "matched": len(scores),
+            "mean_similarity": round(sum(scores) / len(scores), 3) if scores else None,
+        },
+        "latency": {
+            span: {"baseline": benchmark.summarize(span_values(baseline, span)), "replay": benchmark.summarize(span_values(replay, span))}
+            for span in COMPARED_SPANS
+        },
+    }
+
+def print_comparison(report: dict):
+    cls, ans = report["classifications"], report["answers"]
+    print(f"\n[Replay] classifications: {cls['matched']} matched, agreement {cls['agreement']}")
+    for change in cls["changed"]:
+        print(f"  {change['before']} -> {change['after']}: {change['text']}")
+    print(f"[Replay] answers: {ans['matched']} matched, mean similarity {ans['mean_similarity']}")
+    print(f"{'span':<24}{'base p50':>10}{'base p95':>10}{'new p50':>10}{'new p95':>10}")
+    for span, sides in report["latency"].items():
+        cells = []
+        for side in ("baseline", "replay"):
+            stats = sides[side]
+            cells += [stats.get("p50_ms", "-"), stats.get("p95_ms", "-")]
+        print(f"{span:<24}" + "".join(f"{c:>10}" for c in cells))
+
+async def main(args):
+    baseline = load_session(args.baseline or args.session)
+    log_path = args.log or os.path.join(SESSIONS_DIR, time.strftime(f"replay-{args.label}-%Y%m%d-%H%M%S.jsonl"))
+    os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+    recorder = SessionRecorder(log_path, metadata={"replay_of": args.session, "label": args.label})
+    args.corpus = [args.session]
+    try:
+        result = await benchmark.run(args, recorder)
+    finally:
+        recorder.close()
+
+    report = compare(baseline, load_session(log_path))
+    report.update(session=args.session, baseline=args.baseline or args.session, replay_log=log_path, benchmark=result)
+    print_comparison(report)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[Replay] Replay log: {log_path}; report written to {args.output}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a logged session and compare latency and outputs")
+    parser.add_argument("session", help="session log (.jsonl) to replay")
+    parser.add_argument("--baseline", default=None, help="compare against this log instead of the replayed session (e.g. an earlier replay)")
+    parser.add_argument("--log", default=None, help="where to write the replay's own session log")
+    parser.add_argument("--output", default="replay_report.json")
+    benchmark.add_config_arguments(parser)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,78 @@
+"""
+Machine-specific STT settings.
+
+calibrate_stt.py measures whisper model sizes, compute types, beam sizes and
+thread counts on the local CPU and saves the best profile that keeps up in
+real time; realtimeSTT loads it at startup. Without a saved profile the
+defaults below (the previous hardcoded settings) are used.
+"""
+import json
+import os
+from dataclasses import asdict, dataclass, fields
+from typing import Optional
+
+PROFILE_PATH = os.getenv("STT_PROFILE", "stt_profile.json")
+
+# smallest to largest: faster, then more accurate
+MODEL_SIZES = ("tiny.en", "base.en", "small.en", "medium.en")
+
+@dataclass
+class STTProfile:
+    model: str = "base.en"
+    realtime_model_type: str = "tiny.en"
+    compute_type: str = "int8"
+    beam_size: int = 5
+    beam_size_realtime: int = 3
+    cpu_threads: int = 0  # 0 = CTranslate2 default
+    realtime_cpu_threads: int = 0  # 0 = same as cpu_threads (shared worker only, see apply_threads)
+    # calibration results, informational
+    rtf: Optional[float] = None
+    realtime_rtf: Optional[float] = None
+
+    def recorder_kwargs(self) -> dict:
+        return {
+            "model": self.model,
+            "realtime_model_type": self.realtime_model_type,
+            "compute_type": self.compute_type,
+            "beam_size": self.beam_size,
+            "beam_size_realtime": self.beam_size_realtime,
+        }
+
+    def apply_threads(self) -> Optional[int]:
+        """
+        AudioToTextRecorder has no thread-count option; CTranslate2 reads
+        OMP_NUM_THREADS when the models load, so the final and the realtime
+        model both get this count (realtime_cpu_threads cannot be applied).
+        An OMP_NUM_THREADS already in the environment wins. Returns the
+        thread count the models will load with, None for the library default.
+        """
+        current = os.environ.get("OMP_NUM_THREADS")
+        if current is None:
+            if self.cpu_threads:
+                os.environ["OMP_NUM_THREADS"] = str(self.cpu_threads)
+                return self.cpu_threads
+            return None
+        if self.cpu_threads and current != str(self.cpu_threads):
+            print(f"[STT] OMP_NUM_THREADS={current} from the environment overrides cpu_threads={self.cpu_threads}")
+        try:
+            return int(current)
+        except ValueError:
+            return None
+
+def load_profile(path: Optional[str] = None) -> STTProfile:
+    path = path or PROFILE_PATH
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return STTProfile()
+    except (OSError, ValueError) as e:
+        print(f"[STT] Ignoring unreadable profile {path}: {e}")
+        return STTProfile()
+    known = {f.name for f in fields(STTProfile)}
+    return STTProfile(**{k: v for k, v in data.items() if k in known})
+
+def save_profile(profile: STTProfile, path: Optional[str] = None, **metadata):
+    path = path or PROFILE_PATH
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({**asdict(profile), **metadata}, f, indent=2)
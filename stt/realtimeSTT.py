@@ -1,43 +1,182 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from RealtimeSTT import AudioToTextRecorder
 
+from core import tracing
+from stt import profiles, sources
+
 class realtimeSTT:
-    def __init__(self, partial_update, final_update, name=None, on_ready=None, on_error=None, language="en", input_device_index=1, console_output=False):
+    def __init__(self, partial_update, final_update, name=None, on_ready=None, on_error=None, language="en", input_device_index=1, console_output=False, source=None, speed=1.0, profile=None, governor=None, **recorder_kwargs):
+        """
+        source: optional stt.sources.AudioSource (or anything open_source()
+        accepts: a file path, "-" for raw PCM on stdin, a numpy array) to read
+        instead of the microphone. start() returns once it is exhausted.
+        speed: replay speed for source, 0 feeds as fast as possible.
+        profile: stt.profiles.STTProfile; defaults to the one saved by
+        calibrate_stt.py. Explicit recorder_kwargs still take precedence.
+        governor: core.resources.ResourceGovernor; sets the model thread
+        counts from its budget and may stretch the realtime interval under load.
+        """
         self.name = name
         self.final_update = final_update
         self.on_ready = on_ready
         self.on_error = on_error
         self.running = True
+        self.paused = False
+        self.sessions = 0
         self.console_output = console_output
-        
-        self.recorder = AudioToTextRecorder(
-            model="base.en",
-            realtime_model_type="tiny.en", 
+        self.source = sources.open_source(source) if source is not None else None
+        self.speed = speed
+        # recorder.text() blocks until end of speech, so it gets its own thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stt")
+        self._on_recording_start = recorder_kwargs.pop("on_recording_start", None)
+        self._on_recording_stop = recorder_kwargs.pop("on_recording_stop", None)
+        self._speech_end = None
+        # recordings started vs. transcribed; equal means nothing is in flight
+        self._recordings = 0
+        self._transcribed = 0
+        self._feed_stop = threading.Event()
+
+        self.governor = governor
+        self.profile = profile or profiles.load_profile()
+        if governor is not None:
+            self.profile = governor.apply_to_profile(self.profile)
+            governor.limit_torch_threads()
+        threads = self.profile.apply_threads()
+        options = dict(
+            **self.profile.recorder_kwargs(),
             language=language,
             enable_realtime_transcription=True,
             input_device_index=input_device_index,
             # on_realtime_transcription_update=partial_update,
             on_realtime_transcription_stabilized=partial_update,
             no_log_file=True,
-            compute_type="int8",
-            spinner=console_output
+            spinner=console_output,
+            use_microphone=self.source is None,
+        )
+        options.update(recorder_kwargs)  # e.g. enable_realtime_transcription=False for batch runs
+        # loading the whisper models dominates; keep one instance across sessions (pause/start)
+        started = time.perf_counter()
+        self.recorder = AudioToTextRecorder(
+            on_recording_start=self._recording_started,
+            on_recording_stop=self._recording_stopped,
+            **options,
         )
+        self.timings = {"cold_start_s": round(time.perf_counter() - started, 3), "last_resume_s": None}
+        if governor is not None:
+            # both models load with the same OMP_NUM_THREADS on this path
+            governor.note_threads(str(self.name), threads, threads if options["enable_realtime_transcription"] else None)
+            # the transcription worker is a separate process on Windows/macOS; on Linux it is a
+            # thread of this process, and pinning that would pin the UI and event loop too
+            pid = getattr(getattr(self.recorder, "transcript_process", None), "pid", None)
+            if pid:
+                governor.pin(str(self.name), pid)
+            if options["enable_realtime_transcription"]:
+                governor.register(str(self.name), self._set_realtime_interval, self.recorder.realtime_processing_pause)
+        if console_output:
+            print(f"[{self.name=}] Models loaded in {self.timings['cold_start_s']} s "
+                  f"({options['model']}/{options['realtime_model_type']}, {options['compute_type']})")
+
+    def _set_realtime_interval(self, seconds: float):
+        # read by the recorder's realtime loop before every partial transcription
+        self.recorder.realtime_processing_pause = seconds
+
+    def _recording_started(self):
+        self._recordings += 1
+        if self._on_recording_start is not None:
+            self._on_recording_start()
+
+    def _recording_stopped(self):
+        # end of speech as detected by the VAD, before the final transcription
+        self._speech_end = time.monotonic()
+        if self._on_recording_stop is not None:
+            self._on_recording_stop()
+
+    def _feed_source(self, idle_timeout=30.0):
+        try:
+            seconds = sources.feed(self.recorder, self.source, speed=self.speed, stop_event=self._feed_stop)  # type: ignore
+            # let the last utterance finish transcribing before shutting down
+            deadline = time.monotonic() + idle_timeout
+            while self._transcribed < self._recordings and time.monotonic() < deadline and self.running:
+                time.sleep(0.05)
+            if self.console_output:
+                print(f"[{self.name=}] Source finished ({seconds:.1f} s of audio)")
+        except Exception as e:
+            if self.console_output:
+                print(f"[{self.name=}] Error reading source: {e}")
+            if self.on_error is not None:
+                self.on_error(e)
+        finally:
+            self.stop()
 
     async def start(self):
+        """
+        Run one listening session until pause() or stop(). The recorder and
+        its models survive pause(), so calling start() again is cheap.
+        """
+        resumed = time.perf_counter()
+        self.paused = False
+        if self.source is None and self.sessions:
+            self.recorder.set_microphone(True)
+        self.sessions += 1
+        self.timings["last_resume_s"] = round(time.perf_counter() - resumed, 3)
         if self.on_ready is not None:
             self.on_ready()
         if self.console_output:
             print(f"[{self.name=}] Listening... (Speak now)")
+        if self.source is not None:
+            threading.Thread(target=self._feed_source, name="stt-source", daemon=True).start()
         # self.recorder.start()
-        while self.running:
-            full_sentence = self.recorder.text()
-            await self.final_update(full_sentence)
-    
+        loop = asyncio.get_running_loop()
+        while self.running and not self.paused:
+            full_sentence = await loop.run_in_executor(self._executor, self.recorder.text)
+            if not self.running or self.paused:
+                break
+            try:
+                if not full_sentence:
+                    continue
+                trace = tracing.tracer.start(full_sentence)
+                if trace is not None:
+                    if self._speech_end is not None:
+                        trace.mark("speech_end", self._speech_end)
+                    trace.mark("final")
+                    trace.tags["source"] = str(self.name)
+                # final_update should only hand the text off (e.g. Pipeline.submit),
+                # so the next text() call starts right away
+                with tracing.use(trace):
+                    await self.final_update(full_sentence)
+            finally:
+                self._transcribed += 1
+
+    def pause(self):
+        """End the current session but keep the recorder warm; start() resumes."""
+        if not self.running or self.paused:
+            return
+        self.paused = True
+        try:
+            if self.source is None:
+                self.recorder.set_microphone(False)
+            self.recorder.abort()  # unblocks a pending text() call
+        except Exception as e:
+            if self.console_output:
+                print(f"[{self.name=}] Error pausing recorder: {e}")
+            if self.on_error is not None:
+                self.on_error(e)
+
     def stop(self):
+        if not self.running:
+            return
         self.running = False
+        self._feed_stop.set()
+        if self.governor is not None:
+            self.governor.unregister(str(self.name))
         try:
             self.recorder.shutdown()
         except Exception as e:
             if self.console_output:
                 print(f"[{self.name=}] Error stopping recorder: {e}")
             if self.on_error is not None:
-                self.on_error(e)
\ No newline at end of file
+                self.on_error(e)
+        self._executor.shutdown(wait=False)
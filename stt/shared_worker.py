@@ -0,0 +1,512 @@
+"""
+One model-hosting process for several audio streams.
+
+Two realtimeSTT instances (interviewer device and candidate mic) each load
+their own whisper models. SharedSTTWorker loads them once in a child
+process; every named stream connects to it over a local socket
+(multiprocessing.connection), sends 16 kHz mono PCM, and gets partial and
+final transcripts back through the usual partial_update/final_update
+callbacks:
+
+    worker = SharedSTTWorker(console_output=True)
+    worker.start()
+    interviewer = worker.stream("Interviewer", on_partial, on_final, input_device_index=1)
+    candidate = worker.stream("Candidate", None, on_candidate_final, input_device_index=2)
+    await asyncio.gather(interviewer.start(), candidate.start())
+
+Streams are endpointed in the worker with webrtcvad on audio frames (not
+wall-clock time), so file sources can also be fed faster than real time.
+A single inference thread serves all streams: finals first, in arrival
+order, then partials for streams still speaking, least recently served
+first and always on the latest audio only.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Optional
+
+import numpy as np
+
+from core import tracing
+from stt import profiles, sources
+
+FRAME_SAMPLES = 480  # 30 ms, a frame size webrtcvad accepts at 16 kHz
+FRAME_SECONDS = FRAME_SAMPLES / sources.SAMPLE_RATE
+
+class _StreamState:
+    """Worker-side VAD endpointing and utterance buffer for one stream."""
+
+    def __init__(self, name: str, conn: Connection, vad_mode: int, post_speech_silence: float,
+                 pre_roll: float, start_frames: int):
+        import webrtcvad  # installed with RealtimeSTT
+
+        self.name = name
+        self.conn = conn
+        self.vad = webrtcvad.Vad(vad_mode)
+        self.end_frames = max(1, round(post_speech_silence / FRAME_SECONDS))
+        self.start_frames = start_frames
+        self.pre_roll: deque[bytes] = deque(maxlen=max(1, round(pre_roll / FRAME_SECONDS)))
+        self.pending = b""
+        self.utterance = bytearray()
+        self.in_speech = False
+        self.voiced_run = 0
+        self.silent_run = 0
+        self.last_partial = 0.0
+        self.send_lock = threading.Lock()
+
+    def send(self, message: tuple):
+        with self.send_lock:
+            try:
+                self.conn.send(message)
+            except (OSError, EOFError):
+                pass  # client went away; its reader thread cleans up
+
+    def feed(self, pcm: bytes) -> list[bytes]:
+        """Run VAD over new audio; returns utterances that just ended."""
+        finished = []
+        self.pending += pcm
+        frame_bytes = FRAME_SAMPLES * 2
+        while len(self.pending) >= frame_bytes:
+            frame, self.pending = self.pending[:frame_bytes], self.pending[frame_bytes:]
+            voiced = self.vad.is_speech(frame, sources.SAMPLE_RATE)
+            if not self.in_speech:
+                self.pre_roll.append(frame)
+                self.voiced_run = self.voiced_run + 1 if voiced else 0
+                if self.voiced_run >= self.start_frames:
+                    self.in_speech = True
+                    self.silent_run = 0
+                    self.utterance = bytearray(b"".join(self.pre_roll))
+                    self.pre_roll.clear()
+                    self.send(("speech_start",))
+            else:
+                self.utterance += frame
+                self.silent_run = 0 if voiced else self.silent_run + 1
+                if self.silent_run >= self.end_frames:
+                    self.in_speech = False
+                    self.voiced_run = 0
+                    self.send(("speech_end",))
+                    finished.append(bytes(self.utterance))
+                    self.utterance = bytearray()
+        return finished
+
+    def reset(self):
+        self.pending = b""
+        self.utterance = bytearray()
+        self.pre_roll.clear()
+        self.in_speech = False
+        self.voiced_run = 0
+
+class STTWorkerServer:
+    """Runs in the worker process: owns the models and serves every stream."""
+
+    REALTIME_INTERVAL = 0.3
+
+    def __init__(
+        self,
+        profile: profiles.STTProfile,
+        language: str = "en",
+        realtime_interval: float = REALTIME_INTERVAL,
+        min_partial_audio: float = 0.5,
+        post_speech_silence: float = 0.6,
+        pre_roll: float = 0.3,
+        start_frames: int = 3,
+        vad_mode: int = 2,
+        min_utterance: float = 0.3,
+        enable_realtime_transcription: bool = True,
+    ):
+        self.profile = profile
+        self.language = language
+        self.realtime_interval = realtime_interval
+        self.min_partial_audio = min_partial_audio
+        self.stream_options = dict(vad_mode=vad_mode, post_speech_silence=post_speech_silence,
+                                   pre_roll=pre_roll, start_frames=start_frames)
+        self.min_utterance = min_utterance
+        self.enable_realtime_transcription = enable_realtime_transcription
+        self.streams: dict[str, _StreamState] = {}
+        self.finals: deque[tuple[_StreamState, bytes]] = deque()
+        self.cond = threading.Condition()
+        self.running = True
+        self.model = None
+        self.realtime_model = None
+
+    def load_models(self):
+        from faster_whisper import WhisperModel
+
+        options = dict(device="cpu", compute_type=self.profile.compute_type, cpu_threads=self.profile.cpu_threads)
+        self.model = WhisperModel(self.profile.model, **options)
+        if not self.enable_realtime_transcription:
+            return
+        if self.profile.realtime_model_type == self.profile.model:
+            self.realtime_model = self.model
+        else:
+            options["cpu_threads"] = self.profile.realtime_cpu_threads or self.profile.cpu_threads
+            self.realtime_model = WhisperModel(self.profile.realtime_model_type, **options)
+
+    def serve(self, listener: Listener):
+        threading.Thread(target=self._accept_loop, args=(listener,), daemon=True).start()
+        self._inference_loop()
+
+    def _accept_loop(self, listener: Listener):
+        while self.running:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError):
+                continue
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn: Connection):
+        stream = None
+        try:
+            kind, payload = conn.recv()
+            if kind == "shutdown":
+                with self.cond:
+                    self.running = False
+                    self.cond.notify_all()
+                return
+            if kind == "tune":
+                with self.cond:
+                    self.realtime_interval = payload["realtime_interval"]
+                return
+            stream = _StreamState(payload, conn, **self.stream_options)
+            with self.cond:
+                self.streams[stream.name] = stream
+            stream.send(("ready",))
+            while True:
+                message = conn.recv()
+                with self.cond:
+                    if message[0] == "audio":
+                        for audio in stream.feed(message[1]):
+                            if len(audio) / 2 / sources.SAMPLE_RATE >= self.min_utterance:
+                                self.finals.append((stream, audio))
+                            else:
+                                stream.send(("final", ""))  # too short, still closes the utterance
+                    elif message[0] == "reset":
+                        stream.reset()
+                    self.cond.notify_all()
+        except (EOFError, OSError):
+            pass
+        finally:
+            if stream is not None:
+                with self.cond:
+                    if self.streams.get(stream.name) is stream:
+                        del self.streams[stream.name]
+            conn.close()
+
+    def _next_job(self):
+        """Called with cond held: a pending final, else the most overdue partial."""
+        if self.finals:
+            stream, audio = self.finals.popleft()
+            return "final", stream, audio
+        if self.realtime_model is None:
+            return None
+        now = time.monotonic()
+        due = [
+            s for s in self.streams.values()
+            if s.in_speech
+            and now - s.last_partial >= self.realtime_interval
+            and len(s.utterance) / 2 / sources.SAMPLE_RATE >= self.min_partial_audio
+        ]
+        if not due:
+            return None
+        stream = min(due, key=lambda s: s.last_partial)
+        stream.last_partial = now
+        return "partial", stream, bytes(stream.utterance)
+
+    def _inference_loop(self):
+        while True:
+            with self.cond:
+                job = self._next_job()
+                while job is None and self.running:
+                    self.cond.wait(timeout=self.realtime_interval / 2)
+                    job = self._next_job()
+                if not self.running:
+                    return
+            kind, stream, audio = job  # type: ignore
+            try:
+                if kind == "final":
+                    text = self._transcribe(self.model, audio, self.profile.beam_size)
+                else:
+                    text = self._transcribe(self.realtime_model, audio, self.profile.beam_size_realtime)
+            except Exception as e:
+                stream.send(("error", f"{type(e).__name__}: {e}"))
+                if kind == "final":
+                    stream.send(("final", ""))
+                continue
+            stream.send((kind, text))
+
+    def _transcribe(self, model, audio: bytes, beam_size: int) -> str:
+        samples = np.frombuffer(audio, dtype=np.int16).astype(np.float32) / 32768
+        segments, _ = model.transcribe(samples, language=self.language, beam_size=beam_size, without_timestamps=True)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+def _run_worker(options: dict, profile: dict, host: str, port: int, authkey: bytes, ready: Connection):
+    """Worker process entry point."""
+    try:
+        server = STTWorkerServer(profiles.STTProfile(**profile), **options)
+        server.load_models()
+        listener = Listener((host, port), authkey=authkey)
+    except Exception as e:
+        ready.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    ready.send(("ready", listener.address))
+    ready.close()
+    server.serve(listener)
+
+class SharedSTTWorker:
+    """Parent-side handle: spawns the model-hosting process and opens streams on it."""
+
+    def __init__(self, profile: Optional[profiles.STTProfile] = None, language="en", host="127.0.0.1", port=0,
+                 console_output=False, governor=None, **server_options):
+        """
+        server_options go to STTWorkerServer (post_speech_silence, realtime_interval, vad_mode, ...).
+        governor: core.resources.ResourceGovernor; sets per-model thread counts, pins the worker
+        process and may stretch realtime_interval under load.
+        """
+        self.governor = governor
+        self.profile = profile or profiles.load_profile()
+        if governor is not None:
+            self.profile = governor.apply_to_profile(self.profile)
+        self.language = language
+        self.host = host
+        self.port = port
+        self.console_output = console_output
+        self.server_options = server_options
+        self.authkey = os.urandom(16)
+        self.address = None
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.timings = {"cold_start_s": None}
+
+    def start(self, timeout: float = 600):
+        """Blocks until the models are loaded; run it off the event loop."""
+        started = time.perf_counter()
+        context = multiprocessing.get_context("spawn")
+        parent, child = context.Pipe(duplex=False)
+        options = dict(self.server_options, language=self.language)
+        self.process = context.Process(
+            target=_run_worker,
+            args=(options, asdict(self.profile), self.host, self.port, self.authkey, child),
+            name="stt-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+        if not parent.poll(timeout):
+            self.stop()
+            raise TimeoutError("STT worker did not load its models in time")
+        status, detail = parent.recv()
+        if status != "ready":
+            self.stop()
+            raise RuntimeError(f"STT worker failed to start: {detail}")
+        self.address = detail
+        self.timings["cold_start_s"] = round(time.perf_counter() - started, 3)
+        if self.governor is not None:
+            realtime = self.server_options.get("enable_realtime_transcription", True)
+            # explicit cpu_threads: unlike the recorder path, OMP_NUM_THREADS does not override these
+            main_threads = self.profile.cpu_threads or None
+            realtime_threads = main_threads if self.profile.realtime_model_type == self.profile.model \
+                else self.profile.realtime_cpu_threads or main_threads
+            self.governor.note_threads("stt-worker", main_threads, realtime_threads if realtime else None)
+            self.governor.pin("stt-worker", self.process.pid)
+            if realtime:
+                base = self.server_options.get("realtime_interval", STTWorkerServer.REALTIME_INTERVAL)
+                self.governor.register("stt-worker", self.set_realtime_interval, base)
+        if self.console_output:
+            print(f"[STT worker] Models loaded in {self.timings['cold_start_s']} s "
+                  f"({self.profile.model}/{self.profile.realtime_model_type}) at {self.address}")
+        return self
+
+    def connect(self, name: str) -> Connection:
+        if self.address is None:
+            raise RuntimeError("SharedSTTWorker.start() has not been called")
+        conn = Client(self.address, authkey=self.authkey)
+        conn.send(("open", name))
+        if conn.recv() != ("ready",):
+            raise RuntimeError(f"STT worker refused stream {name}")
+        return conn
+
+    def set_realtime_interval(self, seconds: float):
+        """Minimum time between partial transcriptions of a stream; takes effect at the next one."""
+        conn = Client(self.address, authkey=self.authkey)
+        conn.send(("tune", {"realtime_interval": seconds}))
+        conn.close()
+
+    def stream(self, name: str, partial_update, final_update, **kwargs) -> "SharedSTTStream":
+        return SharedSTTStream(self, name, partial_update, final_update, **kwargs)
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.governor is not None:
+            self.governor.unregister("stt-worker")
+        if self.address is not None:
+            try:
+                conn = Client(self.address, authkey=self.authkey)
+                conn.send(("shutdown", None))
+                conn.close()
+            except (OSError, EOFError):
+                pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process = None
+
+class SharedSTTStream:
+    """
+    A realtimeSTT stand-in (start/pause/stop, partial_update/final_update)
+    whose audio is transcribed by a SharedSTTWorker. Reads the microphone at
+    input_device_index, or `source` (see stt.sources) at `speed`.
+    """
+
+    def __init__(self, worker: SharedSTTWorker, name, partial_update, final_update, on_ready=None, on_error=None,
+                 input_device_index=1, source=None, speed=1.0, console_output=False):
+        self.worker = worker
+        self.name = name
+        self.partial_update = partial_update
+        self.final_update = final_update
+        self.on_ready = on_ready
+        self.on_error = on_error
+        self.input_device_index = input_device_index
+        self.source = sources.open_source(source) if source is not None else None
+        self.speed = speed
+        self.console_output = console_output
+        self.running = True
+        self.paused = False
+        self.sessions = 0
+        self._conn = worker.connect(name)
+        self._send_lock = threading.Lock()
+        self._capturing = threading.Event()
+        self._speech_end = None
+        self._utterances = 0
+        self._finals_received = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._finals: Optional[asyncio.Queue] = None
+        threading.Thread(target=self._read_results, name=f"stt-{name}-results", daemon=True).start()
+
+    def feed_audio(self, chunk: bytes):
+        """16 kHz mono int16 PCM; also lets stt.sources.feed() drive this stream."""
+        self._send(("audio", chunk))
+
+    def _send(self, message: tuple):
+        with self._send_lock:
+            try:
+                self._conn.send(message)
+            except (OSError, EOFError) as e:
+                self._fail(e)
+
+    def _fail(self, error: Exception):
+        if self.running and self.on_error is not None:
+            self.on_error(error)
+        if self.console_output:
+            print(f"[{self.name=}] STT worker connection error: {error}")
+
+    def _read_results(self):
+        while True:
+            try:
+                kind, *payload = self._conn.recv()
+            except (OSError, EOFError):
+                self._deliver(None)
+                return
+            if kind == "speech_start":
+                self._utterances += 1
+            elif kind == "speech_end":
+                self._speech_end = time.monotonic()
+            elif kind == "partial":
+                if self.partial_update is not None and not self.paused and payload[0]:
+                    self.partial_update(payload[0])
+            elif kind == "final":
+                self._finals_received += 1
+                if payload[0]:
+                    self._deliver((payload[0], self._speech_end))
+            elif kind == "error":
+                self._fail(RuntimeError(payload[0]))
+
+    def _deliver(self, item):
+        if self._loop is not None and self._finals is not None:
+            self._loop.call_soon_threadsafe(self._finals.put_nowait, item)
+
+    def _capture_microphone(self):
+        import pyaudio
+
+        audio = pyaudio.PyAudio()
+        stream = None
+        try:
+            rate = sources.SAMPLE_RATE
+            try:
+                stream = audio.open(format=pyaudio.paInt16, channels=1, rate=rate, input=True,
+                                    input_device_index=self.input_device_index, frames_per_buffer=sources.CHUNK_FRAMES)
+            except OSError:
+                # device cannot record at 16 kHz; resample from its native rate
+                rate = int(audio.get_device_info_by_index(self.input_device_index)["defaultSampleRate"])
+                stream = audio.open(format=pyaudio.paInt16, channels=1, rate=rate, input=True,
+                                    input_device_index=self.input_device_index, frames_per_buffer=sources.CHUNK_FRAMES)
+            while self._capturing.is_set() and self.running:
+                data = stream.read(sources.CHUNK_FRAMES, exception_on_overflow=False)
+                if rate != sources.SAMPLE_RATE:
+                    data = sources.to_pcm16(np.frombuffer(data, dtype=np.int16), rate).tobytes()
+                self.feed_audio(data)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            if stream is not None:
+                stream.close()
+            audio.terminate()
+
+    def _feed_source(self, idle_timeout=30.0):
+        try:
+            sources.feed(self, self.source, speed=self.speed)  # type: ignore
+            deadline = time.monotonic() + idle_timeout
+            while self._finals_received < self._utterances and time.monotonic() < deadline and self.running:
+                time.sleep(0.05)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self.stop()
+
+    async def start(self):
+        """Run one session until pause() or stop(); start() again to resume."""
+        self.paused = False
+        self.sessions += 1
+        self._loop = asyncio.get_running_loop()
+        self._finals = asyncio.Queue()
+        self._capturing.set()
+        target = self._capture_microphone if self.source is None else self._feed_source
+        threading.Thread(target=target, name=f"stt-{self.name}-audio", daemon=True).start()
+        if self.on_ready is not None:
+            self.on_ready()
+        if self.console_output:
+            print(f"[{self.name=}] Listening... (Speak now)")
+        while self.running and not self.paused:
+            item = await self._finals.get()
+            if item is None or self.paused:
+                break
+            text, speech_end = item
+            trace = tracing.tracer.start(text)
+            if trace is not None:
+                if speech_end is not None:
+                    trace.mark("speech_end", speech_end)
+                trace.mark("final")
+                trace.tags["source"] = str(self.name)
+            with tracing.use(trace):
+                await self.final_update(text)
+
+    def pause(self):
+        if not self.running or self.paused:
+            return
+        self.paused = True
+        self._capturing.clear()
+        self._send(("reset",))
+        self._deliver(None)
+
+    def stop(self):
+        if not self.running:
+            return
+        self.pause()
+        self.running = False
+        self._deliver(None)
+        with self._send_lock:
+            self._conn.close()
@@ -0,0 +1,189 @@
+"""
+Audio input sources for realtimeSTT other than a live microphone.
+
+Every source yields mono 16-bit PCM at 16 kHz (what the recorder's VAD and
+whisper models expect) in fixed-size chunks, so files, raw PCM on stdin and
+numpy buffers all go through the same AudioToTextRecorder.feed_audio path:
+
+    stt = realtimeSTT(partial, final, source=FileSource("interview.flac"), speed=4)
+    stt = realtimeSTT(partial, final, source=open_source("-", sample_rate=44100))
+"""
+import sys
+import threading
+import time
+import wave
+from math import gcd
+from typing import BinaryIO, Iterator, Optional
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+CHUNK_FRAMES = 1024  # matches the recorder's default buffer_size
+
+def to_pcm16(samples, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Mono int16 samples at SAMPLE_RATE from int or float samples shaped
+    (n,) or (n, channels). Floats are expected in [-1, 1].
+    """
+    samples = np.asarray(samples)
+    kind, bits = samples.dtype.kind, samples.dtype.itemsize * 8
+    if kind == "f":
+        audio = samples.astype(np.float32)
+    elif kind == "u":
+        audio = (samples.astype(np.float32) - 2 ** (bits - 1)) / 2 ** (bits - 1)
+    else:
+        audio = samples.astype(np.float32) / 2 ** (bits - 1)
+    if audio.ndim == 2:
+        audio = audio.mean(axis=1)
+    if sample_rate != SAMPLE_RATE and len(audio):
+        from scipy.signal import resample_poly  # installed with RealtimeSTT
+        g = gcd(SAMPLE_RATE, sample_rate)
+        audio = resample_poly(audio, SAMPLE_RATE // g, sample_rate // g)
+    return np.clip(audio * 32767, -32768, 32767).astype(np.int16)
+
+class AudioSource:
+    """Base class: subclasses yield raw blocks at self.sample_rate from blocks()."""
+    name = "source"
+    sample_rate = SAMPLE_RATE
+
+    def blocks(self) -> Iterator[np.ndarray]:
+        raise NotImplementedError
+
+    def chunks(self, frames: int = CHUNK_FRAMES) -> Iterator[bytes]:
+        """Recorder-ready chunks: mono int16 PCM at SAMPLE_RATE, `frames` samples each."""
+        pending = np.zeros(0, dtype=np.int16)
+        for block in self.blocks():
+            pending = np.concatenate([pending, to_pcm16(block, self.sample_rate)])
+            while len(pending) >= frames:
+                yield pending[:frames].tobytes()
+                pending = pending[frames:]
+        if len(pending):
+            yield pending.tobytes()
+
+    def close(self):
+        pass
+
+class ArraySource(AudioSource):
+    def __init__(self, samples, sample_rate: int = SAMPLE_RATE, name: str = "array"):
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.name = name
+
+    def blocks(self):
+        yield self.samples
+
+class FileSource(AudioSource):
+    """
+    WAV, FLAC or anything else libsndfile reads. Streams in ~1 s blocks, so
+    long recordings are never loaded whole. Without the optional `soundfile`
+    package only WAV (8/16/32-bit PCM) is supported.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.name = path
+        try:
+            import soundfile
+        except ImportError:
+            soundfile = None
+        self._soundfile = soundfile
+        if soundfile is not None:
+            self.sample_rate = soundfile.info(path).samplerate
+        elif path.lower().endswith(".wav"):
+            with wave.open(path, "rb") as wav:
+                self.sample_rate = wav.getframerate()
+        else:
+            raise ImportError(f"Reading {path} needs the `soundfile` package (pip install soundfile)")
+
+    def blocks(self):
+        if self._soundfile is not None:
+            yield from self._soundfile.blocks(self.path, blocksize=self.sample_rate, dtype="float32", always_2d=True)
+            return
+        with wave.open(self.path, "rb") as wav:
+            width, channels = wav.getsampwidth(), wav.getnchannels()
+            dtype = {1: np.uint8, 2: np.int16, 4: np.int32}.get(width)
+            if dtype is None:
+                raise ValueError(f"{self.path}: {width * 8}-bit WAV needs the `soundfile` package")
+            while True:
+                raw = wav.readframes(self.sample_rate)
+                if not raw:
+                    break
+                yield np.frombuffer(raw, dtype=dtype).reshape(-1, channels)
+
+class StreamSource(AudioSource):
+    """Raw little-endian PCM from a binary stream, stdin by default (e.g. `arecord -f S16_LE | ...`)."""
+    def __init__(
+        self,
+        stream: Optional[BinaryIO] = None,
+        sample_rate: int = SAMPLE_RATE,
+        channels: int = 1,
+        sample_width: int = 2,
+        name: str = "stdin",
+    ):
+        self.stream = stream if stream is not None else sys.stdin.buffer
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.dtype = {1: np.uint8, 2: np.int16, 4: np.int32}[sample_width]
+        self.frame_bytes = channels * sample_width
+        self.name = name
+
+    def blocks(self):
+        remainder = b""
+        while True:
+            raw = self.stream.read(CHUNK_FRAMES * self.frame_bytes)
+            if not raw:
+                break
+            raw = remainder + raw
+            usable = len(raw) - len(raw) % self.frame_bytes
+            remainder = raw[usable:]
+            if usable:
+                yield np.frombuffer(raw[:usable], dtype=self.dtype).reshape(-1, self.channels)
+
+    def close(self):
+        if self.stream is not sys.stdin.buffer:
+            self.stream.close()
+
+def open_source(spec, **kwargs) -> AudioSource:
+    """"-" reads raw PCM from stdin, a path opens a file, an array is used as-is."""
+    if isinstance(spec, AudioSource):
+        return spec
+    if isinstance(spec, np.ndarray):
+        return ArraySource(spec, **kwargs)
+    if spec == "-":
+        return StreamSource(**kwargs)
+    return FileSource(spec)
+
+def feed(
+    recorder,
+    source: AudioSource,
+    speed: float = 1.0,
+    trailing_silence: float = 1.5,
+    stop_event: Optional[threading.Event] = None,
+) -> float:
+    """
+    Push source audio into recorder.feed_audio, paced at `speed` times real
+    time (0 = as fast as possible), then trailing silence so the last
+    utterance is endpointed. Returns the seconds of audio fed.
+
+    The recorder measures post-speech silence on the wall clock, so at high
+    speeds short pauses stop separating utterances; 0 only suits sources
+    that are already paced (a live stream on stdin).
+    """
+    silence = bytes(2 * CHUNK_FRAMES)
+    tail = [silence] * int(trailing_silence * SAMPLE_RATE / CHUNK_FRAMES)
+    fed = 0
+    try:
+        # the silence tail is always paced, or the recorder never sees it as a pause
+        for chunks, pace in ((source.chunks(), speed), (tail, speed or 1.0)):
+            started, start_fed = time.monotonic(), fed
+            for chunk in chunks:
+                if stop_event is not None and stop_event.is_set():
+                    return fed / SAMPLE_RATE
+                recorder.feed_audio(chunk)
+                fed += len(chunk) // 2
+                if pace:
+                    delay = started + (fed - start_fed) / SAMPLE_RATE / pace - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+    finally:
+        source.close()
+    return fed / SAMPLE_RATE
@@ -0,0 +1,29 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# the modules live at the repository root; tests never talk to a real backend
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LLM_BACKEND", "local")
+
+from mock_llm_server import MockLLMServer  # noqa: E402
+from nlp import llm_client  # noqa: E402
+
+
+@pytest.fixture
+def with_mock_backend():
+    """run(scenario, **server_options): await scenario() on a fresh loop against an in-process mock LLM server."""
+    def run(scenario, **server_options):
+        async def main():
+            server = MockLLMServer(port=0, **server_options)
+            await server.start()
+            llm_client.configure(backend=llm_client.BackendConfig(provider="local", model="mock", base_url=server.base_url))
+            try:
+                return await scenario()
+            finally:
+                await llm_client.close_client()
+                await server.stop()
+        return asyncio.run(main())
+    return run
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from nlp.answer_cache import AnswerCache
+
+
+@pytest.fixture
+def cache():
+    cache = AnswerCache(path=None)
+    yield cache
+    cache.close()
+
+
+def test_exact_and_near_duplicate_hits(cache):
+    question = "How would you design a rate limiter for a public API with millions of users?"
+    cache.put(question, "system_design", "concise", "Token buckets per client.")
+    assert cache.get("Um, how would you design a rate limiter for a public API with millions of users", "system_design") \
+        == "Token buckets per client."
+    assert cache.get("How would you design a rate limiter for the public API with millions of users?", "system_design") \
+        == "Token buckets per client."
+    assert cache.stats()["near_hits"] == 1
+
+
+@pytest.mark.parametrize("cached, asked, intent", [
+    ("What is the difference between TCP and UDP?", "What is the difference between TCP and HTTP?", "networking"),
+    ("Tell me about a time you had a conflict with your manager.",
+     "Tell me about a time you had a conflict with your coworker.", "behavioral"),
+    ("What is the time complexity of inserting into a binary heap?",
+     "What is the time complexity of inserting into a binary search tree?", "algorithmic"),
+])
+def test_one_word_swap_is_not_a_near_hit(cache, cached, asked, intent):
+    cache.put(cached, intent, "concise", "cached answer")
+    assert cache.get(asked, intent) is None
+    assert cache.stats()["near_hits"] == 0
+
+
+def test_follow_ups_bypass_the_cache(cache):
+    cache.put("Can you elaborate on that?", "behavioral", "concise", "stale")
+    assert cache.stats()["size"] == 0
+    assert cache.get("Can you elaborate on that?", "behavioral") is None
+    assert cache.stats()["follow_ups"] == 1
+
+
+def test_discard_restores_the_overwritten_entry(cache):
+    question = "How would you shard a user table?"
+    cache.put(question, "system_design", "concise", "good answer")
+    since = time.time()
+    cache.put(question, "system_design", "concise", "speculative answer")
+    cache.discard(question, "system_design", "concise", "speculative answer", since=since)
+    assert cache.get(question, "system_design") == "good answer"
+
+
+def test_discard_leaves_other_answers_alone(cache):
+    question = "How would you shard a user table?"
+    since = time.time()
+    cache.put(question, "system_design", "concise", "newer answer")
+    cache.discard(question, "system_design", "concise", "speculative answer", since=since)
+    assert cache.get(question, "system_design") == "newer answer"
+    cache.discard(question, "system_design", "concise", "newer answer", since=since)
+    assert cache.get(question, "system_design") is None
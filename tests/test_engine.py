@@ -0,0 +1,55 @@
+from core.engine import Engine
+from nlp.answer_cache import AnswerCache
+from nlp.retrieval import KnowledgeBase
+
+QUESTION = "Tell me about yourself and your last project"
+
+
+def test_session_knowledge_answers_are_not_served_to_other_sessions(tmp_path, with_mock_backend):
+    notes = tmp_path / "notes"
+    notes.mkdir()
+    (notes / "resume.md").write_text("Alice Example. Led the billing service migration to Kafka at Acme.\n")
+    knowledge = KnowledgeBase(source_dir=str(notes), index_dir=str(tmp_path / "index"))
+    knowledge.reindex()
+    shared = AnswerCache(path=None)
+
+    async def scenario():
+        engine = Engine(cache=shared)
+        alice = engine.open_session(knowledge=knowledge)
+        bob = engine.open_session()
+        try:
+            await alice.generator.generate(QUESTION, "behavioral")
+            await alice.generator.generate(QUESTION, "behavioral")
+            assert alice.generator.cache.stats()["hits"] == 1  # repeats within the session still hit
+
+            await bob.generator.generate(QUESTION, "behavioral")
+            assert shared.stats()["hits"] == shared.stats()["near_hits"] == 0
+            assert bob.generator.cache is shared
+            assert alice.generator.cache is not shared
+        finally:
+            await engine.close()
+
+    try:
+        with_mock_backend(scenario, first_token_latency=0, token_latency=0)
+    finally:
+        knowledge.close()
+        shared.close()
+
+
+def test_sessions_without_own_knowledge_share_the_cache(with_mock_backend):
+    shared = AnswerCache(path=None)
+
+    async def scenario():
+        engine = Engine(cache=shared)
+        first, second = engine.open_session(), engine.open_session()
+        try:
+            await first.generator.generate(QUESTION, "behavioral")
+            await second.generator.generate(QUESTION, "behavioral")
+            assert shared.stats()["hits"] == 1
+        finally:
+            await engine.close()
+
+    try:
+        with_mock_backend(scenario, first_token_latency=0, token_latency=0)
+    finally:
+        shared.close()
@@ -0,0 +1,55 @@
+import pytest
+
+from nlp.classifier import NLPClassifier
+from nlp.fast_classifier import FastClassifier
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return FastClassifier()
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("How would you reverse a linked list?", "algorithmic"),
+    ("How do you balance binary search trees?", "algorithmic"),
+    ("How would you add caching in front of the database?", "system_design"),
+    ("Tell me about a time you disagreed with your manager", "behavioral"),
+])
+def test_intent_keywords(classifier, text, intent):
+    assert classifier._intent(" ".join(text.lower().rstrip("?").split())) == intent
+
+
+@pytest.mark.parametrize("text", [
+    "why did you choose this street for the office",
+    "what was the happiest moment of your career",
+    "is it cheap to run",
+])
+def test_intent_keywords_match_whole_words_only(classifier, text):
+    assert classifier._intent(text) == "general"
+
+
+@pytest.mark.parametrize("text", [
+    "Can you see my screen now?",
+    "Is my audio coming through clearly?",
+    "Are you ready to get started?",
+    "Do you want some water?",
+    "How are you doing today?",
+])
+def test_small_talk_questions_go_to_the_llm(classifier, text):
+    assert classifier.predict(text).confidence < NLPClassifier.FAST_PATH_THRESHOLD
+
+
+def test_question_mark_alone_stays_below_the_threshold(classifier):
+    prediction = classifier.predict("Is the office far from the station?")
+    assert prediction.confidence < NLPClassifier.FAST_PATH_THRESHOLD
+
+
+@pytest.mark.parametrize("text", [
+    "What's the time complexity of binary search?",
+    "And how would you find duplicates in an array?",
+    "Tell me about a time you disagreed with your manager.",
+])
+def test_clear_questions_skip_the_llm(classifier, text):
+    prediction = classifier.predict(text)
+    assert prediction.label == "question"
+    assert prediction.confidence >= NLPClassifier.FAST_PATH_THRESHOLD
@@ -0,0 +1,44 @@
+import asyncio
+
+from core.pipeline import Pipeline
+from nlp.answer_generation import AnswerGenerator
+from nlp.classifier import NLPClassifier
+
+FIRST_PARTIAL = "How would you design a rate limiter for a public API"
+FIRST = "How would you design a rate limiter for a public API?"
+SECOND = "What is the difference between a process and a thread?"
+
+
+def user_turns(history):
+    return [turn.content for turn in history.turns if turn.role == "user"]
+
+
+def test_superseded_speculation_is_rolled_back(with_mock_backend):
+    async def hold_first(text, res, stream):
+        if text == FIRST:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                await asyncio.sleep(0.5)  # slow teardown: the speculative answer finishes meanwhile
+                raise
+
+    async def scenario():
+        classifier, generator = NLPClassifier(), AnswerGenerator()
+        pipeline = Pipeline(classifier, generator, speculative=True, on_answer_stream=hold_first)
+        pipeline.start()
+        try:
+            pipeline.on_partial(FIRST_PARTIAL)
+            await asyncio.sleep(0.1)
+            await pipeline.submit(FIRST)  # reuses the speculation started from the partial
+            await asyncio.sleep(0.2)
+            await pipeline.submit(SECOND)
+            await pipeline.drain()
+            assert pipeline.speculator.stats()["reused"] == 1
+            assert pipeline.cancellation_stats()["superseded"] == 1
+            assert pipeline.cancellation_stats()["rolled_back"] == 1
+            assert user_turns(classifier.history) == [SECOND]
+            assert user_turns(generator.history) == [SECOND]
+        finally:
+            await pipeline.stop()
+
+    with_mock_backend(scenario, first_token_latency=0.05, token_latency=0.001)
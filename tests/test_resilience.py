@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from nlp.resilience import LatencyTracker, LLMGuard
+
+
+class Opened:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+
+def run_race(delays, hedge_after, discard=None):
+    """Race attempts that take delays[i] seconds; returns (winner, opened attempts)."""
+    guard = LLMGuard(tracker=LatencyTracker(min_samples=1))
+    opened = []
+
+    async def attempt():
+        index = len(opened)
+        opened.append(Opened(index))
+        await asyncio.sleep(delays[index])
+        return opened[index]
+
+    async def race():
+        return await guard._first_of("generate", attempt, discard, hedge_after)
+
+    return guard, asyncio.run(race()), opened
+
+
+def test_hedge_latency_counts_from_the_original_request():
+    guard, winner, _ = run_race([1.0, 0.05], hedge_after=0.1)
+    assert winner.name == 1 and guard.hedge_wins == 1
+    samples = list(guard.tracker.samples["generate"])
+    # winner and the cancelled loser, both from the first request's start (~0.15 s)
+    assert len(samples) == 2
+    assert all(s == pytest.approx(0.15, abs=0.05) for s in samples)
+
+
+def test_finished_loser_is_closed():
+    async def close(opened):
+        opened.closed = True
+
+    _, winner, opened = run_race([0.1, 0.0], hedge_after=0.1, discard=close)
+    assert [o.closed for o in opened if o is not winner] == [True]
+    assert not winner.closed
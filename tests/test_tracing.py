@@ -0,0 +1,32 @@
+import json
+import math
+
+from core import tracing
+
+
+def finish_trace(tracer, text, seconds):
+    trace = tracer.start(text)
+    trace.mark("final", 100.0)
+    trace.mark("answer_end", 100.0 + seconds)
+    trace.finish()
+
+
+def test_jsonl_is_written_by_the_background_writer(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = tracing.Tracer(enabled=True, jsonl_path=str(path), flush_interval=60)
+    finish_trace(tracer, "How would you shard it?", 0.2)
+    finish_trace(tracer, "Why?", 0.3)
+    assert not path.exists() or path.read_text() == ""  # nothing written on the caller's thread
+    tracer.close()
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["text"] for r in records] == ["How would you shard it?", "Why?"]
+    assert records[0]["spans_ms"]["final_to_answer"] == 200.0
+
+
+def test_snapshot_is_finite_for_overflowing_values():
+    tracer = tracing.Tracer(enabled=True)
+    finish_trace(tracer, "slow", 45.0)  # beyond the largest latency bucket
+    stage = tracer.snapshot()["stages"]["final_to_answer"]
+    assert stage["p95_le_ms"] == 45000.0
+    assert all(math.isfinite(v) for v in stage.values())
+    json.dumps(tracer.snapshot(), allow_nan=False)
@@ -0,0 +1,68 @@
+"""
+Coalescing scheduler for high-frequency Tk updates.
+
+Transcription callbacks fire from background threads many times a second.
+Scheduling an after(0, ...) for each one floods the Tk event queue with
+stale updates that all get rendered. Here every update is posted under a
+key (usually one per widget); only the latest pending value per key is kept
+and everything pending is applied in one batch per frame.
+"""
+import threading
+import time
+
+class UIUpdateScheduler:
+    FRAME_MS = 33  # ~30 fps
+
+    def __init__(self, root, frame_ms: int = FRAME_MS):
+        self.root = root
+        self.frame_ms = frame_ms
+        self._pending: dict = {}
+        self._lock = threading.Lock()
+        self._scheduled = False
+
+        self.posted = 0
+        self.rendered = 0
+        self.dropped = 0  # replaced by a newer value before they were drawn
+        self.frames = 0
+        self.max_frame_ms = 0.0
+
+    def post(self, key, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) for the next frame, replacing any pending update for key. Thread-safe."""
+        with self._lock:
+            self.posted += 1
+            if key in self._pending:
+                self.dropped += 1
+            self._pending[key] = (fn, args, kwargs)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        # only the first update of a frame touches the Tk event queue
+        self.root.after(self.frame_ms, self._flush)
+
+    def cancel(self, key):
+        """Drop a pending update, e.g. when the widget is about to be reset."""
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._scheduled = False
+        started = time.perf_counter()
+        for fn, args, kwargs in pending.values():
+            try:
+                fn(*args, **kwargs)
+                self.rendered += 1
+            except Exception as e:
+                print(f"[UI] Update failed: {e}")
+        self.frames += 1
+        self.max_frame_ms = max(self.max_frame_ms, (time.perf_counter() - started) * 1000)
+
+    def stats(self) -> dict:
+        return {
+            "posted": self.posted,
+            "rendered": self.rendered,
+            "dropped": self.dropped,
+            "frames": self.frames,
+            "max_frame_ms": round(self.max_frame_ms, 2),
+        }